@@ -0,0 +1,80 @@
+"""
+Module: bench_import_time.py
+Purpose: Measures import time of the CLI and pipeline modules with `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --repeat 10 --top 15
+
+    Each target is imported in a fresh interpreter. The reported time is the sum
+    of the cumulative times of the top-level imports, best of --repeat runs, and the
+    modules with the highest self time are listed. The script exits with status 1
+    when a target exceeds its budget, or when it imports a module it must not load:
+    `cli.py --help` must not import pandas, and no target may import PyMuPDF,
+    openpyxl, httpx, openai or langchain before a stage needs them.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+LAZY_MODULES = ('fitz', 'pymupdf', 'openpyxl', 'httpx', 'openai', 'langchain')
+# target: (command after `python -X importtime`, budget in ms, modules it must not import)
+TARGETS = {
+    'cli --help': ([os.path.join(SRC_DIR, 'cli.py'), '--help'], 100, LAZY_MODULES + ('pandas', 'numpy', 'yaml')),
+    'pipeline.pipeline': (['-c', 'import pipeline.pipeline'], 1500, LAZY_MODULES),
+    'data_loader.data_loader': (['-c', 'import data_loader.data_loader'], 1200, LAZY_MODULES),
+    'llm_model.llm_model': (['-c', 'import llm_model.llm_model'], 300, LAZY_MODULES),
+}
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(command: list) -> tuple:
+    """Runs one import and returns the total ms and {module: (self us, cumulative us)}."""
+    env = {**os.environ, 'PYTHONPATH': SRC_DIR}
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *command], capture_output=True,
+                               text=True, env=env, cwd=SRC_DIR)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    modules, total_us = {}, 0
+    for match in map(_LINE.match, completed.stderr.splitlines()):
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+        modules[module] = (self_us, cumulative_us)
+        if len(indent) == 1:
+            total_us += cumulative_us
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='Multiplies every budget, e.g. 2 on slow machines.')
+    args = parser.parse_args()
+
+    failures = []
+    for target, (command, budget_ms, forbidden) in TARGETS.items():
+        runs = [measure(command) for _ in range(args.repeat)]
+        total_ms, modules = min(runs, key=lambda run: run[0])
+        budget_ms *= args.budget_scale
+        print(f"{target:<26} {total_ms:>8.1f} ms  (budget {budget_ms:.0f} ms)")
+        for module, (self_us, _) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"    {module:<40} {self_us / 1000:>8.1f} ms self")
+        if total_ms > budget_ms:
+            failures.append(f"{target} took {total_ms:.0f} ms, over its {budget_ms:.0f} ms budget")
+        loaded = sorted(module for module in forbidden if module in modules)
+        if loaded:
+            failures.append(f"{target} imports {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
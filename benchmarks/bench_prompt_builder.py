@@ -0,0 +1,77 @@
+"""
+Module: bench_prompt_builder.py
+Purpose: Measures the per-row cost of rendering prompts with a compiled PromptTemplate.
+
+Usage:
+    python benchmarks/bench_prompt_builder.py --rows 1000000
+
+    The baseline rebuilds the master prompt dict for every row and serialises it with
+    json.dumps, which is what per-row use of create_master_prompt amounts to. It is
+    compared with PromptTemplate.render (one string join per row) and
+    PromptTemplate.render_many (vectorized per chunk). Rows are rendered in chunks of
+    --batch-size and discarded, as the pipeline does with streamed batches.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from prompt_builder.prompt_builder import PromptBuilder  # noqa: E402
+
+QUESTIONS = [f"Question {number}: does the abstract mention topic {number}?" for number in range(1, 21)]
+SCHEMA = {
+    'type': 'object',
+    'properties': {f"q{number}": {'type': 'boolean'} for number in range(1, 21)},
+    'required': [f"q{number}" for number in range(1, 21)],
+}
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(['protein', 'model', 'analysis', 'signal', 'data', 'graph', 'cell', 'network'])
+    abstracts = [' '.join(row) for row in words[rng.integers(0, len(words), size=(rows, 40))]]
+    return pd.DataFrame({'id': np.arange(rows), 'title': [f"Title {i}" for i in range(rows)], 'abstract': abstracts})
+
+
+def render_rebuilding(builder: PromptBuilder, data: pd.DataFrame) -> list:
+    prompts = []
+    for row in data.to_dict('records'):
+        master_prompt = {'instructions': builder.instructions, 'questions': list(QUESTIONS),
+                         'response_schema': SCHEMA, 'input': {'title': row['title'], 'abstract': row['abstract']}}
+        prompts.append(json.dumps(master_prompt))
+    return prompts
+
+
+def measure(label: str, func, data: pd.DataFrame, batch_size: int) -> None:
+    rows = len(data)
+    start = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        func(data.iloc[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {rows:>10,} rows  {elapsed:>8.2f} s  {elapsed / rows * 1e6:>8.2f} us/row")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = make_frame(args.rows)
+    builder = PromptBuilder()
+    template = builder.compile_template(QUESTIONS, SCHEMA, fields=['title', 'abstract'])
+
+    measure('rebuild + json.dumps', lambda chunk: render_rebuilding(builder, chunk), data, args.batch_size)
+    measure('template.render', lambda chunk: [template.render(row) for row in chunk.to_dict('records')],
+            data, args.batch_size)
+    measure('template.render_many', template.render_many, data, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Module: bench_validator.py
+Purpose: Measures the throughput of ResponseValidator.validate_batch on raw JSON responses.
+
+Usage:
+    python benchmarks/bench_validator.py --responses 100000
+
+    Roughly one response in ten is invalid, so the error-reporting path is included.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from validator.validator import ResponseValidator  # noqa: E402
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        **{f"q{number}": {'type': 'boolean'} for number in range(1, 21)},
+        'topic': {'type': 'string', 'minLength': 1},
+        'keywords': {'type': 'array', 'items': {'type': 'string'}, 'maxItems': 10},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+    },
+    'required': [f"q{number}" for number in range(1, 21)] + ['topic'],
+    'additionalProperties': False,
+}
+
+
+def make_responses(count: int) -> list:
+    responses = []
+    for index in range(count):
+        response = {f"q{number}": (index + number) % 2 == 0 for number in range(1, 21)}
+        response.update(topic=f"topic {index}", keywords=['alpha', 'beta', 'gamma'], confidence=0.5)
+        if index % 10 == 0:
+            response['confidence'] = 'high'
+        responses.append(json.dumps(response))
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--responses', type=int, default=100_000)
+    args = parser.parse_args()
+
+    responses = make_responses(args.responses)
+    validator = ResponseValidator(SCHEMA)
+    start = time.perf_counter()
+    report = validator.validate_batch(responses)
+    elapsed = time.perf_counter() - start
+    print(f"{len(responses):,} responses  {elapsed:.2f} s  {len(responses) / elapsed:,.0f} responses/sec  "
+          f"({(~report['valid']).sum():,} invalid)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Module: corpus.py
+Purpose: Generates reproducible synthetic CSV/XLSX/PDF corpora for the benchmarks.
+
+Usage:
+    python benchmarks/corpus.py --size medium --out data/bench
+
+    Sizes are small (1k rows), medium (100k rows) and large (10M rows), or any row
+    count given with --rows. Every row has an `id`, a short `title` and a ~24-word
+    `abstract`; about 10% of the texts contain non-ASCII characters, 5% are missing
+    and 2% of the rows are duplicates, so the cleaner has work to do. The same seed
+    always produces the same files.
+
+    Excel caps a sheet at 1,048,575 data rows and a PDF with millions of pages is not a
+    realistic input, so the XLSX and PDF files hold at most --max-xlsx-rows and
+    --max-pdf-rows rows. CSV always holds every row. A corpus that already exists
+    with the same parameters is reused.
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+SIZES = {'small': 1_000, 'medium': 100_000, 'large': 10_000_000}
+WORDS = np.array(['protein', 'model', 'analysis', 'signal', 'data', 'graph', 'cell', 'network', 'sample',
+                  'rate', 'enzyme', 'kinetics', 'variance', 'cohort', 'genome', 'tensor'])
+NON_ASCII_WORDS = np.array(['naïve', 'café', 'résumé', 'α-helix', '—', 'Straße'])
+CHUNK_ROWS = 100_000
+ROWS_PER_PDF_PAGE = 20
+
+
+def _text(rng: np.random.Generator, rows: int, words_per_row: int) -> np.ndarray:
+    picks = WORDS[rng.integers(0, len(WORDS), size=(rows, words_per_row))]
+    column = picks[:, 0].astype(object)
+    for position in range(1, words_per_row):
+        column = column + ' ' + picks[:, position]
+    non_ascii = rng.random(rows) < 0.10
+    column[non_ascii] = column[non_ascii] + ' ' + NON_ASCII_WORDS[rng.integers(0, len(NON_ASCII_WORDS), non_ascii.sum())]
+    column[rng.random(rows) < 0.05] = None
+    return column
+
+
+def iter_chunks(rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS):
+    """Yields the corpus as DataFrames of at most `chunk_rows` rows."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        count = min(chunk_rows, rows - start)
+        chunk = pd.DataFrame({
+            'id': np.arange(start, start + count),
+            'title': _text(rng, count, 4),
+            'abstract': _text(rng, count, 24),
+        })
+        # About 2% of the rows repeat an earlier row of the chunk, id included.
+        positions = np.arange(count)
+        duplicates = np.flatnonzero(rng.random(count) < 0.02)
+        duplicates = duplicates[duplicates > 0]
+        positions[duplicates] = rng.integers(0, duplicates)
+        yield chunk.iloc[positions].reset_index(drop=True)
+
+
+def write_csv(path: str, rows: int, seed: int) -> None:
+    header = True
+    for chunk in iter_chunks(rows, seed):
+        chunk.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def write_xlsx(path: str, rows: int, seed: int) -> None:
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('data')
+    sheet.append(['id', 'title', 'abstract'])
+    for chunk in iter_chunks(rows, seed):
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_pdf(path: str, rows: int, seed: int) -> None:
+    import fitz
+
+    document = fitz.open()
+    for chunk in iter_chunks(rows, seed):
+        lines = (chunk['title'].fillna('') + '. ' + chunk['abstract'].fillna('')).tolist()
+        for start in range(0, len(lines), ROWS_PER_PDF_PAGE):
+            page = document.new_page()
+            page.insert_textbox(page.rect + (36, 36, -36, -36), "\n".join(lines[start:start + ROWS_PER_PDF_PAGE]),
+                                fontsize=7)
+    document.save(path, garbage=3, deflate=True)
+    document.close()
+
+
+def generate_corpus(out_dir: str, rows: int, seed: int = 0, formats=('csv', 'xlsx', 'pdf'),
+                    max_xlsx_rows: int = 1_000_000, max_pdf_rows: int = 20_000) -> dict:
+    """
+    Writes the corpus files into `out_dir`/corpus-<rows>-<seed> and returns their paths
+    keyed by format. Files generated earlier with the same parameters are reused.
+    """
+    corpus_dir = os.path.join(out_dir, f"corpus-{rows}-{seed}")
+    os.makedirs(corpus_dir, exist_ok=True)
+    writers = {
+        'csv': (write_csv, rows),
+        'xlsx': (write_xlsx, min(rows, max_xlsx_rows)),
+        'pdf': (write_pdf, min(rows, max_pdf_rows)),
+    }
+    manifest_path = os.path.join(corpus_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as file:
+            manifest = json.load(file)
+    paths = {}
+    for file_format in formats:
+        writer, format_rows = writers[file_format]
+        path = os.path.join(corpus_dir, f"corpus.{file_format}")
+        if manifest.get(file_format) != format_rows or not os.path.exists(path):
+            temp_path = os.path.join(corpus_dir, f"corpus.tmp.{file_format}")
+            writer(temp_path, format_rows, seed)
+            os.replace(temp_path, path)
+            manifest[file_format] = format_rows
+            with open(manifest_path, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file)
+        paths[file_format] = path
+    paths['rows'] = {file_format: manifest[file_format] for file_format in formats}
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--rows', type=int, help='Row count; overrides --size.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--formats', default='csv,xlsx,pdf')
+    parser.add_argument('--max-xlsx-rows', type=int, default=1_000_000)
+    parser.add_argument('--max-pdf-rows', type=int, default=20_000)
+    parser.add_argument('--out', default=os.path.join('data', 'bench'))
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out, args.rows or SIZES[args.size], args.seed, args.formats.split(','),
+                            args.max_xlsx_rows, args.max_pdf_rows)
+    for file_format, rows in paths['rows'].items():
+        print(f"{file_format:<5} {rows:>12,} rows  {paths[file_format]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Module: run_benchmarks.py
+Purpose: Runs the pipeline benchmark suite on a synthetic corpus and compares it with a baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --size medium
+    python benchmarks/run_benchmarks.py --size medium --save-baseline
+    python benchmarks/run_benchmarks.py --size small --only load_csv,clean --repeat 3
+
+    The corpus comes from corpus.py and is generated on first use. Every benchmark
+    runs in a fresh interpreter, so its peak memory (the growth of the peak RSS
+    while the measured code runs, plus the largest worker process) is not inflated by
+    earlier benchmarks. With --repeat, the fastest run and the highest peak are kept.
+
+    Benchmarks:
+        load_csv, load_csv_batches     CSV through DataLoader.load_data / iter_batches
+        load_xlsx, load_xlsx_batches   XLSX through DataLoader.load_data / iter_batches
+        load_pdf_pages                 PDF split per page, in-process
+        load_pdf_pages_parallel        PDF split per page with --workers processes
+        clean                          DataCleaner.clean_data on the CSV rows
+        render                         PromptTemplate.render_many in chunks of 100k rows
+        end_to_end                     Pipeline on --e2e-rows rows against the stub LLM server
+
+    The end-to-end benchmark uses the stub server from the test suite with
+    --latency seconds per request and an --error-rate fraction of HTTP 500s, which
+    the client retries. The server runs in its own process, so that its threads do
+    not compete with the pipeline for the GIL.
+
+    Results are compared with the baseline file (by default benchmarks/baseline.json,
+    keyed by corpus size, so baselines of several sizes live side by side). A
+    benchmark regresses when its rows/sec drops, or its peak memory grows, by more
+    than --tolerance; the script then exits with status 1. Baselines depend on the
+    machine, so record them with --save-baseline on the machine that runs the checks.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, os.pardir, 'src'))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from corpus import SIZES, generate_corpus  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported.
+    resource = None
+
+QUESTIONS = [f"Question {number}: does the abstract mention topic {number}?" for number in range(1, 11)]
+SCHEMA = {
+    'type': 'object',
+    'properties': {'topic': {'type': 'string'}, 'relevant': {'type': 'boolean'}},
+    'required': ['topic', 'relevant'],
+}
+BENCHMARKS = ('load_csv', 'load_csv_batches', 'load_xlsx', 'load_xlsx_batches', 'load_pdf_pages',
+              'load_pdf_pages_parallel', 'clean', 'render', 'end_to_end')
+# Peak memory below this many MB is too noisy to flag as a regression.
+MEMORY_SLACK_MB = 32
+
+
+def _peak_mb(who) -> float:
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _read_csv(spec: dict):
+    import pandas as pd
+    return pd.read_csv(spec['corpus']['csv'])
+
+
+def _template():
+    from prompt_builder.prompt_builder import PromptBuilder
+    return PromptBuilder().compile_template(QUESTIONS, SCHEMA, ['title', 'abstract'])
+
+
+def setup_benchmark(name: str, spec: dict):
+    """
+    Prepares the benchmark outside the measurement and returns a callable that runs
+    it and returns the number of corpus rows it processed.
+    """
+    from data_loader.data_loader import DataLoader
+
+    corpus = spec['corpus']
+    if name == 'load_csv':
+        return lambda: len(DataLoader(corpus['csv']).load_data())
+    if name == 'load_csv_batches':
+        return lambda: sum(len(batch) for batch in DataLoader(corpus['csv']).iter_batches(100_000))
+    if name == 'load_xlsx':
+        return lambda: len(DataLoader(corpus['xlsx']).load_data())
+    if name == 'load_xlsx_batches':
+        return lambda: sum(len(batch) for batch in DataLoader(corpus['xlsx']).iter_batches(100_000))
+    if name in ('load_pdf_pages', 'load_pdf_pages_parallel'):
+        workers = spec['workers'] if name == 'load_pdf_pages_parallel' else 1
+
+        def load_pdf():
+            DataLoader(corpus['pdf'], split_by='page', max_workers=workers).load_data()
+            return spec['rows']['pdf']
+        return load_pdf
+    if name == 'clean':
+        from data_cleaner.data_cleaner import DataCleaner
+        data = _read_csv(spec)
+
+        def clean():
+            DataCleaner().clean_data(data, ['title', 'abstract'])
+            return len(data)
+        return clean
+    if name == 'render':
+        data, template = _read_csv(spec), _template()
+
+        def render():
+            for offset in range(0, len(data), 100_000):
+                template.render_many(data.iloc[offset:offset + 100_000])
+            return len(data)
+        return render
+    if name == 'end_to_end':
+        return _setup_end_to_end(spec)
+    raise ValueError(f"Unknown benchmark '{name}'.")
+
+
+def _respond(prompt: str) -> str:
+    return json.dumps({'topic': 'benchmark', 'relevant': len(prompt) % 2 == 0})
+
+
+def _serve_stub(options: dict, base_urls, stop) -> None:
+    from tests.stub_llm_server import StubLLMServer
+
+    with StubLLMServer(responder=_respond, **options) as server:
+        base_urls.put(server.base_url)
+        stop.wait()
+
+
+@contextmanager
+def stub_server_process(**options):
+    """Runs a StubLLMServer in a separate process and yields its base URL."""
+    base_urls, stop = multiprocessing.Queue(), multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve_stub, args=(options, base_urls, stop), daemon=True)
+    process.start()
+    try:
+        yield base_urls.get(timeout=30)
+    finally:
+        stop.set()
+        process.join(timeout=10)
+
+
+def _setup_end_to_end(spec: dict):
+    from data_cleaner.data_cleaner import DataCleaner
+    from data_loader.data_loader import DataLoader
+    from data_saver.data_saver import DataSaver
+    from llm_model.llm_model import AsyncLLMClient
+    from pipeline.pipeline import Pipeline
+    from validator.validator import ResponseValidator
+
+    def run():
+        with stub_server_process(latency=spec['latency'], error_rate=spec['error_rate']) as base_url, \
+                tempfile.TemporaryDirectory() as output_dir:
+            client = AsyncLLMClient(base_url=base_url, max_concurrency=spec['concurrency'],
+                                    backoff_base=0.01, backoff_max=0.1)
+            pipeline = Pipeline(DataLoader(spec['e2e_csv']), DataCleaner(), _template(), client,
+                                ResponseValidator(SCHEMA), DataSaver(output_dir, csv_file='results.csv'),
+                                ['title', 'abstract'], 'stub-model', batch_size=1_000,
+                                cpu_workers=spec['workers'])
+            return pipeline.run()['rows_loaded']
+    return run
+
+
+def run_worker(name: str, spec: dict) -> dict:
+    """Runs one benchmark in this process and returns its measurements."""
+    benchmark = setup_benchmark(name, spec)
+    peak_before = _peak_mb(resource.RUSAGE_SELF) if resource else float('nan')
+    start = time.perf_counter()
+    rows = benchmark()
+    seconds = time.perf_counter() - start
+    peak_mb = _peak_mb(resource.RUSAGE_SELF) - peak_before if resource else float('nan')
+    child_peak_mb = _peak_mb(resource.RUSAGE_CHILDREN) if resource else float('nan')
+    return {'rows': rows, 'seconds': seconds, 'rows_per_sec': rows / seconds if seconds else 0.0,
+            'peak_mb': max(peak_mb, child_peak_mb)}
+
+
+def run_benchmark(name: str, spec: dict, repeat: int) -> dict:
+    """Runs the benchmark `repeat` times, each in a fresh interpreter."""
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', name,
+                                    '--spec', json.dumps(spec)], capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark {name} failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda result: result['seconds'])
+    return {**best, 'peak_mb': max(result['peak_mb'] for result in runs)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a message for every benchmark that regressed against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if result['rows_per_sec'] < reference['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rows_per_sec']:,.0f} rows/sec vs "
+                               f"{reference['rows_per_sec']:,.0f} in the baseline")
+        if result['peak_mb'] > max(reference['peak_mb'] * (1 + tolerance), reference['peak_mb'] + MEMORY_SLACK_MB):
+            regressions.append(f"{name}: peak {result['peak_mb']:,.0f} MB vs "
+                               f"{reference['peak_mb']:,.0f} MB in the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--rows', type=int, help='Corpus rows; overrides --size.')
+    parser.add_argument('--only', help='Comma-separated benchmarks to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=2, help='Processes of the parallel benchmarks.')
+    parser.add_argument('--e2e-rows', type=int, default=5_000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--corpus-dir', default=os.path.join('data', 'bench'))
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--output', help='Optional path of a JSON file with the results.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--spec', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, json.loads(args.spec))))
+        return
+
+    rows = args.rows or SIZES[args.size]
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    corpus = generate_corpus(args.corpus_dir, rows)
+    spec = {
+        'corpus': {file_format: os.path.abspath(corpus[file_format]) for file_format in ('csv', 'xlsx', 'pdf')},
+        'rows': corpus['rows'],
+        'e2e_csv': os.path.abspath(generate_corpus(args.corpus_dir, min(rows, args.e2e_rows), formats=('csv',))['csv']),
+        'workers': args.workers,
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'concurrency': args.concurrency,
+    }
+
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(name, spec, args.repeat)
+        result = results[name]
+        print(f"{name:<24} {result['rows']:>11,} rows  {result['seconds']:>8.2f} s  "
+              f"{result['rows_per_sec']:>12,.0f} rows/sec  {result['peak_mb']:>8,.0f} MB peak")
+
+    size_key = str(rows)
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            baselines = json.load(file)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({size_key: results}, file, indent=2, sort_keys=True)
+    if args.save_baseline:
+        baselines[size_key] = {**baselines.get(size_key, {}), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print(f"Saved baseline for {rows:,} rows to {args.baseline}")
+        return
+    if size_key not in baselines:
+        print(f"No baseline for {rows:,} rows in {args.baseline}; run with --save-baseline to record one.")
+        return
+    regressions = compare(results, baselines[size_key], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against the baseline (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+
+"""
+Module: cli.py
+Purpose: Command line entry point for running the pipeline from a config file.
+
+Commands:
+    run         Runs the pipeline described by the config file and prints the run summary.
+                PDF inputs with chunking.enabled go through the chunked map-reduce runner.
+    status      Prints how many rows of the run ledger are in each state.
+    distribute  Shards the input into work units in the shared distributed.work_dir.
+    work        Processes work units; run it on every node of a distributed run.
+    collect     Merges the results of the processed work units into the configured outputs.
+
+Usage:
+    python src/cli.py run --config config.yaml
+    python src/cli.py run --config config.yaml --batch-size 500 --profile pipeline.prof
+    python src/cli.py status --config config.yaml
+    python src/cli.py distribute --config config.yaml --shards 256
+    python src/cli.py work --config config.yaml --wait
+    python src/cli.py collect --config config.yaml
+
+    Only argparse is imported at startup. The pipeline modules, and through them
+    pandas, are imported once a command runs, and optional dependencies (PyMuPDF,
+    openpyxl, httpx, openai) only when the stage that needs them runs, so `--help`
+    and argument errors return immediately.
+"""
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description="Runs the text processing pipeline.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the pipeline described by a config file.")
+    run.add_argument('--config', default='config.yaml', help="Path of the YAML config (default: config.yaml).")
+    run.add_argument('--batch-size', type=int, help="Rows per batch; overrides pipeline.batch_size.")
+    run.add_argument('--no-resume', action='store_true', help="Process every row, ignoring the run ledger.")
+    run.add_argument('--profile', metavar='FILE', help="Write cProfile stats of the run to FILE.")
+
+    status = commands.add_parser('status', help="Show the row states recorded in the run ledger.")
+    status.add_argument('--config', default='config.yaml', help="Path of the YAML config (default: config.yaml).")
+
+    distribute = commands.add_parser('distribute', help="Shard the input into work units for distributed workers.")
+    distribute.add_argument('--config', default='config.yaml', help="Path of the YAML config (default: config.yaml).")
+    distribute.add_argument('--shards', type=int, help="Number of shards; overrides distributed.num_shards.")
+    distribute.add_argument('--batch-size', type=int, help="Rows per batch; overrides pipeline.batch_size.")
+
+    work = commands.add_parser('work', help="Process work units of a distributed run.")
+    work.add_argument('--config', default='config.yaml', help="Path of the YAML config (default: config.yaml).")
+    work.add_argument('--max-units', type=int, help="Stop after this many units.")
+    work.add_argument('--wait', action='store_true',
+                      help="Keep polling until every unit is finished, taking over expired leases.")
+
+    collect = commands.add_parser('collect', help="Merge the results of a distributed run into the outputs.")
+    collect.add_argument('--config', default='config.yaml', help="Path of the YAML config (default: config.yaml).")
+    return parser
+
+
+def load_prompt(config):
+    """
+    Compiles the prompt template and the response validator from the 'prompt_builder'
+    section: a question sheet, a JSON schema file and the input fields of the prompt.
+    """
+    from data_loader.data_loader import DataLoader
+    from prompt_builder.prompt_builder import PromptBuilder
+
+    questions_file = config.get_value('prompt_builder.questions_file')
+    schema_file = config.get_value('prompt_builder.schema_file')
+    if not questions_file or not schema_file:
+        raise ValueError("The config must set prompt_builder.questions_file and prompt_builder.schema_file.")
+    builder = PromptBuilder(sheet_name=config.get_value('prompt_builder.sheet_name'),
+                            question_column=config.get_value('prompt_builder.question_column', 'question'))
+    with open(schema_file, 'r', encoding='utf-8') as file:
+        schema = json.load(file)
+    is_pdf = DataLoader.is_pdf_input(config)
+    fields = config.get_value('prompt_builder.fields') or [
+        col for col in config.get_required_columns(is_pdf=is_pdf) if col not in ('id', 'map_id')]
+    template = builder.compile_template(builder.load_questions_from_excel(questions_file), schema, fields)
+    return template, builder.get_validator(schema)
+
+
+def run_command(args) -> int:
+    from config_loader.config_loader import ConfigLoader
+    from data_loader.data_loader import DataLoader
+    from pipeline.pipeline import Pipeline
+
+    config = ConfigLoader(args.config)
+    template, validator = load_prompt(config)
+    is_pdf = DataLoader.is_pdf_input(config)
+    if is_pdf and config.get_value('chunking.enabled', False):
+        return map_reduce_command(args, config, template, validator)
+    overrides = {}
+    if args.batch_size:
+        overrides['batch_size'] = args.batch_size
+    if args.no_resume:
+        overrides['ledger'] = None
+    if args.profile:
+        overrides['profile_file'] = args.profile
+    summary = Pipeline.from_config(config, template, validator, **overrides).run()
+    summary.pop('metrics', None)
+    print(json.dumps(summary, indent=2, default=str))
+    return 0
+
+
+def map_reduce_command(args, config, template, validator) -> int:
+    """
+    Runs PDF inputs page by page through the chunked map-reduce runner, saving every
+    document as soon as it is reduced. With pipeline.resume (and without --no-resume),
+    documents the run ledger records as saved are skipped.
+    """
+    from data_loader.data_loader import DataLoader
+    from data_saver.data_saver import DataSaver
+    from pipeline.map_reduce import MapReduceRunner
+    from pipeline.run_ledger import RunLedger
+
+    loader = DataLoader.from_config(config, split_by='page')
+    runner = MapReduceRunner.from_config(config, template, validator)
+    resume = config.get_value('pipeline.resume', False) and not args.no_resume
+    ledger = RunLedger.from_config(config) if resume else None
+    saver = DataSaver.from_config(config, resume=ledger is not None)
+    try:
+        counts = runner.save(loader.iter_batches(args.batch_size or config.get_value('pipeline.batch_size', 1_000)),
+                             saver, ledger)
+    finally:
+        if ledger is not None:
+            ledger.close()
+    print(json.dumps({**counts, 'outputs': saver.close()}, indent=2))
+    return 0
+
+
+def status_command(args) -> int:
+    from config_loader.config_loader import ConfigLoader
+    from pipeline.run_ledger import RunLedger
+
+    config = ConfigLoader(args.config)
+    ledger_path = os.path.join(config.get_output_path(), 'run_ledger.sqlite')
+    if not os.path.exists(ledger_path):
+        print(f"No run ledger found at {ledger_path}")
+        return 1
+    ledger = RunLedger(ledger_path)
+    try:
+        print(json.dumps(ledger.summary(), indent=2))
+    finally:
+        ledger.close()
+    return 0
+
+
+def distribute_command(args) -> int:
+    from config_loader.config_loader import ConfigLoader
+    from data_loader.data_loader import DataLoader
+    from pipeline.distributed import ShardCoordinator
+    from pipeline.work_queue import SQLiteWorkQueue
+
+    config = ConfigLoader(args.config)
+    is_pdf = DataLoader.is_pdf_input(config)
+    id_column = 'map_id' if is_pdf else 'id'
+    columns = config.get_required_columns(is_pdf=is_pdf)
+    coordinator = ShardCoordinator(SQLiteWorkQueue.from_config(config),
+                                   config.get_value('distributed.work_dir', 'data/work'),
+                                   args.shards or config.get_value('distributed.num_shards', 64))
+    columns = [id_column, *(col for col in columns if col != id_column)]
+    batches = DataLoader.from_config(config).iter_batches(
+        args.batch_size or config.get_value('pipeline.batch_size', 1_000), columns)
+    units = coordinator.submit(batches, id_column)
+    print(json.dumps({'units': len(units), 'rows': sum(units.values())}, indent=2))
+    return 0
+
+
+def work_command(args) -> int:
+    from config_loader.config_loader import ConfigLoader
+    from pipeline.distributed import ShardWorker
+
+    config = ConfigLoader(args.config)
+    template, validator = load_prompt(config)
+    worker = ShardWorker.from_config(config, template, validator)
+    counts = worker.run(max_units=args.max_units, wait=args.wait)
+    print(json.dumps({'worker': worker.worker_id, **counts, 'queue': worker.queue.summary()}, indent=2))
+    return 0
+
+
+def collect_command(args) -> int:
+    from config_loader.config_loader import ConfigLoader
+    from data_saver.data_saver import DataSaver
+    from pipeline.distributed import ShardCoordinator
+    from pipeline.work_queue import SQLiteWorkQueue
+
+    config = ConfigLoader(args.config)
+    queue = SQLiteWorkQueue.from_config(config)
+    if not queue.is_finished():
+        print(f"Units are still pending or leased: {json.dumps(queue.summary())}", file=sys.stderr)
+        return 1
+    coordinator = ShardCoordinator(queue, config.get_value('distributed.work_dir', 'data/work'))
+    summary = coordinator.collect(DataSaver.from_config(config, resume=False))
+    summary['failed_units'] = queue.failures()
+    print(json.dumps(summary, indent=2, default=str))
+    return 0 if not summary['failed_units'] else 1
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    commands = {'run': run_command, 'status': status_command, 'distribute': distribute_command,
+                'work': work_command, 'collect': collect_command}
+    try:
+        return commands[args.command](args)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
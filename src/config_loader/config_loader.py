@@ -84,6 +84,7 @@ class ConfigLoader(ConfigInterface):
         data_loader_config = self.get_value('data_loader', {})
         return {
             'file_path': data_loader_config.get('file_path'),
+            'sheet_name': data_loader_config.get('sheet_name') or self.get_value('input_paths.data_sheet_name'),
         }
 
     def get_output_path(self) -> str:
@@ -121,4 +122,10 @@ class ConfigLoader(ConfigInterface):
         else:
             required_cols_str = self.get_value('data_loader.required_tabular_columns', '')
             
-        return [col.strip() for col in required_cols_str.split(',') if col.strip()]
\ No newline at end of file
+        return [col.strip() for col in required_cols_str.split(',') if col.strip()]
+
+    def get_column_dtypes(self) -> Dict[str, str]:
+        """
+        Retrieves the dtypes to pin for tabular columns, keyed by column name.
+        """
+        return self.get_value('data_loader.column_dtypes', {}) or {}
@@ -0,0 +1,166 @@
+import importlib.util
+from typing import Iterable, Iterator, Tuple
+import numpy as np
+import pandas as pd
+from interfaces.data_cleaner_interface import DataCleanerInterface
+from data_cleaner.near_duplicates import MinHashLSH
+
+"""
+Module: data_cleaner.py
+Purpose: Implements the data cleaning stage of the pipeline.
+
+Classes:
+    DataCleaner: Vectorized implementation of the DataCleanerInterface.
+    SeenHashes: Set of 64-bit row hashes used to drop duplicates across batches.
+
+Usage:
+    Every cleaning step runs as a whole-column string kernel (pyarrow compute when
+    pyarrow is installed), never as a Python function applied row by row. clean_data()
+    fuses missing-value replacement and non-ASCII removal into a single pass per text
+    column, and clean_batches() applies the same steps to streamed chunks while
+    removing duplicates across chunk boundaries. Near-identical rows (e.g. the same
+    abstract with different whitespace or a changed sentence) can additionally be
+    removed with MinHash/LSH via remove_near_duplicates().
+"""
+
+NON_ASCII_PATTERN = r'[^\x00-\x7F]+'
+
+
+class SeenHashes:
+    """
+    A set of uint64 hashes stored as sorted runs whose sizes at least halve from one
+    run to the next, like a binary counter. Lookups binary-search the O(log n) runs
+    and every hash is merged O(log n) times, so neither grows with the number of
+    batches already seen, while memory stays at 8 bytes per hash.
+    """
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of the hashes already in the set."""
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Adds hashes that are not in the set yet."""
+        if not len(hashes):
+            return
+        self._runs.append(np.unique(hashes))
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]), kind='stable')
+
+
+class DataCleaner(DataCleanerInterface):
+    """
+    Cleans text columns with vectorized pandas/Arrow string operations.
+    """
+    def __init__(self, string_dtype: str = None):
+        """
+        Args:
+            string_dtype (str, optional): Dtype the text columns are converted to.
+                Defaults to 'string[pyarrow]' when pyarrow is installed, 'string' otherwise.
+        """
+        if string_dtype is None:
+            string_dtype = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'string'
+        self.string_dtype = string_dtype
+
+    def _strip_non_ascii(self, column: pd.Series) -> pd.Series:
+        """
+        Strips non-ASCII characters. The regex replacement is several times more
+        expensive than a regex search, so it only runs on the rows that need it.
+        """
+        needs_cleaning = column.str.contains(NON_ASCII_PATTERN, regex=True, na=False)
+        if not needs_cleaning.any():
+            return column
+        column = column.copy()
+        column[needs_cleaning] = column[needs_cleaning].str.replace(NON_ASCII_PATTERN, '', regex=True)
+        return column
+
+    def _clean_column(self, column: pd.Series) -> pd.Series:
+        """Fills missing values and strips non-ASCII characters in one pass over the column."""
+        return self._strip_non_ascii(column.astype(self.string_dtype).fillna(''))
+
+    def clean_data(self, data: pd.DataFrame, text_columns: list[str]) -> pd.DataFrame:
+        """Runs all cleaning steps: one fused pass per text column, then duplicate removal."""
+        data = data.assign(**{col: self._clean_column(data[col]) for col in text_columns})
+        return self.remove_duplicates(data)
+
+    def replace_missing_values(self, data: pd.DataFrame, text_columns: list[str]) -> pd.DataFrame:
+        return data.assign(**{col: data[col].astype(self.string_dtype).fillna('') for col in text_columns})
+
+    def remove_duplicates(self, data: pd.DataFrame) -> pd.DataFrame:
+        return data.drop_duplicates()
+
+    def remove_non_ascii_characters(self, data: pd.DataFrame, text_columns: list[str]) -> pd.DataFrame:
+        return data.assign(**{col: self._strip_non_ascii(data[col].astype(self.string_dtype))
+                              for col in text_columns})
+
+    def clean_batches(self, batches: Iterable[pd.DataFrame], text_columns: list[str]) -> Iterator[pd.DataFrame]:
+        """
+        Cleans streamed chunks (e.g. from DataLoader.iter_batches) one at a time.
+
+        Duplicates are removed across chunks by remembering a 64-bit hash of every
+        row already emitted, so memory grows by 8 bytes per unique row rather than
+        with the size of the text.
+        """
+        seen = SeenHashes()
+        for batch in batches:
+            batch = batch.assign(**{col: self._clean_column(batch[col]) for col in text_columns})
+            batch, seen = self.drop_seen_rows(batch, seen)
+            if not batch.empty:
+                yield batch
+
+    @staticmethod
+    def drop_seen_rows(batch: pd.DataFrame, seen: SeenHashes) -> Tuple[pd.DataFrame, SeenHashes]:
+        """
+        Drops rows duplicated within the batch or whose hash is in `seen`. Returns the
+        remaining rows and `seen`, updated with their hashes.
+        """
+        hashes = pd.util.hash_pandas_object(batch, index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~seen.contains(hashes)
+        seen.add(hashes[keep])
+        return batch[keep], seen
+
+    def _row_texts(self, data: pd.DataFrame, text_columns: list[str]) -> list[str]:
+        """Joins the text columns of every row into a single string."""
+        combined = data[text_columns[0]].astype(self.string_dtype).fillna('')
+        for col in text_columns[1:]:
+            combined = combined + ' ' + data[col].astype(self.string_dtype).fillna('')
+        return combined.tolist()
+
+    def find_near_duplicates(self, data: pd.DataFrame, text_columns: list[str],
+                             threshold: float = 0.8, **lsh_options) -> pd.DataFrame:
+        """
+        Reports clusters of near-duplicate rows.
+
+        Args:
+            data (pd.DataFrame): The input DataFrame.
+            text_columns (list[str]): Columns whose joined text is compared.
+            threshold (float): Minimum estimated Jaccard similarity of word shingles.
+            **lsh_options: Extra options for MinHashLSH (num_perm, bands, shingle_size).
+
+        Returns:
+            pd.DataFrame: One row per clustered row with its index label (`row`), the
+                label of the cluster's first row (`cluster_id`) and `cluster_size`.
+        """
+        lsh = MinHashLSH(threshold=threshold, **lsh_options)
+        lsh.add(self._row_texts(data, text_columns))
+        return lsh.report(data.index)
+
+    def remove_near_duplicates(self, data: pd.DataFrame, text_columns: list[str],
+                               threshold: float = 0.8, **lsh_options) -> pd.DataFrame:
+        """
+        Keeps only the first row of every near-duplicate cluster.
+        Arguments are the same as for find_near_duplicates().
+        """
+        lsh = MinHashLSH(threshold=threshold, **lsh_options)
+        lsh.add(self._row_texts(data, text_columns))
+        roots = lsh.clusters()
+        return data[roots == np.arange(len(roots))]
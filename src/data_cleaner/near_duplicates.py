@@ -0,0 +1,190 @@
+from itertools import chain
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+
+"""
+Module: near_duplicates.py
+Purpose: Implements near-duplicate detection for text rows with MinHash and LSH.
+
+Classes:
+    MinHashLSH: Computes MinHash signatures and groups near-duplicate rows into clusters.
+
+Usage:
+    Each text is lower-cased, split into word shingles and summarised by a MinHash
+    signature whose agreement rate estimates the Jaccard similarity of the shingle
+    sets. Locality-sensitive hashing over bands of the signatures only compares rows
+    that share a bucket, so the cost grows with the number of rows rather than with
+    the number of row pairs. Signatures are computed for whole batches of texts at
+    once with numpy, and add() can be called repeatedly with streamed chunks.
+"""
+
+# Odd multipliers combining consecutive word hashes into a shingle hash.
+_SHINGLE_MULTIPLIERS = np.random.default_rng(0).integers(0, 1 << 62, size=16, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+class MinHashLSH:
+    """
+    Finds clusters of near-duplicate texts whose estimated Jaccard similarity is at
+    least `threshold`.
+    """
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: Optional[int] = None,
+                 shingle_size: int = 3, seed: int = 1, max_comparisons: int = 64):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of near-duplicates.
+            num_perm (int): Number of hash permutations in each signature.
+            bands (int, optional): Number of LSH bands; must divide `num_perm`. Defaults
+                to the band count whose similarity cut-off is just below `threshold`.
+            shingle_size (int): Number of consecutive words per shingle (at most 16).
+            seed (int): Seed of the hash permutations.
+            max_comparisons (int): Bucket members each text is verified against. Buckets
+                of up to `max_comparisons + 1` texts compare every pair; in larger ones
+                each text is compared with the next `max_comparisons` members.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1].")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands or self._optimal_bands(threshold, num_perm)
+        if num_perm % self.bands:
+            raise ValueError("bands must divide num_perm.")
+        self.rows_per_band = num_perm // self.bands
+        if not 1 <= shingle_size <= len(_SHINGLE_MULTIPLIERS):
+            raise ValueError(f"shingle_size must be between 1 and {len(_SHINGLE_MULTIPLIERS)}.")
+        self.shingle_size = shingle_size
+        if max_comparisons < 1:
+            raise ValueError("max_comparisons must be at least 1.")
+        self.max_comparisons = max_comparisons
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: the high 32 bits of (a * h + b) mod 2**64, with odd a.
+        self._a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._signatures = []
+        self._blank = []
+
+    @staticmethod
+    def _optimal_bands(threshold: float, num_perm: int) -> int:
+        """
+        Picks the band count whose S-curve midpoint (1/b)**(1/r) sits closest to
+        90% of the threshold, favouring recall; false candidates are filtered later.
+        """
+        divisors = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+        return min(divisors, key=lambda b: abs((1 / b) ** (b / num_perm) - 0.9 * threshold))
+
+    def signatures(self, texts: Iterable[str], max_words: int = 65_536) -> np.ndarray:
+        """
+        Computes the MinHash signatures of the texts as a (len(texts), num_perm)
+        uint32 array. Texts are processed in blocks of about `max_words` words, and
+        all shingles of a block are hashed and permuted in single numpy operations.
+        """
+        blocks, token_lists, word_count = [], [], 0
+        for text in texts:
+            tokens = str(text).lower().split()
+            token_lists.append(tokens)
+            word_count += len(tokens)
+            if word_count >= max_words:
+                blocks.append(self._minhash(token_lists))
+                token_lists, word_count = [], 0
+        if token_lists:
+            blocks.append(self._minhash(token_lists))
+        if not blocks:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        return np.concatenate(blocks)
+
+    def _minhash(self, token_lists: list[list[str]]) -> np.ndarray:
+        """
+        Returns the signatures of a block of tokenised texts.
+
+        Word hashes are laid out per text followed by `shingle_size` zero pads, so
+        the shingle starting at any word is a fixed linear combination of the next
+        `shingle_size` slots; texts shorter than a shingle become a single padded shingle.
+        """
+        size = self.shingle_size
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        words = np.fromiter(chain.from_iterable(token_lists), dtype=object, count=int(lengths.sum()))
+        word_hashes = pd.util.hash_array(words) if len(words) else np.empty(0, dtype=np.uint64)
+
+        padded_lengths = lengths + size
+        padded_offsets = np.concatenate(([0], np.cumsum(padded_lengths)[:-1]))
+        word_offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        padded = np.zeros(int(padded_lengths.sum()), dtype=np.uint64)
+        padded[np.repeat(padded_offsets - word_offsets, lengths) + np.arange(len(word_hashes))] = word_hashes
+
+        window_count = len(padded) - size + 1
+        combined = np.zeros(window_count, dtype=np.uint64)
+        for position in range(size):
+            combined += padded[position:position + window_count] * _SHINGLE_MULTIPLIERS[position]
+
+        shingle_counts = np.maximum(lengths - size + 1, 1)
+        shingle_offsets = np.concatenate(([0], np.cumsum(shingle_counts)[:-1]))
+        starts = np.repeat(padded_offsets - shingle_offsets, shingle_counts) + np.arange(shingle_counts.sum())
+        shingles = combined[starts] >> np.uint64(32)
+
+        permuted = ((self._a[:, None] * shingles + self._b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        return np.minimum.reduceat(permuted, shingle_offsets, axis=1).T
+
+    def add(self, texts: Iterable[str]) -> None:
+        """
+        Adds a batch of texts to the index, after any previously added texts. Empty
+        and missing texts have no shingles and are never clustered.
+        """
+        texts = list(texts)
+        self._blank.append(np.fromiter((text is None or not str(text).split() for text in texts),
+                                       dtype=bool, count=len(texts)))
+        self._signatures.append(self.signatures(texts))
+
+    def clusters(self) -> np.ndarray:
+        """
+        Returns, for every added text, the position of the first text of its
+        near-duplicate cluster (its own position when it has no near-duplicate).
+        """
+        signatures = (np.concatenate(self._signatures) if self._signatures
+                      else np.empty((0, self.num_perm), dtype=np.uint32))
+        blank = np.concatenate(self._blank) if self._blank else np.empty(0, dtype=bool)
+        parent = np.arange(len(signatures))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for band in range(self.bands):
+            columns = signatures[:, band * self.rows_per_band:(band + 1) * self.rows_per_band]
+            keys = np.ascontiguousarray(columns).view(np.dtype((np.void, columns.shape[1] * 4))).ravel()
+            _, buckets, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            shared = counts[buckets] > 1
+            if not shared.any():
+                continue
+            # Blank texts all share the signature of the empty shingle; keep them apart.
+            members = np.flatnonzero(shared & ~blank)
+            order = np.argsort(buckets[members], kind='stable')
+            members = members[order]
+            splits = np.flatnonzero(np.diff(buckets[members])) + 1
+            for group in np.split(members, splits):
+                # Verify pairs at every offset within the cap, so the clusters do not
+                # depend on which member of the bucket happens to come first.
+                group_signatures = signatures[group]
+                for offset in range(1, min(len(group), self.max_comparisons + 1)):
+                    similarity = (group_signatures[:-offset] == group_signatures[offset:]).mean(axis=1)
+                    for position in np.flatnonzero(similarity >= self.threshold):
+                        root_a, root_b = find(group[position]), find(group[position + offset])
+                        if root_a != root_b:
+                            parent[max(root_a, root_b)] = min(root_a, root_b)
+        return np.array([find(node) for node in range(len(parent))], dtype=np.int64)
+
+    def report(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """
+        Returns one row per text that belongs to a cluster of two or more texts, with
+        its `cluster_id` (the index label of the cluster's first text) and `cluster_size`.
+        """
+        roots = self.clusters()
+        labels = pd.Index(index) if index is not None else pd.RangeIndex(len(roots))
+        sizes = np.bincount(roots, minlength=len(roots))[roots] if len(roots) else roots
+        duplicated = sizes > 1
+        return pd.DataFrame({
+            'row': labels[duplicated],
+            'cluster_id': labels[roots[duplicated]],
+            'cluster_size': sizes[duplicated],
+        })
@@ -1,7 +1,14 @@
 import pandas as pd
-import fitz
+import glob
+import importlib.util
 import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Optional
 from interfaces.data_loader_interface import DataLoaderInterface
+from data_loader.extraction_cache import ExtractionCache
+from metrics.metrics import MetricsRecorder
 
 """
 Module: data_loader.py
@@ -14,18 +21,125 @@ Usage:
     This module is responsible for reading datasets (e.g., from CSV files, excel files or pdfs) and
     validating that the necessary columns exist in the data. It adheres to the
     DataLoaderInterface to maintain consistency.
+
+    PyMuPDF (fitz) and openpyxl are imported where they are used, so that runs and
+    commands that never touch a PDF or a workbook do not pay for importing them.
 """
 
 
 class TabularDataLoader(DataLoaderInterface):
     """
     This class   loads data from both Excel (.xlsx) and CSV (.csv) files.
+
+    Excel files are read with the engine selected by `excel_engine`:
+        'auto':     'calamine' when python-calamine is installed, 'openpyxl' otherwise.
+        'calamine': pandas' Rust-based calamine reader.
+        'openpyxl': rows streamed through openpyxl's read-only mode, without ever
+                    materialising the whole sheet as cell objects.
+        'pandas':   plain pd.read_excel with its default engine.
+
+    Only 'openpyxl' streams Excel files in constant memory: with 'calamine' and
+    'pandas', iter_batches() reads the whole sheet before slicing it into batches.
     """
-    def __init__(self, file_path: str):
+    EXCEL_ENGINES = ('auto', 'calamine', 'openpyxl', 'pandas')
+
+    def __init__(self, file_path: str, sheet_name: Optional[str] = None,
+                 usecols: Optional[list[str]] = None, dtype: Optional[dict] = None,
+                 excel_engine: str = 'auto'):
+        """
+        Args:
+            file_path (str): The path to the CSV or Excel file.
+            sheet_name (str, optional): Excel sheet to read. Defaults to the first sheet.
+            usecols (list[str], optional): Only these columns are parsed.
+            dtype (dict, optional): Column name to dtype (e.g. 'string[pyarrow]',
+                'category'), applied while parsing instead of inferring types.
+            excel_engine (str): Engine used for Excel files (see class docstring).
+        """
+        if excel_engine not in self.EXCEL_ENGINES:
+            raise ValueError(f"Unsupported Excel engine '{excel_engine}'. Use one of {', '.join(self.EXCEL_ENGINES)}.")
         self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.usecols = list(usecols) if usecols else None
+        self.dtype = dict(dtype) if dtype else None
+        self.excel_engine = excel_engine
         self._data = None
         self.file_type = self._get_file_type()
 
+    def _resolve_excel_engine(self) -> str:
+        """Resolves 'auto' to the fastest available engine for the file."""
+        engine = self.excel_engine
+        if engine == 'auto':
+            engine = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+        if engine == 'openpyxl' and not self.file_path.lower().endswith('.xlsx'):
+            # openpyxl cannot read legacy .xls workbooks.
+            engine = 'pandas'
+        return engine
+
+    def _read_excel(self, **kwargs) -> pd.DataFrame:
+        """Reads the sheet with pandas, using calamine when it was selected."""
+        engine = self._resolve_excel_engine()
+        return pd.read_excel(self.file_path,
+                             sheet_name=self.sheet_name if self.sheet_name is not None else 0,
+                             usecols=self.usecols,
+                             dtype=self.dtype,
+                             engine='calamine' if engine == 'calamine' else None,
+                             **kwargs)
+
+    def _read_csv(self, **kwargs):
+        """Reads the CSV file, pushing the column projection and dtypes down into the parser."""
+        return pd.read_csv(self.file_path, usecols=self.usecols, dtype=self.dtype, **kwargs)
+
+    def _apply_dtypes(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Casts streamed chunks to the configured dtypes."""
+        if not self.dtype:
+            return data
+        return data.astype({col: dtype for col, dtype in self.dtype.items() if col in data.columns})
+
+    @staticmethod
+    def _header_names(header) -> list[str]:
+        """Names the header cells of an openpyxl row, calling empty cells 'Unnamed: i' like pandas."""
+        return [str(name) if name is not None else f"Unnamed: {index}" for index, name in enumerate(header)]
+
+    def _iter_excel_chunks(self, batch_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Streams the sheet through openpyxl's read-only mode, building a DataFrame
+        of at most `batch_size` rows at a time and keeping only the projected columns.
+        """
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[self.sheet_name] if self.sheet_name is not None else workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = self._header_names(header)
+            columns = self.usecols or header
+            missing_columns = [col for col in columns if col not in header]
+            if missing_columns:
+                raise ValueError(f"Columns not found in sheet: {', '.join(missing_columns)}")
+            indices = [header.index(col) for col in columns]
+            blank_record = (None,) * len(indices)
+            records = []
+            blank_rows = 0
+            for row in rows:
+                # Like pandas, keep blank rows between data rows but drop trailing ones
+                if all(value is None for value in row):
+                    blank_rows += 1
+                    continue
+                record = tuple(row[index] if index < len(row) else None for index in indices)
+                for record in [blank_record] * blank_rows + [record]:
+                    records.append(record)
+                    if len(records) == batch_size:
+                        yield self._apply_dtypes(pd.DataFrame.from_records(records, columns=columns))
+                        records = []
+                blank_rows = 0
+            if records:
+                yield self._apply_dtypes(pd.DataFrame.from_records(records, columns=columns))
+        finally:
+            workbook.close()
+
     def _get_file_type(self) -> str:
         """Determines the file type based on the file extension."""
         if self.file_path.lower().endswith('.csv'):
@@ -39,9 +153,13 @@ class TabularDataLoader(DataLoaderInterface):
         """Loads the dataset from the specified file based on its type."""
         try:
             if self.file_type == 'csv':
-                self._data = pd.read_csv(self.file_path)
+                self._data = self._read_csv()
             elif self.file_type == 'excel':
-                self._data = pd.read_excel(self.file_path)
+                if self._resolve_excel_engine() == 'openpyxl':
+                    chunks = list(self._iter_excel_chunks(50_000))
+                    self._data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=self.usecols)
+                else:
+                    self._data = self._read_excel()
             else:
                 raise ValueError("Unsupported file format.")
             print(f"Successfully loaded data from {self.file_path}")
@@ -56,6 +174,81 @@ class TabularDataLoader(DataLoaderInterface):
             print(f"An unexpected error occurred: {e}")
             return pd.DataFrame()
 
+    def read_header(self) -> list[str]:
+        """Reads only the column names of the file, without loading any rows."""
+        if self.file_type == 'csv':
+            return list(pd.read_csv(self.file_path, nrows=0).columns)
+        elif self.file_type == 'excel':
+            if self._resolve_excel_engine() == 'openpyxl':
+                import openpyxl
+
+                workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+                try:
+                    sheet = workbook[self.sheet_name] if self.sheet_name is not None else workbook.worksheets[0]
+                    header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+                    return self._header_names(header)
+                finally:
+                    workbook.close()
+            return list(pd.read_excel(self.file_path, nrows=0,
+                                      sheet_name=self.sheet_name if self.sheet_name is not None else 0).columns)
+        raise ValueError("Unsupported file format.")
+
+    def validate_header(self, required_columns: list[str]) -> bool:
+        """
+        Validates the required columns against the file header alone, so the
+        check costs the same for a 3-row file and a 20M-row file.
+        """
+        try:
+            columns = self.read_header()
+        except FileNotFoundError:
+            print(f"Error: The file {self.file_path} was not found.")
+            return False
+        except ValueError as ve:
+            print(f"File loading error: {ve}")
+            return False
+        missing_columns = [col for col in required_columns if col not in columns]
+        if missing_columns:
+            print(f"Validation failed. Missing columns: {', '.join(missing_columns)}")
+            return False
+        print("All required columns are present.")
+        return True
+
+    def iter_batches(self, batch_size: int = 100_000,
+                     required_columns: Optional[list[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams the dataset as DataFrame chunks of at most `batch_size` rows.
+
+        Unlike load_data(), nothing is kept in `self._data`, so memory use is
+        bounded by the batch size rather than by the file size, except for Excel
+        files read with the 'calamine' or 'pandas' engine, which are read whole.
+
+        Args:
+            batch_size (int): Maximum number of rows per yielded chunk.
+            required_columns (list[str], optional): Columns that must be present
+                in the header (e.g. ConfigLoader.get_required_columns()).
+
+        Raises:
+            ValueError: If the batch size is not positive, the format is not
+                supported or required columns are missing from the header.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        if required_columns and not self.validate_header(required_columns):
+            raise ValueError(f"Required columns are missing from {self.file_path}.")
+        if self.file_type == 'csv':
+            with self._read_csv(chunksize=batch_size) as reader:
+                for chunk in reader:
+                    yield chunk
+        elif self.file_type == 'excel':
+            if self._resolve_excel_engine() == 'openpyxl':
+                yield from self._iter_excel_chunks(batch_size)
+            else:
+                data = self._read_excel()
+                for start in range(0, len(data), batch_size):
+                    yield data.iloc[start:start + batch_size]
+        else:
+            raise ValueError("Unsupported file format.")
+
     def validate_columns(self, required_columns: list[str]) -> bool:
         if self._data is None or self._data.empty:
             print("No data loaded to validate.")
@@ -73,22 +266,126 @@ class TabularDataLoader(DataLoaderInterface):
         return self._data if self._data is not None else pd.DataFrame()
 
 
+def _extract_page_range(file_path: str, start: int, stop: int) -> list[str]:
+    """Extracts the text of pages [start, stop) of a PDF. Runs inside worker processes."""
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        return [doc[page_number].get_text() for page_number in range(start, stop)]
+
+
 class PDFDataLoader(DataLoaderInterface):
     """
     A concrete implementation for loading data from a PDF file.
+
+    By default the whole document becomes a single row (`map_id`, `text`). With
+    `split_by='page'` or `split_by='window'` one row is emitted per page or per
+    window of `window_size` pages, carrying the 1-based `page` number (and
+    `page_end` for windows). Setting `max_workers` above 1 extracts page ranges
+    across a process pool.
     """
-    def __init__(self, file_path: str):
+    SPLIT_MODES = ('document', 'page', 'window')
+
+    def __init__(self, file_path: str, split_by: str = 'document', window_size: int = 1,
+                 max_workers: int = 1, pages_per_task: Optional[int] = None):
+        if split_by not in self.SPLIT_MODES:
+            raise ValueError(f"Unsupported split mode '{split_by}'. Use one of {', '.join(self.SPLIT_MODES)}.")
+        if window_size <= 0 or max_workers <= 0:
+            raise ValueError("window_size and max_workers must be positive integers.")
+        if pages_per_task is not None and pages_per_task < 1:
+            raise ValueError("pages_per_task must be a positive integer.")
         self.file_path = file_path
+        self.split_by = split_by
+        self.window_size = window_size if split_by == 'window' else 1
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
         self._data = None
 
+    @property
+    def map_id(self) -> str:
+        file_name = os.path.basename(self.file_path)
+        map_id, _ = os.path.splitext(file_name)
+        return map_id
+
+    def _page_ranges(self, page_count: int) -> list[tuple[int, int]]:
+        """
+        Splits the document into contiguous page ranges, one per worker task.
+        Ranges are aligned to the window size so no window straddles two tasks.
+        """
+        size = self.pages_per_task or -(-page_count // (self.max_workers * 4))
+        size = max(self.window_size, -(-size // self.window_size) * self.window_size)
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+    def _iter_page_texts(self) -> Iterator[list[str]]:
+        """
+        Yields the page texts of each page range in document order. At most
+        2 * max_workers ranges are in flight, which bounds memory on large files.
+        """
+        import fitz
+
+        with fitz.open(self.file_path) as doc:
+            page_count = doc.page_count
+        ranges = self._page_ranges(page_count)
+        if self.max_workers == 1 or len(ranges) == 1:
+            for start, stop in ranges:
+                yield _extract_page_range(self.file_path, start, stop)
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(executor.submit(_extract_page_range, self.file_path, start, stop))
+                if len(pending) >= 2 * self.max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _iter_rows(self) -> Iterator[dict]:
+        """Yields one row per page or per page window, in document order."""
+        map_id = self.map_id
+        page_number = 1
+        for texts in self._iter_page_texts():
+            for offset in range(0, len(texts), self.window_size):
+                window = texts[offset:offset + self.window_size]
+                row = {'map_id': map_id, 'page': page_number, 'text': "".join(window)}
+                if self.split_by == 'window':
+                    row['page_end'] = page_number + len(window) - 1
+                yield row
+                page_number += len(window)
+
+    def iter_batches(self, batch_size: int = 1_000,
+                     required_columns: Optional[list[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams the document as DataFrame chunks of at most `batch_size` rows.
+        In 'document' mode the single document row is yielded on its own.
+
+        Raises:
+            ValueError: If the batch size is not positive or required columns
+                are not produced by the configured split mode.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        columns = {'document': ['map_id', 'text'], 'page': ['map_id', 'page', 'text'],
+                   'window': ['map_id', 'page', 'page_end', 'text']}[self.split_by]
+        missing_columns = [col for col in required_columns or [] if col not in columns]
+        if missing_columns:
+            raise ValueError(f"Required columns are missing: {', '.join(missing_columns)}")
+        if self.split_by == 'document':
+            text_content = "".join(text for texts in self._iter_page_texts() for text in texts)
+            yield pd.DataFrame([{'map_id': self.map_id, 'text': text_content}])
+            return
+        rows = []
+        for row in self._iter_rows():
+            rows.append(row)
+            if len(rows) == batch_size:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+
     def load_data(self) -> pd.DataFrame:
         try:
-            doc = fitz.open(self.file_path)
-            text_content = "".join([page.get_text() for page in doc])
-            doc.close()
-            file_name = os.path.basename(self.file_path)
-            map_id, _ = os.path.splitext(file_name)
-            self._data = pd.DataFrame([{'map_id': map_id, 'text': text_content}])
+            batches = list(self.iter_batches())
+            self._data = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
             print(f"Successfully loaded data from {self.file_path}")
             return self._data
         except FileNotFoundError:
@@ -118,24 +415,175 @@ class PDFDataLoader(DataLoaderInterface):
 class DataLoader(DataLoaderInterface):
     """
     Handles dataset loading for various file types (CSV, XLSX, PDF) and
-    validates the presence of required columns.
+    validates the presence of required columns. A directory or glob pattern is
+    handed to MultiFileDataLoader.
     """
-    def __init__(self, file_path: str):
+    # Extensions whose extraction is slow enough to be worth caching as Parquet.
+    CACHED_EXTENSIONS = ('.pdf', '.xls', '.xlsx')
+
+    def __init__(self, file_path: str, cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 1024 ** 3, metrics: Optional[MetricsRecorder] = None,
+                 **loader_options):
+        """
+        Args:
+            file_path (str): The path to the input file.
+            cache_dir (str, optional): Directory of the extraction cache. PDF and Excel
+                inputs are cached there as Parquet when set.
+            cache_max_bytes (int): Size budget of the extraction cache.
+            metrics (MetricsRecorder, optional): Recorder of the 'load' stage and of
+                the 'extraction_cache' hits and misses.
+            **loader_options: Extra keyword arguments forwarded to the selected
+                loader (e.g. `split_by` and `max_workers` for PDFs).
+        """
         self.file_path = file_path
+        self.metrics = metrics or MetricsRecorder()
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.loader_options = loader_options
         self._loader = self._get_appropriate_loader()
+        self._cache = None
+        if cache_dir and self.file_path.lower().endswith(self.CACHED_EXTENSIONS):
+            self._cache = ExtractionCache(cache_dir, cache_max_bytes)
         
+    @classmethod
+    def from_config(cls, config, **overrides) -> 'DataLoader':
+        """
+        Builds a DataLoader from the 'data_loader' section of a ConfigInterface.
+
+        With `project_columns` enabled, tabular inputs parse only the required
+        columns, and `column_dtypes` pins their dtypes instead of inferring them.
+        Keyword arguments override the configured loader options.
+        """
+        file_path = config.get_input_paths()['file_path']
+        tabular_options = {
+            'sheet_name': config.get_input_paths().get('sheet_name'),
+            'dtype': config.get_column_dtypes() or None,
+            'excel_engine': config.get_value('data_loader.excel_engine', 'auto'),
+        }
+        if config.get_value('data_loader.project_columns', False):
+            tabular_options['usecols'] = config.get_required_columns(is_pdf=False)
+        pdf_options = {
+            'split_by': config.get_value('data_loader.pdf_split_by', 'document'),
+            'window_size': config.get_value('data_loader.pdf_window_size', 1),
+            'max_workers': config.get_value('data_loader.max_workers', 1),
+        }
+        cache_options = {
+            'cache_dir': config.get_value('data_loader.cache_dir'),
+            'cache_max_bytes': (config.get_value('data_loader.cache_max_mb') or 1024) * 1024 ** 2,
+        }
+        if cls._is_multi_source(file_path):
+            options = {'tabular_options': tabular_options, 'pdf_options': pdf_options,
+                       'max_workers': config.get_value('data_loader.max_workers')}
+        elif file_path.lower().endswith('.pdf'):
+            options = pdf_options
+        else:
+            options = tabular_options
+        return cls(file_path, **{**cache_options, **options, **overrides})
+
+    @classmethod
+    def is_pdf_input(cls, config) -> bool:
+        """
+        Whether the configured input is PDF text rather than tabular rows, which decides
+        the id column and the required columns. `data_loader.input_type` ('pdf' or
+        'tabular') decides when set. Otherwise a single file is judged by its extension,
+        and a directory or glob pattern is PDF when every file it matches is a PDF.
+
+        Raises:
+            ValueError: If `input_type` is neither 'pdf' nor 'tabular'.
+        """
+        input_type = config.get_value('data_loader.input_type')
+        if input_type:
+            if input_type not in ('pdf', 'tabular'):
+                raise ValueError(f"Unsupported input_type '{input_type}'. Use pdf or tabular.")
+            return input_type == 'pdf'
+        file_path = config.get_input_paths()['file_path']
+        if cls._is_multi_source(file_path):
+            files = MultiFileDataLoader(file_path).resolve_files()
+            return bool(files) and all(path.lower().endswith('.pdf') for path in files)
+        return file_path.lower().endswith('.pdf')
+
+    @staticmethod
+    def _is_multi_source(file_path: str) -> bool:
+        """
+        Whether the path is a directory or a glob pattern rather than a single file. An
+        existing file is never a pattern, even if its name contains '[' or '*'.
+        """
+        if os.path.isfile(file_path):
+            return False
+        return os.path.isdir(file_path) or any(char in file_path for char in '*?[')
+
     def _get_appropriate_loader(self):
         """Returns the correct loader instance based on the file extension."""
-        if self.file_path.lower().endswith(('.csv', '.xls', '.xlsx')):
-            return TabularDataLoader(self.file_path)
+        if self._is_multi_source(self.file_path):
+            return MultiFileDataLoader(self.file_path, cache_dir=self.cache_dir,
+                                       cache_max_bytes=self.cache_max_bytes, **self.loader_options)
+        elif self.file_path.lower().endswith(('.csv', '.xls', '.xlsx')):
+            return TabularDataLoader(self.file_path, **self.loader_options)
         elif self.file_path.lower().endswith('.pdf'):
-            return PDFDataLoader(self.file_path)
+            return PDFDataLoader(self.file_path, **self.loader_options)
         else:
             raise ValueError("Unsupported file format. Please provide a .csv, .xlsx, or .pdf file.")
 
     def load_data(self) -> pd.DataFrame:
-        """Loads data using the selected loader."""
-        return self._loader.load_data()
+        """Loads data using the selected loader, going through the extraction cache if enabled."""
+        start = time.perf_counter()
+        data = self._load_data()
+        self.metrics.record_stage('load', time.perf_counter() - start, len(data))
+        return data
+
+    def _cache_key(self) -> Optional[str]:
+        """Returns the extraction cache key of the input, or None without a cache or file."""
+        if self._cache is None:
+            return None
+        try:
+            return self._cache.make_key(self.file_path, {'loader': type(self._loader).__name__, **self.loader_options})
+        except FileNotFoundError:
+            return None
+
+    def _load_data(self) -> pd.DataFrame:
+        key = self._cache_key()
+        if key is None:
+            return self._loader.load_data()
+        data = self._cache.get(key)
+        self.metrics.increment('extraction_cache.misses' if data is None else 'extraction_cache.hits')
+        if data is not None:
+            self._loader._data = data
+            print(f"Loaded cached extraction of {self.file_path}")
+            return data
+        data = self._loader.load_data()
+        if not data.empty:
+            self._cache.put(key, data)
+        return data
+
+    def iter_batches(self, batch_size: int = 100_000,
+                     required_columns: Optional[list[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams the data in bounded-size chunks using the selected loader. With an
+        extraction cache, an unchanged input is streamed from its cached Parquet file,
+        and a miss stores the streamed batches for the next run.
+        """
+        if not hasattr(self._loader, 'iter_batches'):
+            raise ValueError(f"Streaming is not supported for {self.file_path}.")
+        key = self._cache_key()
+        if key is None:
+            return self._loader.iter_batches(batch_size, required_columns)
+        cached = self._cache.get_batches(key, batch_size)
+        self.metrics.increment('extraction_cache.misses' if cached is None else 'extraction_cache.hits')
+        if cached is None:
+            return self._cache.put_batches(key, self._loader.iter_batches(batch_size, required_columns))
+        return self._iter_cached(cached, batch_size, required_columns)
+
+    def _iter_cached(self, cached: Iterator[pd.DataFrame], batch_size: int,
+                     required_columns: Optional[list[str]]) -> Iterator[pd.DataFrame]:
+        """Yields the cached batches after checking them for the required columns."""
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        print(f"Streaming cached extraction of {self.file_path}")
+        for batch in cached:
+            missing_columns = [col for col in required_columns or [] if col not in batch.columns]
+            if missing_columns:
+                raise ValueError(f"Required columns are missing: {', '.join(missing_columns)}")
+            yield batch
 
     def validate_columns(self, required_columns: list[str]) -> bool:
         """Validates columns using the selected loader."""
@@ -143,4 +591,146 @@ class DataLoader(DataLoaderInterface):
 
     def get_data(self) -> pd.DataFrame:
         """Returns the data from the selected loader."""
-        return self._loader.get_data()
\ No newline at end of file
+        return self._loader.get_data()
+
+
+def _load_file(file_path: str, loader_options: dict) -> pd.DataFrame:
+    """Loads a single file and tags its rows with their source. Runs inside worker processes."""
+    data = DataLoader(file_path, **loader_options).load_data()
+    if not data.empty:
+        data['source_file'] = file_path
+    return data
+
+
+class MultiFileDataLoader(DataLoaderInterface):
+    """
+    Loads every CSV, XLSX and PDF file found in a directory, a glob pattern or an
+    explicit list of paths, concurrently in a process pool. Each row keeps its
+    provenance in a `source_file` column.
+    """
+    SUPPORTED_EXTENSIONS = ('.csv', '.xls', '.xlsx', '.pdf')
+
+    def __init__(self, source, max_workers: Optional[int] = None, recursive: bool = False,
+                 tabular_options: Optional[dict] = None, pdf_options: Optional[dict] = None,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 1024 ** 3):
+        """
+        Args:
+            source (str | list[str]): A directory, a glob pattern or a list of file paths.
+            max_workers (int, optional): Size of the process pool. Defaults to the CPU count;
+                1 loads the files sequentially in the current process.
+            recursive (bool): Whether directories are searched recursively.
+            tabular_options (dict, optional): Options forwarded to TabularDataLoader.
+            pdf_options (dict, optional): Options forwarded to PDFDataLoader.
+            cache_dir (str, optional): Directory of the shared extraction cache.
+            cache_max_bytes (int): Size budget of the extraction cache.
+        """
+        self.source = source
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.recursive = recursive
+        self.tabular_options = tabular_options or {}
+        self.pdf_options = pdf_options or {}
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self._data = None
+
+    def resolve_files(self) -> list[str]:
+        """Returns the sorted list of supported files described by the source."""
+        if isinstance(self.source, (list, tuple)):
+            candidates = list(self.source)
+        elif os.path.isdir(self.source):
+            if self.recursive:
+                candidates = [os.path.join(root, name)
+                              for root, _, names in os.walk(self.source) for name in names]
+            else:
+                candidates = [os.path.join(self.source, name) for name in os.listdir(self.source)]
+        else:
+            candidates = glob.glob(self.source, recursive=self.recursive)
+        return sorted(path for path in candidates
+                      if os.path.isfile(path) and path.lower().endswith(self.SUPPORTED_EXTENSIONS))
+
+    def _options_for(self, file_path: str) -> dict:
+        options = self.pdf_options if file_path.lower().endswith('.pdf') else self.tabular_options
+        return {'cache_dir': self.cache_dir, 'cache_max_bytes': self.cache_max_bytes, **options}
+
+    def iter_frames(self, ordered: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Yields one DataFrame per successfully loaded file. With `ordered=False`
+        frames are yielded as soon as their file finishes loading. At most
+        2 * max_workers files are in flight, and a frame is released once it has
+        been yielded, so memory is bounded by the files in flight.
+        """
+        files = self.resolve_files()
+        if self.max_workers == 1 or len(files) <= 1:
+            for file_path in files:
+                data = _load_file(file_path, self._options_for(file_path))
+                if not data.empty:
+                    yield data
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for file_path in files:
+                pending.append(executor.submit(_load_file, file_path, self._options_for(file_path)))
+                while len(pending) >= 2 * self.max_workers:
+                    yield from self._take_finished(pending, ordered)
+            while pending:
+                yield from self._take_finished(pending, ordered)
+
+    @staticmethod
+    def _take_finished(pending: deque, ordered: bool) -> Iterator[pd.DataFrame]:
+        """
+        Removes finished futures from `pending` and yields their non-empty frames: the
+        oldest one when `ordered`, otherwise every future done by then.
+        """
+        if ordered:
+            finished = [pending.popleft()]
+        else:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pending.remove(future)
+        for future in finished:
+            data = future.result()
+            if not data.empty:
+                yield data
+
+    def iter_batches(self, batch_size: int = 100_000,
+                     required_columns: Optional[list[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams the loaded files as DataFrame chunks of at most `batch_size` rows.
+        Files missing any of the required columns are skipped.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer.")
+        for data in self.iter_frames(ordered=False):
+            missing_columns = [col for col in required_columns or [] if col not in data.columns]
+            if missing_columns:
+                print(f"Skipping {data['source_file'].iat[0]}. Missing columns: {', '.join(missing_columns)}")
+                continue
+            for start in range(0, len(data), batch_size):
+                yield data.iloc[start:start + batch_size]
+
+    def load_data(self) -> pd.DataFrame:
+        """Loads all files and concatenates them in file order."""
+        try:
+            frames = list(self.iter_frames())
+            self._data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            print(f"Successfully loaded {len(frames)} file(s) from {self.source}")
+            return self._data
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            return pd.DataFrame()
+
+    def validate_columns(self, required_columns: list[str]) -> bool:
+        if self._data is None or self._data.empty:
+            print("No data loaded to validate.")
+            return False
+        missing_columns = [col for col in required_columns if col not in self._data.columns]
+        if missing_columns:
+            print(f"Validation failed. Missing columns: {', '.join(missing_columns)}")
+            return False
+        print("All required columns are present.")
+        return True
+
+    def get_data(self) -> pd.DataFrame:
+        if self._data is None:
+            print("Data has not been loaded yet. Please call load_data() first.")
+        return self._data if self._data is not None else pd.DataFrame()
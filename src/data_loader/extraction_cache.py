@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional
+import pandas as pd
+
+"""
+Module: extraction_cache.py
+Purpose: Implements an on-disk cache for extracted datasets.
+
+Classes:
+    ExtractionCache: Stores extracted DataFrames as Parquet files keyed by input content.
+
+Usage:
+    Extracting text with PyMuPDF or parsing workbooks with openpyxl is far slower than
+    reading a columnar file. DataLoader uses this cache so that unchanged PDF and Excel
+    inputs are read back from Parquet instead of being extracted again. Entries are keyed
+    by a hash of the file content plus the loader options, and the cache directory is
+    kept under a size budget by evicting the least recently used entries. Streamed
+    loads go through get_batches() and put_batches(), so neither a hit nor a miss
+    holds the whole extraction in memory.
+"""
+
+# Bump when the extraction output format changes, so stale entries are never reused.
+CACHE_VERSION = 1
+
+
+class ExtractionCache:
+    """
+    A size-bounded, least-recently-used cache of extracted DataFrames stored as Parquet.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries. Created if missing.
+            max_bytes (int): Upper bound on the total size of the cache entries.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_digest(file_path: str, block_size: int = 1024 * 1024) -> str:
+        """Returns the BLAKE2b hex digest of the file content."""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def make_key(self, file_path: str, options: Optional[dict] = None) -> str:
+        """Builds the cache key from the file content and the loader options."""
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'content': self.file_digest(file_path),
+            'options': options or {},
+        }, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns the cached DataFrame for the key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            data = pd.read_parquet(path)
+            # The modification time records the last use and drives LRU eviction.
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def get_batches(self, key: str, batch_size: int) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Returns an iterator over the cached DataFrame in chunks of at most `batch_size`
+        rows, read from the Parquet file without loading it whole, or None on a miss.
+        """
+        import pyarrow.parquet as pq
+
+        path = self._entry_path(key)
+        try:
+            parquet_file = pq.ParquetFile(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+        return (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size))
+
+    def put_batches(self, key: str, batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Passes the batches through while writing them to a new entry, which is stored
+        only once all of them were written. If a batch cannot be written (e.g. its
+        types differ from the first batch), the entry is dropped and the batches still
+        pass through; if the caller stops early, nothing is stored.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        writer, failed = None, False
+        try:
+            for batch in batches:
+                if not failed:
+                    try:
+                        table = pa.Table.from_pandas(batch, preserve_index=False)
+                        writer = writer or pq.ParquetWriter(temp_path, table.schema)
+                        writer.write_table(table)
+                    except Exception as e:
+                        print(f"Could not write cache entry for {key}: {e}")
+                        failed = True
+                yield batch
+            if writer is not None:
+                writer.close()
+                writer = None
+                if not failed:
+                    os.replace(temp_path, self._entry_path(key))
+                    self.evict()
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def put(self, key: str, data: pd.DataFrame) -> None:
+        """Stores the DataFrame under the key and evicts old entries if over budget."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            data.to_parquet(temp_path)
+            os.replace(temp_path, self._entry_path(key))
+        except Exception as e:
+            print(f"Could not write cache entry for {key}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits its size budget."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.parquet'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self) -> None:
+        """Removes all cache entries."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.parquet'):
+                os.remove(entry.path)
@@ -0,0 +1,279 @@
+import glob
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional
+import pandas as pd
+from interfaces.data_saver_interface import DataSaverInterface
+from metrics.metrics import MetricsRecorder
+
+"""
+Module: data_saver.py
+Purpose: Implements the streaming, append-only saver for pipeline results.
+
+Classes:
+    DataSaver: Writes results incrementally to a Parquet dataset and exports CSV/XLSX.
+
+Usage:
+    Results are appended batch by batch and flushed every `row_group_size` rows as a new
+    Parquet part file, optionally under hive-style partition directories (col=value/).
+    Every file is written to a temporary path and renamed into place, so a crash never
+    leaves a truncated file and every flushed part survives it. Memory stays bounded by
+    the row group size. On close(), the CSV and Excel outputs are produced by streaming
+    the part files.
+
+        saver = DataSaver.from_config(config)
+        for batch in results:
+            saver.append(batch)
+        saver.close()
+"""
+
+EXCEL_MAX_ROWS = 1_048_576
+_PART_PATTERN = re.compile(r'part-(\d+)\.parquet$')
+_PARTITION_UNSAFE = re.compile(r'[\\/]')
+
+
+def _atomic_path(file_path: str) -> str:
+    """Creates an empty temporary file next to `file_path` and returns its path."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix='.tmp')
+    os.close(fd)
+    return temp_path
+
+
+class DataSaver(DataSaverInterface):
+    """
+    Appends result batches to a Parquet dataset and exports it to CSV and Excel.
+    """
+    def __init__(self, output_dir: str, dataset_name: str = 'results', row_group_size: int = 50_000,
+                 partition_cols: Optional[List[str]] = None, csv_file: Optional[str] = None,
+                 excel_file: Optional[str] = None, metrics: Optional[MetricsRecorder] = None,
+                 resume: bool = False):
+        """
+        Args:
+            output_dir (str): Directory holding the dataset and the exported files.
+            dataset_name (str): Name of the Parquet dataset directory inside output_dir.
+            row_group_size (int): Rows buffered before a part file is flushed.
+            partition_cols (list[str], optional): Columns used for partition directories.
+            csv_file (str, optional): File name of the CSV export written on close().
+            excel_file (str, optional): File name of the Excel export written on close().
+            metrics (MetricsRecorder, optional): Recorder of the 'save.*' stages.
+            resume (bool): Append to the parts already in the dataset. Otherwise they are
+                removed before the first flush, so a rerun does not duplicate rows.
+        """
+        self.output_dir = output_dir
+        self.dataset_dir = os.path.join(output_dir, dataset_name)
+        self.row_group_size = row_group_size
+        self.partition_cols = list(partition_cols or [])
+        self.csv_file = csv_file
+        self.excel_file = excel_file
+        self._buffer = []
+        self._buffered_rows = 0
+        self._schema = None
+        self.metrics = metrics or MetricsRecorder()
+        self.resume = resume
+        self._started = False
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        # Continue numbering after existing parts, so a resumed run appends instead of overwriting.
+        existing = [int(match.group(1)) for match in map(_PART_PATTERN.search, self.part_files()) if match]
+        self._next_part = max(existing, default=-1) + 1
+
+    @classmethod
+    def from_config(cls, config, metrics: Optional[MetricsRecorder] = None,
+                    resume: Optional[bool] = None) -> 'DataSaver':
+        """
+        Builds a saver from the 'output' section of a ConfigInterface. Unless `resume`
+        is given, it appends to an existing dataset when pipeline.resume is set.
+        """
+        if resume is None:
+            resume = config.get_value('pipeline.resume', False)
+        return cls(config.get_output_path(),
+                   dataset_name=config.get_value('output.parquet_dataset', 'results'),
+                   row_group_size=config.get_value('output.row_group_size', 50_000),
+                   partition_cols=config.get_value('output.partition_cols'),
+                   csv_file=config.get_value('output.output_csv_file'),
+                   excel_file=config.get_value('output.output_excel_file'), metrics=metrics, resume=resume)
+
+    def save_to_csv(self, data: pd.DataFrame, file_path: str) -> None:
+        """Saves the DataFrame to a CSV file atomically (temporary file plus rename)."""
+        temp_path = _atomic_path(file_path)
+        try:
+            data.to_csv(temp_path, index=False)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        print(f"Successfully saved data to {file_path}")
+
+    def append(self, data: pd.DataFrame) -> List[str]:
+        """
+        Buffers a batch of results and flushes once `row_group_size` rows are buffered.
+
+        Returns:
+            list[str]: The part files written by the flush, or an empty list while the
+                rows are only buffered. A flush writes every buffered row.
+        """
+        if data.empty:
+            return []
+        self._buffer.append(data)
+        self._buffered_rows += len(data)
+        if self._buffered_rows >= self.row_group_size:
+            return self.flush()
+        return []
+
+    def _write_part(self, data: pd.DataFrame, directory: str) -> str:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(data, preserve_index=False).replace_schema_metadata(None)
+        if self._schema is None:
+            # A resumed saver starts from the schema of the parts already written.
+            self._schema = self._existing_schema()
+        # Widen the schema instead of forcing the first batch's types on later ones: a column
+        # that was all null takes the type of its first values, int64 becomes double for NaN.
+        self._schema = table.schema if self._schema is None else pa.unify_schemas(
+            [self._schema, table.schema], promote_options='permissive')
+        table = table.cast(pa.schema([self._schema.field(name) for name in table.column_names]))
+        file_path = os.path.join(directory, f"part-{self._next_part:05d}.parquet")
+        temp_path = _atomic_path(file_path)
+        try:
+            pq.write_table(table, temp_path, row_group_size=self.row_group_size)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return file_path
+
+    def _existing_schema(self):
+        """Returns the unified schema of the part files on disk, or None if there are none."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schemas = [pq.read_schema(path).remove_metadata() for path in self.part_files()]
+        return pa.unify_schemas(schemas, promote_options='permissive') if schemas else None
+
+    def _start(self) -> None:
+        """Removes the parts of an earlier run before the first write, unless resuming."""
+        if self._started:
+            return
+        self._started = True
+        if not self.resume:
+            for path in self.part_files():
+                os.remove(path)
+            self._next_part = 0
+
+    def flush(self) -> List[str]:
+        """Writes the buffered rows as new part files and returns their paths."""
+        self._start()
+        if not self._buffer:
+            return []
+        start = time.perf_counter()
+        data = pd.concat(self._buffer, ignore_index=True)
+        self._buffer, self._buffered_rows = [], 0
+        if not self.partition_cols:
+            written = [self._write_part(data, self.dataset_dir)]
+        else:
+            written = []
+            for values, partition in data.groupby(self.partition_cols, dropna=False, sort=True):
+                values = values if isinstance(values, tuple) else (values,)
+                directory = os.path.join(self.dataset_dir, *(
+                    f"{col}={_PARTITION_UNSAFE.sub('_', str(value))}" for col, value in zip(self.partition_cols, values)))
+                os.makedirs(directory, exist_ok=True)
+                written.append(self._write_part(partition.drop(columns=self.partition_cols), directory))
+        self._next_part += 1
+        self.metrics.record_stage('save.flush', time.perf_counter() - start, len(data))
+        return written
+
+    def part_files(self) -> List[str]:
+        """Returns the dataset's part files in write order."""
+        parts = glob.glob(os.path.join(self.dataset_dir, '**', 'part-*.parquet'), recursive=True)
+        return sorted(parts, key=lambda path: (int(_PART_PATTERN.search(path).group(1)), path))
+
+    def _iter_parts(self):
+        """Yields each part as a DataFrame, restoring partition columns from its directory."""
+        for path in self.part_files():
+            data = pd.read_parquet(path)
+            relative = os.path.relpath(os.path.dirname(path), self.dataset_dir)
+            for segment in ([] if relative == os.curdir else relative.split(os.sep)):
+                col, _, value = segment.partition('=')
+                data[col] = value
+            yield data
+
+    def columns(self) -> List[str]:
+        """Returns the columns of the dataset: the unified part schema, then the partition columns."""
+        schema = self._existing_schema()
+        names = list(schema.names) if schema is not None else []
+        return names + [col for col in self.partition_cols if col not in names]
+
+    def read_dataset(self) -> pd.DataFrame:
+        """Reads all flushed results back into memory."""
+        parts = list(self._iter_parts())
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def export_csv(self, file_path: str) -> str:
+        """
+        Streams the dataset into a CSV file, one part at a time, written atomically.
+        Every part is aligned to the dataset columns, since later parts may add columns.
+        """
+        temp_path = _atomic_path(file_path)
+        start, rows = time.perf_counter(), 0
+        columns = self.columns()
+        try:
+            header = True
+            for data in self._iter_parts():
+                data.reindex(columns=columns).to_csv(temp_path, mode='a', header=header, index=False)
+                header = False
+                rows += len(data)
+            os.replace(temp_path, file_path)
+            self.metrics.record_stage('save.export_csv', time.perf_counter() - start, rows)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return file_path
+
+    def export_excel(self, file_path: str) -> Optional[str]:
+        """
+        Streams the dataset into an Excel file through openpyxl's write-only mode,
+        written atomically. Skipped when the rows exceed Excel's sheet limit.
+        """
+        import openpyxl
+        import pyarrow.parquet as pq
+
+        total_rows = sum(pq.ParquetFile(path).metadata.num_rows for path in self.part_files())
+        if total_rows + 1 > EXCEL_MAX_ROWS:
+            print(f"Skipping Excel export: {total_rows} rows exceed the sheet limit of {EXCEL_MAX_ROWS - 1}.")
+            return None
+        temp_path = _atomic_path(file_path)
+        start = time.perf_counter()
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('results')
+        try:
+            header = self.columns()
+            sheet.append(header)
+            for data in self._iter_parts():
+                data = data.reindex(columns=header)
+                data = data.astype(object).where(data.notna(), None)
+                for row in data.itertuples(index=False, name=None):
+                    sheet.append(row)
+            workbook.save(temp_path)
+            os.replace(temp_path, file_path)
+            self.metrics.record_stage('save.export_excel', time.perf_counter() - start, total_rows)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return file_path
+
+    def close(self) -> Dict[str, str]:
+        """Flushes the remaining rows and writes the configured CSV and Excel exports."""
+        self.flush()
+        outputs = {'parquet': self.dataset_dir}
+        if self.csv_file:
+            outputs['csv'] = self.export_csv(os.path.join(self.output_dir, self.csv_file))
+        if self.excel_file:
+            excel_path = self.export_excel(os.path.join(self.output_dir, self.excel_file))
+            if excel_path:
+                outputs['excel'] = excel_path
+        print(f"Successfully saved results to {', '.join(outputs.values())}")
+        return outputs
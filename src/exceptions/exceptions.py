@@ -0,0 +1,30 @@
+"""
+Module: exceptions.py
+Purpose: Defines the custom exceptions raised by the pipeline components.
+
+Classes:
+    LLMRequestError: Raised when a request to an LLM provider fails for good.
+    SchemaViolationError: Raised when a partial response can no longer match its schema.
+"""
+
+from typing import Optional
+
+
+class LLMRequestError(Exception):
+    """
+    Raised when an LLM request fails with a non-retryable error or keeps failing
+    after all retries.
+    """
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SchemaViolationError(ValueError):
+    """
+    Raised while a response is streamed in, as soon as the text received so far
+    cannot be completed into a value that matches the schema.
+    """
+    def __init__(self, message: str, path: str = '$'):
+        super().__init__(f"{path}: {message}")
+        self.path = path
@@ -0,0 +1,57 @@
+"""
+Module: batch_provider_interface.py
+Purpose: Defines the interface for offline batch LLM providers. This ensures all
+         batch providers adhere to a standard structure for submitting request
+         files and retrieving their results.
+
+Classes:
+    BatchProviderInterface: Abstract base class for batch providers.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class BatchProviderInterface(ABC):
+    """
+    Abstract base class for providers that process JSONL files of requests offline.
+    """
+
+    @abstractmethod
+    def submit(self, shard_path: str) -> str:
+        """
+        Submits a JSONL file of requests for batch processing.
+
+        Args:
+            shard_path (str): Path of the JSONL file, one request per line.
+
+        Returns:
+            str: The provider's identifier of the batch.
+        """
+        pass
+
+    @abstractmethod
+    def get_status(self, batch_id: str) -> str:
+        """
+        Fetches the status of a batch.
+
+        Args:
+            batch_id (str): The batch identifier returned by submit().
+
+        Returns:
+            str: 'completed', 'failed', 'expired', 'cancelled' or an in-progress status.
+        """
+        pass
+
+    @abstractmethod
+    def download_results(self, batch_id: str, output_path: str) -> str:
+        """
+        Downloads the results of a completed batch as a JSONL file.
+
+        Args:
+            batch_id (str): The batch identifier returned by submit().
+            output_path (str): Where the results file should be written.
+
+        Returns:
+            str: The path of the results file.
+        """
+        pass
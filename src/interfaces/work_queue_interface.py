@@ -0,0 +1,102 @@
+"""
+Module: work_queue_interface.py
+Purpose: Defines the interface for work queues of distributed runs. This ensures all
+         queue backends adhere to a standard structure for submitting work units,
+         leasing them to workers and recording their results.
+
+Classes:
+    WorkUnit: A leased unit of work.
+    WorkQueueInterface: Abstract base class for work queue backends.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+
+class WorkUnit(NamedTuple):
+    unit_id: str
+    payload: Dict[str, Any]
+    attempt: int
+    worker: str
+
+
+class WorkQueueInterface(ABC):
+    """
+    Abstract base class for queues that lease work units to workers. A lease expires
+    unless it is renewed, after which the unit can be leased again, so the units of a
+    crashed worker are retried by the others.
+    """
+
+    @abstractmethod
+    def put(self, units: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Adds work units; units whose id is already queued are left unchanged.
+
+        Args:
+            units (iterable): (unit id, JSON-serialisable payload) pairs.
+
+        Returns:
+            int: The number of units added.
+        """
+        pass
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkUnit]:
+        """
+        Leases the next available unit: a pending one, or one whose lease expired.
+
+        Args:
+            worker (str): Identifier of the leasing worker.
+            lease_seconds (float): Seconds until the lease expires unless renewed.
+
+        Returns:
+            WorkUnit: The leased unit, or None if no unit is available.
+        """
+        pass
+
+    @abstractmethod
+    def renew(self, unit: WorkUnit, lease_seconds: float) -> bool:
+        """
+        Extends a lease.
+
+        Returns:
+            bool: False if the lease was lost to another worker or the unit is finished.
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, unit: WorkUnit, result: Dict[str, Any]) -> bool:
+        """
+        Records the result of a leased unit.
+
+        Returns:
+            bool: False if the lease was lost, in which case the result is discarded.
+        """
+        pass
+
+    @abstractmethod
+    def fail(self, unit: WorkUnit, error: str) -> None:
+        """
+        Records a failed attempt; the unit is retried until it runs out of attempts.
+        """
+        pass
+
+    @abstractmethod
+    def summary(self) -> Dict[str, int]:
+        """
+        Returns:
+            dict: The number of units in each state.
+        """
+        pass
+
+    def is_finished(self) -> bool:
+        """Whether every unit is done or failed."""
+        counts = self.summary()
+        return not counts.get('pending') and not counts.get('leased')
+
+    @abstractmethod
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields (unit id, result) of every completed unit, in unit id order.
+        """
+        pass
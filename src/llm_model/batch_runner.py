@@ -0,0 +1,243 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from interfaces.batch_provider_interface import BatchProviderInterface
+
+"""
+Module: batch_runner.py
+Purpose: Implements the batch execution mode for LLM calls.
+
+Classes:
+    BatchRunner: Builds JSONL request shards, submits them and joins the results back.
+    LocalBatchProvider: File-based fake provider that answers shards locally.
+    OpenAIBatchProvider: Provider backed by the OpenAI Batch API.
+
+Usage:
+    Instead of one interactive call per row, all prompts of a run are written to
+    provider-format JSONL shards whose `custom_id` is the row id. The shards are
+    submitted to a batch endpoint, and the result files are streamed back line by
+    line and joined onto the source DataFrame by id. Batch mode is not used by the
+    pipeline or the CLI; run it directly on a DataFrame that already holds the prompts.
+
+        runner = BatchRunner(OpenAIBatchProvider(), "data/output/batches")
+        results = runner.run(data, prompt_column="prompt", id_column="id", model="gpt-4o-mini")
+"""
+
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class LocalBatchProvider(BatchProviderInterface):
+    """
+    A batch provider that processes shards on the local filesystem, for tests and
+    dry runs. Each request is answered by `responder(prompt) -> str`.
+    """
+    def __init__(self, work_dir: str, responder: Callable[[str], str] = lambda prompt: f"echo: {prompt}"):
+        self.work_dir = work_dir
+        self.responder = responder
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _batch_dir(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, batch_id)
+
+    def submit(self, shard_path: str) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        os.makedirs(self._batch_dir(batch_id))
+        shutil.copyfile(shard_path, os.path.join(self._batch_dir(batch_id), 'input.jsonl'))
+        return batch_id
+
+    def get_status(self, batch_id: str) -> str:
+        output_path = os.path.join(self._batch_dir(batch_id), 'output.jsonl')
+        if not os.path.exists(output_path):
+            self._process(batch_id, output_path)
+        return 'completed'
+
+    def _process(self, batch_id: str, output_path: str) -> None:
+        with open(os.path.join(self._batch_dir(batch_id), 'input.jsonl'), encoding='utf-8') as source, \
+                open(output_path, 'w', encoding='utf-8') as target:
+            for line in source:
+                request = json.loads(line)
+                content = self.responder(request['body']['messages'][-1]['content'])
+                target.write(json.dumps({
+                    'id': f"batch_req_{uuid.uuid4().hex}",
+                    'custom_id': request['custom_id'],
+                    'response': {'status_code': 200, 'body': {
+                        'model': request['body']['model'],
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                     'finish_reason': 'stop'}]}},
+                    'error': None,
+                }) + '\n')
+
+    def download_results(self, batch_id: str, output_path: str) -> str:
+        shutil.copyfile(os.path.join(self._batch_dir(batch_id), 'output.jsonl'), output_path)
+        return output_path
+
+
+class OpenAIBatchProvider(BatchProviderInterface):
+    """
+    Submits shards to the OpenAI Batch API. Requires the `openai` package.
+    """
+    def __init__(self, api_key: Optional[str] = None, completion_window: str = '24h'):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key)
+        self.completion_window = completion_window
+
+    def submit(self, shard_path: str) -> str:
+        with open(shard_path, 'rb') as file:
+            uploaded = self.client.files.create(file=file, purpose='batch')
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint='/v1/chat/completions',
+                                           completion_window=self.completion_window)
+        return batch.id
+
+    def get_status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download_results(self, batch_id: str, output_path: str) -> str:
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, 'wb') as target:
+            # Requests that failed validation are reported in a separate error file.
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    target.write(self.client.files.content(file_id).read())
+        return output_path
+
+
+class BatchRunner:
+    """
+    Runs the prompts of a DataFrame through a BatchProviderInterface.
+    """
+    def __init__(self, provider: BatchProviderInterface, batch_dir: str,
+                 max_requests_per_shard: int = 50_000, max_bytes_per_shard: int = 190 * 1024 ** 2):
+        """
+        Args:
+            provider (BatchProviderInterface): Where the shards are submitted.
+            batch_dir (str): Directory for the shards, results and run manifest.
+            max_requests_per_shard (int): Request limit of a single shard.
+            max_bytes_per_shard (int): Size limit of a single shard file.
+        """
+        self.provider = provider
+        self.batch_dir = batch_dir
+        self.max_requests_per_shard = max_requests_per_shard
+        self.max_bytes_per_shard = max_bytes_per_shard
+        os.makedirs(batch_dir, exist_ok=True)
+
+    def build_shards(self, data: pd.DataFrame, prompt_column: str, id_column: str, model: str,
+                     temperature: float = 0.5, max_tokens: int = 500) -> List[str]:
+        """
+        Serializes one chat completion request per row into JSONL shards, using the
+        row id as `custom_id` so results can be matched back regardless of order.
+
+        Raises:
+            ValueError: If the ids are missing or not unique.
+        """
+        ids = data[id_column].astype(str)
+        if data[id_column].isna().any() or ids.duplicated().any():
+            raise ValueError(f"Column '{id_column}' must hold unique, non-missing ids for batch mode.")
+        shards, shard, shard_requests, shard_bytes = [], None, 0, 0
+        try:
+            for custom_id, prompt in zip(ids, data[prompt_column]):
+                line = (json.dumps({
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {'model': model, 'messages': [{'role': 'user', 'content': prompt}],
+                             'temperature': temperature, 'max_tokens': max_tokens},
+                }, ensure_ascii=False) + '\n').encode('utf-8')
+                if shard is None or shard_requests == self.max_requests_per_shard \
+                        or shard_bytes + len(line) > self.max_bytes_per_shard:
+                    if shard is not None:
+                        shard.close()
+                    shards.append(os.path.join(self.batch_dir, f"shard-{len(shards):05d}.jsonl"))
+                    shard, shard_requests, shard_bytes = open(shards[-1], 'wb'), 0, 0
+                shard.write(line)
+                shard_requests += 1
+                shard_bytes += len(line)
+        finally:
+            if shard is not None:
+                shard.close()
+        return shards
+
+    def submit(self, shards: List[str]) -> Dict[str, str]:
+        """Submits the shards and records the batch ids in the run manifest."""
+        batches = {shard: self.provider.submit(shard) for shard in shards}
+        with open(os.path.join(self.batch_dir, 'manifest.json'), 'w', encoding='utf-8') as file:
+            json.dump({'batches': batches}, file, indent=2)
+        return batches
+
+    def wait(self, batch_ids: List[str], poll_interval: float = 60.0,
+             timeout: Optional[float] = None) -> Dict[str, str]:
+        """
+        Polls the batches until all of them reach a terminal status.
+
+        Raises:
+            TimeoutError: If the batches are still running after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        statuses = {}
+        while True:
+            for batch_id in batch_ids:
+                if statuses.get(batch_id) not in TERMINAL_STATUSES:
+                    statuses[batch_id] = self.provider.get_status(batch_id)
+            if all(status in TERMINAL_STATUSES for status in statuses.values()):
+                return statuses
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Batches still running after {timeout} seconds: {statuses}")
+            time.sleep(poll_interval)
+
+    def download(self, batch_ids: List[str]) -> List[str]:
+        """Downloads the result file of every batch into the batch directory."""
+        return [self.provider.download_results(batch_id, os.path.join(self.batch_dir, f"{batch_id}-results.jsonl"))
+                for batch_id in batch_ids]
+
+    @staticmethod
+    def iter_results(result_paths: List[str]) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Streams (custom_id, content, error) tuples from the result files, one line at a time."""
+        for path in result_paths:
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    response = result.get('response') or {}
+                    error = result.get('error')
+                    content = None
+                    if response.get('status_code') == 200:
+                        try:
+                            content = response['body']['choices'][0]['message']['content']
+                        except (KeyError, IndexError, TypeError):
+                            error = f"Unexpected response format: {line[:200]}"
+                    elif error is None:
+                        error = f"HTTP {response.get('status_code')}: {json.dumps(response.get('body'))[:200]}"
+                    yield result['custom_id'], content, json.dumps(error) if isinstance(error, dict) else error
+
+    def reconcile(self, data: pd.DataFrame, id_column: str, result_paths: List[str],
+                  response_column: str = 'response') -> pd.DataFrame:
+        """
+        Joins the batch results onto the source rows by id, adding the response text
+        and an `error` column. Rows without a result keep missing values.
+        """
+        results = pd.DataFrame(self.iter_results(result_paths), columns=['custom_id', response_column, 'error'])
+        results = results.drop_duplicates('custom_id', keep='last').set_index('custom_id')
+        ids = data[id_column].astype(str)
+        return data.assign(**{
+            response_column: ids.map(results[response_column]).to_numpy(),
+            'error': ids.map(results['error']).to_numpy(),
+        })
+
+    def run(self, data: pd.DataFrame, prompt_column: str, id_column: str, model: str,
+            temperature: float = 0.5, max_tokens: int = 500, poll_interval: float = 60.0,
+            timeout: Optional[float] = None) -> pd.DataFrame:
+        """Builds, submits, waits for and reconciles a whole batch run."""
+        shards = self.build_shards(data, prompt_column, id_column, model, temperature, max_tokens)
+        batches = self.submit(shards)
+        statuses = self.wait(list(batches.values()), poll_interval, timeout)
+        failed = [batch_id for batch_id, status in statuses.items() if status != 'completed']
+        if failed:
+            print(f"Batches did not complete: {', '.join(failed)}")
+        completed = [batch_id for batch_id in batches.values() if statuses[batch_id] == 'completed']
+        print(f"Submitted {len(data)} requests in {len(shards)} shard(s); {len(completed)} batch(es) completed.")
+        return self.reconcile(data, id_column, self.download(completed))
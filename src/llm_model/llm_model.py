@@ -0,0 +1,374 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+from interfaces.llm_model_interface import LLMModelInterface
+from exceptions.exceptions import LLMRequestError
+from metrics.metrics import MetricsRecorder
+
+"""
+Module: llm_model.py
+Purpose: Implements a concurrent client for OpenAI-compatible chat completion APIs.
+
+Classes:
+    TokenBucket: Asynchronous token bucket used for requests/min and tokens/min limits.
+    AsyncLLMClient: asyncio implementation of the LLMModelInterface.
+
+Usage:
+    A single pooled HTTP connection set is shared by all requests of a run. The number
+    of requests in flight is bounded by `max_concurrency`, and two token buckets keep
+    the request rate and the (estimated) token rate under the provider limits. Requests
+    that fail with 429, 5xx or transport errors are retried with exponential backoff
+    and full jitter, honouring Retry-After when the provider sends it.
+
+    amake_streaming_request() streams the completion as server-sent events. Given a
+    ResponseValidator, it checks the JSON output while it arrives and closes the
+    stream as soon as the output can no longer match the schema, so a doomed response
+    costs neither the time nor the output tokens of its remainder. Completed top-level
+    fields are passed to `on_field` as soon as they are parsed.
+
+        client = AsyncLLMClient.from_config(config)
+        responses = client.make_requests(prompts, model="gpt-4o-mini")
+        texts = [client.handle_response(response) for response in responses]
+"""
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `rate_per_minute`, holding at most `capacity`.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+        self._lock_loop = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Waits until `amount` tokens (capped at the capacity) are available and takes them."""
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            # asyncio locks are bound to one event loop; each asyncio.run() gets its own.
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        amount = min(amount, self.capacity)
+        # Callers queue on the lock, so a large request cannot be starved by small ones.
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+
+class AsyncLLMClient(LLMModelInterface):
+    """
+    Sends chat completion requests concurrently with rate limiting and retries.
+    """
+    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.openai.com/v1",
+                 max_concurrency: int = 16, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, timeout: float = 60.0,
+                 metrics: Optional[MetricsRecorder] = None):
+        """
+        Args:
+            api_key (str, optional): API key sent as a bearer token.
+            base_url (str): Base URL of the OpenAI-compatible API.
+            max_concurrency (int): Maximum number of requests in flight.
+            requests_per_minute (float, optional): Request rate limit.
+            tokens_per_minute (float, optional): Token rate limit (prompt estimate plus max_tokens).
+            max_retries (int): Retries after the first attempt for retryable failures.
+            backoff_base (float): Base delay in seconds of the exponential backoff.
+            backoff_max (float): Upper bound in seconds of a single backoff delay.
+            timeout (float): Timeout in seconds of a single HTTP request.
+            metrics (MetricsRecorder, optional): Recorder of request latency, retries
+                and token usage.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.metrics = metrics or MetricsRecorder()
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._http = None
+        self._semaphore = None
+        self._session_count = 0
+
+    @classmethod
+    def from_config(cls, config, metrics: Optional[MetricsRecorder] = None) -> 'AsyncLLMClient':
+        """Builds a client from the 'llm_model' section of a ConfigInterface."""
+        return cls.from_settings(config.get_model_config(), metrics=metrics)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], metrics: Optional[MetricsRecorder] = None) -> 'AsyncLLMClient':
+        """Builds a client from a dict of 'llm_model' settings; the API key is read from `api_key_name`."""
+        options = {key: settings[key] for key in (
+            'base_url', 'max_concurrency', 'requests_per_minute', 'tokens_per_minute', 'max_retries', 'timeout')
+            if settings.get(key) is not None}
+        api_key_name = settings.get('api_key_name')
+        return cls(api_key=os.environ.get(api_key_name) if api_key_name else None, metrics=metrics, **options)
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Opens the pooled HTTP client for the duration of a batch of requests. Nested
+        and concurrent sessions share the one already open; it is closed when the
+        last of them exits.
+        """
+        if self._http is None:
+            import httpx
+
+            headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._http = httpx.AsyncClient(base_url=self.base_url, headers=headers,
+                                           limits=limits, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session_count += 1
+        try:
+            yield self
+        finally:
+            self._session_count -= 1
+            if self._session_count == 0:
+                http, self._http, self._semaphore = self._http, None, None
+                await http.aclose()
+
+    @staticmethod
+    def estimate_tokens(prompt: str, max_tokens: int) -> int:
+        """Rough token estimate of a request (about four characters per prompt token)."""
+        return len(prompt) // 4 + 1 + max_tokens
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
+
+    async def _post(self, payload: Dict[str, Any], stream: bool = False):
+        """
+        Posts a chat completion request, retrying retryable failures. Returns the parsed
+        response, or with `stream` the open httpx response, which the caller must close.
+        """
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                request = self._http.build_request('POST', '/chat/completions', json=payload)
+                response = await self._http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = LLMRequestError(f"Transport error: {e}")
+            else:
+                if response.status_code == 200 and stream:
+                    return response
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        # A 200 that is not JSON (e.g. a proxy's HTML page) is retried like a transport error.
+                        error = LLMRequestError(f"Invalid JSON body: {response.text[:200]}")
+                else:
+                    if stream:
+                        await response.aread()
+                        await response.aclose()
+                    error = LLMRequestError(f"HTTP {response.status_code}: {response.text[:200]}",
+                                            status_code=response.status_code)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        raise error
+                    retry_after = response.headers.get('retry-after')
+            if attempt == self.max_retries:
+                raise error
+            self.metrics.increment('llm_retries')
+            await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+    async def amake_request(self, prompt: str, model: str, temperature: float = 0.5,
+                            max_tokens: int = 500) -> Dict[str, Any]:
+        """
+        Asynchronous counterpart of make_request().
+
+        Raises:
+            LLMRequestError: If the request fails with a non-retryable status or
+                keeps failing after all retries.
+        """
+        async with self.session():
+            await self._acquire(prompt, max_tokens)
+            payload = {
+                'model': model,
+                'messages': [{'role': 'user', 'content': prompt}],
+                'temperature': temperature,
+                'max_tokens': max_tokens,
+            }
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self._post(payload)
+                except LLMRequestError:
+                    self.metrics.increment('llm_errors')
+                    raise
+            self._record(response, time.perf_counter() - start)
+            return response
+
+    async def _acquire(self, prompt: str, max_tokens: int) -> None:
+        """Waits for the rate limiters to admit one request."""
+        if self._request_bucket:
+            await self._request_bucket.acquire(1)
+        if self._token_bucket:
+            await self._token_bucket.acquire(self.estimate_tokens(prompt, max_tokens))
+
+    def _record(self, response: Dict[str, Any], seconds: float) -> None:
+        self.metrics.observe('llm_request_seconds', seconds)
+        self.metrics.increment('llm_requests')
+        usage = response.get('usage') or {}
+        self.metrics.increment('llm_tokens_in', usage.get('prompt_tokens', 0))
+        self.metrics.increment('llm_tokens_out', usage.get('completion_tokens', 0))
+
+    async def amake_streaming_request(self, prompt: str, model: str, temperature: float = 0.5,
+                                      max_tokens: int = 500, validator=None,
+                                      on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Streams a completion and returns it in the shape of a non-streamed response.
+
+        Args:
+            validator (ResponseValidator, optional): Schema the JSON output is checked
+                against while it streams in.
+            on_field (callable, optional): Called with (key, value) for every top-level
+                field of the output as soon as it is complete.
+
+        Returns:
+            dict: The response. When the output was abandoned because it cannot match
+                the schema, its finish_reason is 'aborted', the content holds the text
+                received so far and 'aborted' holds the reason.
+
+        Raises:
+            LLMRequestError: If the request fails before or while streaming.
+        """
+        import httpx
+        from exceptions.exceptions import SchemaViolationError
+
+        monitor = None
+        if validator is not None:
+            from validator.incremental import IncrementalValidator
+
+            monitor = IncrementalValidator(validator)
+        async with self.session():
+            await self._acquire(prompt, max_tokens)
+            payload = {
+                'model': model,
+                'messages': [{'role': 'user', 'content': prompt}],
+                'temperature': temperature,
+                'max_tokens': max_tokens,
+                'stream': True,
+                'stream_options': {'include_usage': True},
+            }
+            parts, usage, finish_reason, aborted = [], {}, None, None
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    stream = await self._post(payload, stream=True)
+                    try:
+                        async for line in stream.aiter_lines():
+                            if not line.startswith('data:'):
+                                continue
+                            data = line[5:].strip()
+                            if data == '[DONE]':
+                                break
+                            chunk = json.loads(data)
+                            usage = chunk.get('usage') or usage
+                            for choice in chunk.get('choices') or []:
+                                finish_reason = choice.get('finish_reason') or finish_reason
+                                delta = (choice.get('delta') or {}).get('content')
+                                if not delta:
+                                    continue
+                                if not parts:
+                                    self.metrics.observe('llm_first_token_seconds', time.perf_counter() - start)
+                                parts.append(delta)
+                                if monitor is not None:
+                                    for key, value in monitor.feed(delta):
+                                        if on_field is not None:
+                                            on_field(key, value)
+                    finally:
+                        # Closing the stream early drops the connection, which stops the generation.
+                        await stream.aclose()
+                except SchemaViolationError as e:
+                    aborted, finish_reason = str(e), 'aborted'
+                    self.metrics.increment('llm_stream_aborts')
+                except (httpx.TransportError, ValueError) as e:
+                    self.metrics.increment('llm_errors')
+                    raise LLMRequestError(f"Stream failed: {e}") from None
+                except LLMRequestError:
+                    self.metrics.increment('llm_errors')
+                    raise
+            response = {
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': "".join(parts)},
+                             'finish_reason': finish_reason}],
+                'usage': usage,
+            }
+            if aborted is not None:
+                response['aborted'] = aborted
+            self._record(response, time.perf_counter() - start)
+            return response
+
+    async def amake_streaming_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                                       max_tokens: int = 500, validator=None) -> List[Dict[str, Any]]:
+        """
+        Streams all prompts concurrently with amake_streaming_request() and returns the
+        responses in prompt order. A request that fails for good yields {'error': message}.
+        """
+        async def request(prompt: str) -> Dict[str, Any]:
+            try:
+                return await self.amake_streaming_request(prompt, model, temperature, max_tokens, validator)
+            except LLMRequestError as e:
+                return {'error': str(e), 'status_code': e.status_code}
+
+        async with self.session():
+            return await asyncio.gather(*(request(prompt) for prompt in prompts))
+
+    async def amake_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                             max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """
+        Sends all prompts concurrently and returns the responses in prompt order.
+        A request that fails for good yields {'error': message} instead of a response.
+        """
+        async def request(prompt: str) -> Dict[str, Any]:
+            try:
+                return await self.amake_request(prompt, model, temperature, max_tokens)
+            except LLMRequestError as e:
+                return {'error': str(e), 'status_code': e.status_code}
+
+        async with self.session():
+            return await asyncio.gather(*(request(prompt) for prompt in prompts))
+
+    def make_request(self, prompt: str, model: str, temperature: float = 0.5, max_tokens: int = 500) -> Dict[str, Any]:
+        return asyncio.run(self.amake_request(prompt, model, temperature, max_tokens))
+
+    def make_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                      max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around amake_requests()."""
+        return asyncio.run(self.amake_requests(prompts, model, temperature, max_tokens))
+
+    def handle_response(self, response: Dict[str, Any]) -> str:
+        if 'error' in response:
+            print(f"LLM request failed: {response['error']}")
+            return ""
+        try:
+            return response['choices'][0]['message']['content'] or ""
+        except (KeyError, IndexError, TypeError):
+            print(f"Unexpected LLM response format: {str(response)[:200]}")
+            return ""
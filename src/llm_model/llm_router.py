@@ -0,0 +1,371 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+from interfaces.llm_model_interface import LLMModelInterface
+from exceptions.exceptions import LLMRequestError
+from llm_model.llm_model import AsyncLLMClient
+from metrics.metrics import MetricsRecorder
+
+"""
+Module: llm_router.py
+Purpose: Spreads LLM requests over several endpoints by observed latency and errors.
+
+Classes:
+    Endpoint: One provider/model/key combination with its running latency and error statistics.
+    LLMRouter: LLMModelInterface that balances, hedges and fails over between endpoints.
+
+Usage:
+    Every request goes to the better of two randomly sampled healthy endpoints, scored
+    by their latency EWMA times their requests in flight, inflated by their error rate
+    ("power of two choices"), so a slow endpoint gets less traffic without being
+    starved of the samples that would show it recovered. When a request is still open
+    after the p95 latency of its endpoint, a hedged duplicate goes to another endpoint
+    and the first answer wins; the loser is cancelled. Hedges are capped at
+    `max_hedge_ratio` of the requests so an outage does not double the load.
+
+    A failed request fails over to the next endpoint right away. After
+    `failure_threshold` consecutive failures an endpoint is taken out of rotation for
+    `cooldown` seconds, then tried again with live traffic. Requests that are invalid
+    themselves (400, 413, 422) are not retried elsewhere.
+
+        router = LLMRouter([Endpoint('primary', AsyncLLMClient(base_url=url_a)),
+                            Endpoint('backup', AsyncLLMClient(base_url=url_b), model='gpt-4o-mini')])
+        responses = router.make_requests(prompts, model="gpt-4o")
+        print(router.stats())
+"""
+
+# Retries of an endpoint client that does not set max_retries; the router fails over instead.
+ENDPOINT_MAX_RETRIES = 0
+# Failures caused by the request rather than the endpoint; another endpoint would fail too.
+REQUEST_ERROR_STATUS_CODES = {400, 413, 422}
+
+
+class Endpoint:
+    """
+    An LLM client together with the model it serves and its running statistics.
+    """
+    def __init__(self, name: str, client: LLMModelInterface, model: Optional[str] = None,
+                 weight: float = 1.0, window: int = 200, alpha: float = 0.2):
+        """
+        Args:
+            name (str): Name used in stats and metrics.
+            client (LLMModelInterface): Client providing amake_request().
+            model (str, optional): Model sent to this endpoint; defaults to the requested model.
+            weight (float): Relative capacity; an endpoint of weight 2 takes about twice the traffic.
+            window (int): Recent latencies kept for the hedging quantile.
+            alpha (float): Smoothing factor of the latency and error-rate EWMAs.
+        """
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = weight
+        self.alpha = alpha
+        self.latencies = deque(maxlen=window)
+        self.latency = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        """Updates the statistics with the outcome of one finished request."""
+        self.requests += 1
+        self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.latencies.append(seconds)
+            self.consecutive_failures = 0
+        else:
+            self.errors += 1
+            self.consecutive_failures += 1
+
+    def record_cancelled(self, seconds: float) -> None:
+        """A request cancelled by a faster hedge took at least `seconds`; count it towards the latency."""
+        if self.latency is None or seconds > self.latency:
+            self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def available(self, now: float) -> bool:
+        return self.down_until <= now
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.quantile(0.95)
+        return {'requests': self.requests, 'errors': self.errors, 'in_flight': self.in_flight,
+                'latency_ewma': round(self.latency, 6) if self.latency is not None else None,
+                'latency_p95': round(p95, 6) if p95 is not None else None,
+                'error_rate': round(self.error_rate, 4), 'available': self.available(time.monotonic())}
+
+
+class LLMRouter(LLMModelInterface):
+    """
+    Routes chat completion requests across endpoints with hedging and failover.
+    """
+    def __init__(self, endpoints: List[Endpoint], max_concurrency: Optional[int] = None,
+                 hedge_quantile: float = 0.95, min_hedge_delay: float = 0.05,
+                 min_samples: int = 20, max_hedge_ratio: float = 0.1, failure_threshold: int = 3,
+                 cooldown: float = 30.0, seed: Optional[int] = None, metrics: Optional[MetricsRecorder] = None):
+        """
+        Args:
+            endpoints (list): The endpoints to route between.
+            max_concurrency (int, optional): Requests routed at the same time; defaults to the
+                sum of the endpoint clients' max_concurrency. Further requests wait and are
+                routed once a slot frees up, with the statistics of that moment.
+            hedge_quantile (float): Latency quantile of an endpoint after which a request is hedged.
+            min_hedge_delay (float): Lower bound in seconds of the hedging delay.
+            min_samples (int): Latencies an endpoint needs before its requests are hedged.
+            max_hedge_ratio (float): Maximum share of requests that may be hedged.
+            failure_threshold (int): Consecutive failures that take an endpoint out of rotation.
+            cooldown (float): Seconds an endpoint stays out of rotation.
+            seed (int, optional): Seed of the endpoint sampling.
+            metrics (MetricsRecorder, optional): Recorder of requests, hedges and failovers per endpoint.
+
+        Raises:
+            ValueError: If no endpoints are given or two share a name.
+        """
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint.")
+        if len({endpoint.name for endpoint in endpoints}) != len(endpoints):
+            raise ValueError("Endpoint names must be unique.")
+        self.endpoints = list(endpoints)
+        if max_concurrency is None and all(hasattr(endpoint.client, 'max_concurrency') for endpoint in endpoints):
+            max_concurrency = sum(endpoint.client.max_concurrency for endpoint in endpoints)
+        self.max_concurrency = max_concurrency
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.metrics = metrics or MetricsRecorder()
+        self.requests = 0
+        self.hedges = 0
+        self.failovers = 0
+        self._random = random.Random(seed)
+        self._semaphore = None
+        self._session_count = 0
+
+    @classmethod
+    def from_config(cls, config, metrics: Optional[MetricsRecorder] = None) -> LLMModelInterface:
+        """
+        Builds a router over the endpoints listed in 'llm_model.endpoints', each of which
+        overrides the 'llm_model' settings it sets (base_url, model_name, api_key_name,
+        max_concurrency, rate limits, max_retries, weight). Endpoint clients do not
+        inherit 'llm_model.max_retries': they default to ENDPOINT_MAX_RETRIES, so a
+        failing endpoint fails over at once. Without endpoints, returns the single
+        AsyncLLMClient of the 'llm_model' section.
+        """
+        model_config = config.get_model_config()
+        endpoint_configs = model_config.get('endpoints')
+        if not endpoint_configs:
+            return AsyncLLMClient.from_config(config, metrics=metrics)
+        metrics = metrics or MetricsRecorder()
+        defaults = {key: value for key, value in model_config.items() if key not in ('endpoints', 'router')}
+        endpoints = []
+        for position, endpoint_config in enumerate(endpoint_configs):
+            settings = {**defaults, 'max_retries': ENDPOINT_MAX_RETRIES, **endpoint_config}
+            endpoints.append(Endpoint(settings.get('name') or f"endpoint{position}",
+                                      AsyncLLMClient.from_settings(settings, metrics=metrics),
+                                      model=endpoint_config.get('model_name'), weight=settings.get('weight', 1.0)))
+        return cls(endpoints, metrics=metrics, **(model_config.get('router') or {}))
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Opens the sessions of all endpoint clients for the duration of a batch of
+        requests. Nested and concurrent sessions share the one already open.
+        """
+        async with AsyncExitStack() as stack:
+            for endpoint in self.endpoints:
+                if hasattr(endpoint.client, 'session'):
+                    await stack.enter_async_context(endpoint.client.session())
+            if self._session_count == 0 and self.max_concurrency:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session_count += 1
+            try:
+                yield self
+            finally:
+                self._session_count -= 1
+                if self._session_count == 0:
+                    self._semaphore = None
+
+    @staticmethod
+    def _score(endpoint: Endpoint, default_latency: float) -> float:
+        latency = endpoint.latency if endpoint.latency is not None else default_latency
+        return latency * (endpoint.in_flight + 1) / endpoint.weight / max(0.05, 1.0 - endpoint.error_rate)
+
+    def _pick(self, exclude: List[Endpoint]) -> Optional[Endpoint]:
+        """
+        Picks the better of two random healthy endpoints not in `exclude`. Endpoints
+        without samples are scored like the best known one, so they get explored.
+        When every endpoint is down, the one that comes back first is used.
+        """
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        if not candidates:
+            return None
+        healthy = [endpoint for endpoint in candidates if endpoint.available(now)]
+        if not healthy:
+            return min(candidates, key=lambda endpoint: endpoint.down_until)
+        known = [endpoint.latency for endpoint in healthy if endpoint.latency is not None]
+        default_latency = min(known) if known else 1e-3
+        sample = self._random.sample(healthy, min(2, len(healthy)))
+        return min(sample, key=lambda endpoint: self._score(endpoint, default_latency))
+
+    def _hedge_delay(self, endpoint: Endpoint) -> Optional[float]:
+        if len(endpoint.latencies) < self.min_samples or len(self.endpoints) < 2:
+            return None
+        if self.hedges + 1 > self.max_hedge_ratio * self.requests:
+            return None
+        return max(self.min_hedge_delay, endpoint.quantile(self.hedge_quantile))
+
+    async def _send(self, endpoint: Endpoint, send, model: str) -> Dict[str, Any]:
+        """Sends the request with `send(client, model)` and records the outcome in the endpoint's statistics."""
+        endpoint.in_flight += 1
+        start = time.perf_counter()
+        try:
+            response = await send(endpoint.client, endpoint.model or model)
+        except asyncio.CancelledError:
+            endpoint.record_cancelled(time.perf_counter() - start)
+            raise
+        except LLMRequestError as e:
+            if e.status_code not in REQUEST_ERROR_STATUS_CODES:
+                endpoint.record(time.perf_counter() - start, ok=False)
+                if endpoint.consecutive_failures >= self.failure_threshold:
+                    endpoint.down_until = time.monotonic() + self.cooldown
+                self.metrics.increment(f"llm_router_errors.{endpoint.name}")
+            raise
+        finally:
+            endpoint.in_flight -= 1
+        endpoint.record(time.perf_counter() - start, ok=True)
+        self.metrics.increment(f"llm_router_requests.{endpoint.name}")
+        return response
+
+    async def amake_request(self, prompt: str, model: str, temperature: float = 0.5,
+                            max_tokens: int = 500) -> Dict[str, Any]:
+        """
+        Sends the request to the best endpoint, hedges it once it is slower than that
+        endpoint's p95 and fails over when an endpoint errors, until one answers.
+
+        Raises:
+            LLMRequestError: If the request itself is invalid or every endpoint failed.
+        """
+        async def send(client, endpoint_model: str) -> Dict[str, Any]:
+            return await client.amake_request(prompt, endpoint_model, temperature, max_tokens)
+
+        return await self._route(send, model, hedge=True)
+
+    async def amake_streaming_request(self, prompt: str, model: str, temperature: float = 0.5,
+                                      max_tokens: int = 500, validator=None,
+                                      on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Streams the request from the best endpoint, failing over when an endpoint errors.
+        Streams are not hedged, since two streams would report their fields twice.
+        """
+        async def send(client, endpoint_model: str) -> Dict[str, Any]:
+            return await client.amake_streaming_request(prompt, endpoint_model, temperature, max_tokens,
+                                                        validator, on_field)
+
+        return await self._route(send, model, hedge=False)
+
+    async def _route(self, send, model: str, hedge: bool) -> Dict[str, Any]:
+        async with self.session():
+            if self._semaphore is None:
+                return await self._dispatch(send, model, hedge)
+            async with self._semaphore:
+                return await self._dispatch(send, model, hedge)
+
+    async def _dispatch(self, send, model: str, hedge: bool) -> Dict[str, Any]:
+        self.requests += 1
+        tried, running, last_error = [], {}, None
+
+        def launch(endpoint: Endpoint) -> None:
+            tried.append(endpoint)
+            running[asyncio.ensure_future(self._send(endpoint, send, model))] = endpoint
+
+        launch(self._pick(tried))
+        hedge_delay = self._hedge_delay(tried[0]) if hedge else None
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The request is slower than usual: hedge it on another endpoint.
+                    hedge_delay = None
+                    backup = self._pick(tried)
+                    if backup is not None:
+                        self.hedges += 1
+                        self.metrics.increment('llm_router_hedges')
+                        launch(backup)
+                    continue
+                for task in done:
+                    running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if isinstance(error, LLMRequestError) and error.status_code in REQUEST_ERROR_STATUS_CODES:
+                        raise error
+                    last_error = error
+                if not running:
+                    backup = self._pick(tried)
+                    if backup is not None:
+                        self.failovers += 1
+                        self.metrics.increment('llm_router_failovers')
+                        launch(backup)
+        finally:
+            for task in running:
+                task.cancel()
+        if isinstance(last_error, LLMRequestError):
+            raise last_error
+        raise LLMRequestError(f"All endpoints failed: {last_error}")
+
+    async def amake_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                             max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """
+        Sends all prompts concurrently and returns the responses in prompt order.
+        A request that fails for good yields {'error': message} instead of a response.
+        """
+        async def request(prompt: str) -> Dict[str, Any]:
+            try:
+                return await self.amake_request(prompt, model, temperature, max_tokens)
+            except LLMRequestError as e:
+                return {'error': str(e), 'status_code': e.status_code}
+
+        async with self.session():
+            return await asyncio.gather(*(request(prompt) for prompt in prompts))
+
+    async def amake_streaming_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                                       max_tokens: int = 500, validator=None) -> List[Dict[str, Any]]:
+        """Streaming counterpart of amake_requests()."""
+        async def request(prompt: str) -> Dict[str, Any]:
+            try:
+                return await self.amake_streaming_request(prompt, model, temperature, max_tokens, validator)
+            except LLMRequestError as e:
+                return {'error': str(e), 'status_code': e.status_code}
+
+        async with self.session():
+            return await asyncio.gather(*(request(prompt) for prompt in prompts))
+
+    def make_request(self, prompt: str, model: str, temperature: float = 0.5, max_tokens: int = 500) -> Dict[str, Any]:
+        return asyncio.run(self.amake_request(prompt, model, temperature, max_tokens))
+
+    def make_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                      max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around amake_requests()."""
+        return asyncio.run(self.amake_requests(prompts, model, temperature, max_tokens))
+
+    def handle_response(self, response: Dict[str, Any]) -> str:
+        return self.endpoints[0].client.handle_response(response)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the request, hedge and failover counts and the statistics of every endpoint."""
+        return {'requests': self.requests, 'hedges': self.hedges, 'failovers': self.failovers,
+                'endpoints': {endpoint.name: endpoint.stats() for endpoint in self.endpoints}}
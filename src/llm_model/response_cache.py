@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from interfaces.llm_model_interface import LLMModelInterface
+from metrics.metrics import MetricsRecorder
+
+"""
+Module: response_cache.py
+Purpose: Implements a persistent cache of LLM responses.
+
+Classes:
+    CachedLLMModel: Wraps any LLMModelInterface and serves repeated requests from SQLite.
+
+Usage:
+    Responses are keyed by a hash of the prompt, the model and the sampling parameters,
+    so reruns after a crash or a config tweak only pay for prompts that changed, and
+    repeated rows within a batch are sent once. Entries expire after `ttl_seconds` and
+    the least recently used ones are evicted beyond `max_entries` or `max_bytes`.
+
+    Writes stay cheap as the cache grows: access times of hits are buffered, inserts
+    are committed in groups, and eviction only runs once the running entry count or
+    size passes its limit by `EVICTION_SLACK` (trimming back to the limit) or every
+    `EVICTION_INTERVAL` inserts for expired entries, instead of on every insert.
+
+        model = CachedLLMModel(AsyncLLMClient.from_config(config), "data/cache/llm.sqlite")
+        responses = model.make_requests(prompts, model="gpt-4o-mini")
+        print(model.stats())
+"""
+
+
+# Share of max_entries/max_bytes the cache may exceed before eviction trims it back.
+EVICTION_SLACK = 0.1
+# Inserts between two deletions of expired entries.
+EVICTION_INTERVAL = 1_000
+# Buffered inserts and access-time updates that force a commit.
+COMMIT_INTERVAL = 100
+
+
+class CachedLLMModel(LLMModelInterface):
+    """
+    An LLMModelInterface decorator that caches successful responses in SQLite.
+    """
+    def __init__(self, model: LLMModelInterface, cache_path: str, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 metrics: Optional[MetricsRecorder] = None):
+        """
+        Args:
+            model (LLMModelInterface): The client whose responses are cached.
+            cache_path (str): Path of the SQLite database. Parent directories are created.
+            ttl_seconds (float, optional): Age after which an entry is no longer served.
+            max_entries (int, optional): Maximum number of entries kept.
+            max_bytes (int, optional): Maximum total size of the stored responses.
+            metrics (MetricsRecorder, optional): Recorder of the 'llm_cache' hits and misses.
+        """
+        self.model = model
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.metrics = metrics or MetricsRecorder()
+        self._lock = threading.Lock()
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)")
+        self._connection.commit()
+        self._entries, self._bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._touched: Dict[str, float] = {}
+        self._uncommitted = 0
+        self._puts_since_expiry = 0
+
+    @classmethod
+    def from_config(cls, model: LLMModelInterface, config,
+                    metrics: Optional[MetricsRecorder] = None) -> LLMModelInterface:
+        """
+        Wraps the model with the cache configured in the 'llm_model' section, or
+        returns it unchanged when no cache_path is set.
+        """
+        model_config = config.get_model_config()
+        if not model_config.get('cache_path'):
+            return model
+        ttl_hours = model_config.get('cache_ttl_hours')
+        return cls(model, model_config['cache_path'],
+                   ttl_seconds=ttl_hours * 3600 if ttl_hours else None,
+                   max_entries=model_config.get('cache_max_entries'), metrics=metrics)
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+        """Hashes everything that determines the response into the cache key."""
+        payload = json.dumps([prompt, model, float(temperature), int(max_tokens)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached response for the key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self.metrics.increment('llm_cache.misses')
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                self.metrics.increment('llm_cache.misses')
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= COMMIT_INTERVAL:
+                self._commit()
+            self.hits += 1
+        self.metrics.increment('llm_cache.hits')
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """Stores a response. Failed and aborted responses are never cached."""
+        if 'error' in response or 'aborted' in response:
+            return
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)", (key, data, len(data), now, now))
+            # Replacing an existing key overcounts; the counters are exact again after every eviction.
+            self._entries += 1
+            self._bytes += len(data)
+            self._uncommitted += 1
+            self._puts_since_expiry += 1
+            over_entries = self.max_entries is not None and self._entries > self.max_entries * (1 + EVICTION_SLACK)
+            over_bytes = self.max_bytes is not None and self._bytes > self.max_bytes * (1 + EVICTION_SLACK)
+            expire = self.ttl_seconds is not None and self._puts_since_expiry >= EVICTION_INTERVAL
+            if over_entries or over_bytes or expire:
+                self._evict()
+            if self._uncommitted >= COMMIT_INTERVAL:
+                self._commit()
+
+    def _commit(self) -> None:
+        """Writes the buffered access times and commits; the caller holds the lock."""
+        if self._touched:
+            self._connection.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                         [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched = {}
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def flush(self) -> None:
+        """Commits buffered inserts and access times."""
+        with self._lock:
+            self._commit()
+
+    def _evict(self) -> None:
+        """Deletes expired entries, then least recently used ones beyond the size limits."""
+        if self._touched:
+            self._commit()
+        if self.ttl_seconds is not None:
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._puts_since_expiry = 0
+        if self.max_entries is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        if self.max_bytes is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running_size "
+                "FROM responses) WHERE running_size > ?)", (self.max_bytes,))
+        self._entries, self._bytes = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the hit/miss counters and the number of stored entries."""
+        with self._lock:
+            self._commit()
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0, 'entries': entries}
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    @asynccontextmanager
+    async def session(self):
+        """Opens the wrapped client's session, if it has one, so that batches share its connections."""
+        if hasattr(self.model, 'session'):
+            async with self.model.session():
+                yield self
+        else:
+            yield self
+
+    def make_request(self, prompt: str, model: str, temperature: float = 0.5, max_tokens: int = 500) -> Dict[str, Any]:
+        key = self.make_key(prompt, model, temperature, max_tokens)
+        response = self.get(key)
+        if response is None:
+            response = self.model.make_request(prompt, model, temperature, max_tokens)
+            self.put(key, response)
+            self.flush()
+        return response
+
+    async def amake_request(self, prompt: str, model: str, temperature: float = 0.5,
+                            max_tokens: int = 500) -> Dict[str, Any]:
+        """Asynchronous counterpart of make_request(), for clients that provide amake_request()."""
+        key = self.make_key(prompt, model, temperature, max_tokens)
+        response = self.get(key)
+        if response is None:
+            response = await self.model.amake_request(prompt, model, temperature, max_tokens)
+            self.put(key, response)
+        return response
+
+    async def _serve(self, prompts: List[str], model: str, temperature: float, max_tokens: int,
+                     send) -> List[Dict[str, Any]]:
+        """Serves cached prompts from the store and passes each distinct uncached prompt once to `send`."""
+        keys = [self.make_key(prompt, model, temperature, max_tokens) for prompt in prompts]
+        responses = {}
+        pending = {}
+        for key, prompt in zip(keys, prompts):
+            if key in responses or key in pending:
+                continue
+            cached = self.get(key)
+            if cached is None:
+                pending[key] = prompt
+            else:
+                responses[key] = cached
+        if pending:
+            fresh = await send(list(pending.values()))
+            for key, response in zip(pending, fresh):
+                self.put(key, response)
+                responses[key] = response
+            self.flush()
+        return [responses[key] for key in keys]
+
+    async def amake_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                             max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """
+        Serves cached prompts from the store and sends each distinct uncached prompt
+        once through the wrapped client's amake_requests().
+        """
+        return await self._serve(prompts, model, temperature, max_tokens,
+                                 lambda pending: self.model.amake_requests(pending, model, temperature, max_tokens))
+
+    async def amake_streaming_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                                       max_tokens: int = 500, validator=None) -> List[Dict[str, Any]]:
+        """
+        Like amake_requests(), but streams the uncached prompts through the wrapped
+        client's amake_streaming_requests(). Shares the cache with non-streamed requests.
+        """
+        return await self._serve(prompts, model, temperature, max_tokens,
+                                 lambda pending: self.model.amake_streaming_requests(
+                                     pending, model, temperature, max_tokens, validator))
+
+    def make_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                      max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """Synchronous counterpart of amake_requests(); uses it when the wrapped client is asynchronous."""
+        if hasattr(self.model, 'amake_requests'):
+            return asyncio.run(self.amake_requests(prompts, model, temperature, max_tokens))
+        keys = [self.make_key(prompt, model, temperature, max_tokens) for prompt in prompts]
+        responses = {}
+        for key, prompt in zip(keys, prompts):
+            if key not in responses:
+                responses[key] = self.get(key)
+                if responses[key] is None:
+                    responses[key] = self.model.make_request(prompt, model, temperature, max_tokens)
+                    self.put(key, responses[key])
+        self.flush()
+        return [responses[key] for key in keys]
+
+    def handle_response(self, response: Dict[str, Any]) -> str:
+        return self.model.handle_response(response)
@@ -0,0 +1,429 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from interfaces.llm_model_interface import LLMModelInterface
+from metrics.metrics import MetricsRecorder
+
+"""
+Module: semantic_cache.py
+Purpose: Implements a near-match cache of LLM responses over a local vector index.
+
+Classes:
+    HashingVectorizer: Embeds texts as signed feature-hashed bags of words and word pairs.
+    SimHashIndex: In-memory approximate nearest neighbour index over unit vectors.
+    SemanticCachedLLMModel: Wraps any LLMModelInterface and reuses responses of similar rows.
+
+Usage:
+    A prompt is split into the template's static prefix and the row text. The prefix,
+    model and sampling parameters must match exactly (they select a namespace); the
+    row text only has to be similar. It is lower-cased, stripped of configured
+    boilerplate patterns and embedded without any network call: the log-scaled counts
+    of its words and word pairs are hashed with random signs into `dimensions`
+    buckets, so whitespace changes do not matter and reordered sentences keep almost
+    all of their features. Cosine similarity of the embeddings tracks the overlap of
+    the two texts.
+
+    Lookups use random-hyperplane (SimHash) LSH: every vector gets `tables` keys of
+    `bits` hyperplane signs each, candidates are the entries sharing a key in any
+    table, and they are reranked by exact cosine. The best candidate at or above
+    `threshold` is a hit. Vectors and responses are persisted in SQLite, and the LSH
+    buckets of a namespace are rebuilt with one matrix product when it is first used.
+
+    A fraction `audit_rate` of the near (non-identical) hits is sent to the LLM anyway.
+    The fresh response is compared with the cached one, the outcome is stored in the
+    `audits` table, and the fresh response is returned. stats() reports the hit rate
+    and the estimated false-hit rate, which is what `threshold` should be tuned on.
+
+        llm = SemanticCachedLLMModel(AsyncLLMClient.from_config(config), "data/cache/semantic.sqlite",
+                                     prefix=template.static_prefix, threshold=0.95)
+        responses = llm.make_requests(prompts, model="gpt-4o-mini")
+        print(llm.stats())
+"""
+
+_TOKEN = re.compile(r'\w+')
+_PAIR_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+# Similarity above which two texts count as identical (vectors are stored as float16).
+_IDENTICAL = 0.999
+
+
+class HashingVectorizer:
+    """
+    Embeds texts into L2-normalised float32 vectors of `dimensions` components.
+    """
+    def __init__(self, dimensions: int = 512, boilerplate: Sequence[str] = (), pairs: bool = True):
+        """
+        Args:
+            dimensions (int): Length of the vectors.
+            boilerplate (list[str]): Regular expressions removed from the text before embedding.
+            pairs (bool): Also hash consecutive word pairs, which keeps some word order.
+        """
+        self.dimensions = dimensions
+        self.boilerplate = [re.compile(pattern, re.IGNORECASE) for pattern in boilerplate]
+        self.pairs = pairs
+
+    def normalize(self, text: str) -> str:
+        for pattern in self.boilerplate:
+            text = pattern.sub(' ', text)
+        return text.lower()
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns the (len(texts), dimensions) matrix of embeddings; empty texts give zero vectors."""
+        token_lists = [_TOKEN.findall(self.normalize(str(text))) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        words = np.array([token for tokens in token_lists for token in tokens], dtype=object)
+        hashes = pd.util.hash_array(words) if len(words) else np.empty(0, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        if self.pairs and len(hashes) > 1:
+            # A pair is the hash of a word combined with the next one, within the same text.
+            same_text = rows[1:] == rows[:-1]
+            pair_hashes = hashes[:-1][same_text] * _PAIR_MULTIPLIER + hashes[1:][same_text]
+            hashes = np.concatenate([hashes, pair_hashes])
+            rows = np.concatenate([rows, rows[:-1][same_text]])
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        if len(hashes):
+            # Count every distinct (text, feature) once, then add its log-scaled count.
+            keys = (rows.astype(np.uint64) << np.uint64(44)) | (hashes >> np.uint64(20))
+            unique, counts = np.unique(keys, return_counts=True)
+            unique_rows = (unique >> np.uint64(44)).astype(np.int64)
+            features = unique & np.uint64((1 << 44) - 1)
+            columns = (features % np.uint64(self.dimensions)).astype(np.int64)
+            signs = np.where((features >> np.uint64(43)) & np.uint64(1), -1.0, 1.0)
+            np.add.at(vectors, (unique_rows, columns), (signs * (1.0 + np.log(counts))).astype(np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class SimHashIndex:
+    """
+    Random-hyperplane LSH over unit vectors with exact cosine reranking.
+    """
+    def __init__(self, dimensions: int, tables: int = 20, bits: int = 16, seed: int = 0):
+        """
+        Args:
+            dimensions (int): Length of the indexed vectors.
+            tables (int): Number of hash tables; more tables find more of the true neighbours.
+            bits (int): Hyperplanes per table key; more bits mean fewer, closer candidates.
+            seed (int): Seed of the hyperplanes; an index must be rebuilt with the same seed.
+        """
+        self.dimensions = dimensions
+        self.tables = tables
+        self.bits = bits
+        self._planes = np.random.default_rng(seed).standard_normal((dimensions, tables * bits)).astype(np.float32)
+        self._weights = (np.uint64(1) << np.arange(bits, dtype=np.uint64))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(tables)]
+        self._vectors = np.empty((0, dimensions), dtype=np.float16)
+        self._size = 0
+        self._removed = set()
+
+    def __len__(self) -> int:
+        return self._size - len(self._removed)
+
+    def _keys(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns the (len(vectors), tables) LSH keys."""
+        signs = (vectors.astype(np.float32) @ self._planes > 0).reshape(len(vectors), self.tables, self.bits)
+        return (signs.astype(np.uint64) * self._weights).sum(axis=2)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Adds vectors and returns their positions in the index."""
+        vectors = np.atleast_2d(vectors)
+        positions = np.arange(self._size, self._size + len(vectors))
+        if self._size + len(vectors) > len(self._vectors):
+            grown = np.empty((max(2 * len(self._vectors), self._size + len(vectors), 1024), self.dimensions),
+                             dtype=np.float16)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:self._size + len(vectors)] = vectors
+        self._size += len(vectors)
+        for position, keys in zip(positions.tolist(), self._keys(vectors).tolist()):
+            for table, key in zip(self._buckets, keys):
+                table.setdefault(key, []).append(position)
+        return positions
+
+    def remove(self, position: int) -> None:
+        """Removes an entry; its position is never reused."""
+        self._removed.add(position)
+
+    def query(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """Returns the position and cosine similarity of the most similar entry, or (None, 0.0)."""
+        candidates = set()
+        for table, key in zip(self._buckets, self._keys(np.atleast_2d(vector))[0].tolist()):
+            candidates.update(table.get(key, ()))
+        candidates -= self._removed
+        if not candidates:
+            return None, 0.0
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = self._vectors[positions].astype(np.float32) @ vector.astype(np.float32)
+        best = int(np.argmax(similarities))
+        return int(positions[best]), float(similarities[best])
+
+
+class SemanticCachedLLMModel(LLMModelInterface):
+    """
+    An LLMModelInterface decorator that serves responses of earlier, similar rows.
+    """
+    def __init__(self, model: LLMModelInterface, cache_path: str, prefix: str = '', threshold: float = 0.95,
+                 dimensions: int = 512, tables: int = 20, bits: int = 16, boilerplate: Sequence[str] = (),
+                 audit_rate: float = 0.0, seed: int = 0, metrics: Optional[MetricsRecorder] = None):
+        """
+        Args:
+            model (LLMModelInterface): The client whose responses are cached.
+            cache_path (str): Path of the SQLite database. Parent directories are created.
+            prefix (str): Static prompt prefix; only the text after it is compared by similarity.
+            threshold (float): Minimum cosine similarity of a hit.
+            dimensions (int): Length of the text embeddings.
+            tables (int): LSH tables of the index.
+            bits (int): Hyperplanes per LSH key.
+            boilerplate (list[str]): Regular expressions ignored when comparing row texts.
+            audit_rate (float): Share of near hits that are also requested, to measure false hits.
+            seed (int): Seed of the index hyperplanes and the audit sampling.
+            metrics (MetricsRecorder, optional): Recorder of the 'semantic_cache' hits,
+                misses, audits and false hits.
+
+        Raises:
+            ValueError: If the cache was created with other embedding settings.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1].")
+        self.model = model
+        self.cache_path = cache_path
+        self.prefix = prefix
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.vectorizer = HashingVectorizer(dimensions, boilerplate)
+        self.tables = tables
+        self.bits = bits
+        self.seed = seed
+        self.metrics = metrics or MetricsRecorder()
+        self.hits = 0
+        self.misses = 0
+        self.audits = 0
+        self.false_hits = 0
+        self._random = random.Random(seed)
+        self._indexes: Dict[str, Tuple[SimHashIndex, List[Optional[int]]]] = {}
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "response TEXT NOT NULL, created_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace);"
+            "CREATE TABLE IF NOT EXISTS audits ("
+            "id INTEGER PRIMARY KEY, entry_id INTEGER NOT NULL, similarity REAL NOT NULL, "
+            "matched INTEGER NOT NULL, cached TEXT NOT NULL, fresh TEXT NOT NULL, created_at REAL NOT NULL);")
+        settings = json.dumps({'dimensions': dimensions, 'boilerplate': list(boilerplate), 'pairs': True})
+        stored = self._connection.execute("SELECT value FROM settings WHERE name = 'vectorizer'").fetchone()
+        if stored is None:
+            self._connection.execute("INSERT INTO settings VALUES ('vectorizer', ?)", (settings,))
+        elif stored[0] != settings:
+            raise ValueError(f"{cache_path} was built with other embedding settings: {stored[0]}")
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, model: LLMModelInterface, config, prefix: str = '',
+                    metrics: Optional[MetricsRecorder] = None) -> LLMModelInterface:
+        """
+        Wraps the model with the semantic cache configured in the 'semantic_cache'
+        section, or returns it unchanged when the section is not enabled.
+        """
+        if not config.get_value('semantic_cache.enabled', False):
+            return model
+        return cls(model, config.get_value('semantic_cache.path', 'data/cache/semantic_cache.sqlite'),
+                   prefix=prefix, threshold=config.get_value('semantic_cache.threshold', 0.95),
+                   dimensions=config.get_value('semantic_cache.dimensions', 512),
+                   boilerplate=config.get_value('semantic_cache.boilerplate') or (),
+                   audit_rate=config.get_value('semantic_cache.audit_rate', 0.0), metrics=metrics)
+
+    def _split(self, prompt: str, model: str, temperature: float, max_tokens: int) -> Tuple[str, str]:
+        """Returns the namespace (exact part) and the row text (similar part) of a request."""
+        prefix, text = ('', prompt) if not prompt.startswith(self.prefix) else (self.prefix, prompt[len(self.prefix):])
+        payload = json.dumps([prefix, model, float(temperature), int(max_tokens)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest(), text
+
+    def _index(self, namespace: str) -> Tuple[SimHashIndex, List[Optional[int]]]:
+        """Returns the index of a namespace and the entry id of every index position, loading it on first use."""
+        if namespace not in self._indexes:
+            index = SimHashIndex(self.vectorizer.dimensions, self.tables, self.bits, self.seed)
+            rows = self._connection.execute(
+                "SELECT id, vector FROM entries WHERE namespace = ? ORDER BY id", (namespace,)).fetchall()
+            if rows:
+                index.add(np.stack([np.frombuffer(vector, dtype=np.float16) for _, vector in rows]))
+            self._indexes[namespace] = (index, [entry_id for entry_id, _ in rows])
+        return self._indexes[namespace]
+
+    def _store(self, namespace: str, text: str, vector: np.ndarray, position: int,
+               response: Dict[str, Any]) -> None:
+        """Persists the response of a miss at its provisional index position."""
+        index, entry_ids = self._index(namespace)
+        if 'error' in response or 'aborted' in response:
+            index.remove(position)
+            return
+        cursor = self._connection.execute(
+            "INSERT INTO entries (namespace, text_hash, vector, response, created_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, hashlib.sha256(text.encode('utf-8')).hexdigest(), vector.astype(np.float16).tobytes(),
+             json.dumps(response, ensure_ascii=False), time.time()))
+        entry_ids[position] = cursor.lastrowid
+
+    @staticmethod
+    def _same_answer(cached: Dict[str, Any], fresh: Dict[str, Any], handle) -> bool:
+        """Compares two responses by their parsed JSON content, or their stripped text."""
+        texts = [handle(response).strip() for response in (cached, fresh)]
+        try:
+            return json.loads(texts[0]) == json.loads(texts[1])
+        except ValueError:
+            return texts[0] == texts[1]
+
+    async def _serve(self, prompts: List[str], model: str, temperature: float, max_tokens: int,
+                     send) -> List[Dict[str, Any]]:
+        """
+        Looks up every prompt and passes the misses, and the audited hits, once to `send`.
+        A miss is indexed right away and its pending response is shared through a future,
+        so near-duplicates in the same call, or in calls running concurrently, wait for
+        that response instead of being sent too.
+        """
+        requests = [self._split(prompt, model, temperature, max_tokens) for prompt in prompts]
+        vectors = self.vectorizer.transform([text for _, text in requests])
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        loop = asyncio.get_running_loop()
+        leaders, followers, audited = {}, {}, []
+        with self._lock:
+            for position, ((namespace, text), vector) in enumerate(zip(requests, vectors)):
+                index, entry_ids = self._index(namespace)
+                match, similarity = index.query(vector) if vector.any() else (None, 0.0)
+                if match is None or similarity < self.threshold:
+                    self.misses += 1
+                    self.metrics.increment('semantic_cache.misses')
+                    index_position = int(index.add(vector)[0])
+                    entry_ids.append(None)
+                    leaders[(namespace, index_position)] = position
+                    self._pending[(namespace, index_position)] = loop.create_future()
+                    continue
+                self.hits += 1
+                self.metrics.increment('semantic_cache.hits')
+                self.metrics.observe('semantic_cache_similarity', similarity)
+                entry_id = entry_ids[match]
+                if entry_id is None:
+                    followers[position] = self._pending[(namespace, match)]
+                    continue
+                row = self._connection.execute("SELECT response FROM entries WHERE id = ?", (entry_id,)).fetchone()
+                self._connection.execute("UPDATE entries SET hits = hits + 1 WHERE id = ?", (entry_id,))
+                responses[position] = json.loads(row[0])
+                if similarity < _IDENTICAL and self.audit_rate and self._random.random() < self.audit_rate:
+                    audited.append((position, entry_id, similarity))
+            self._connection.commit()
+        sent = list(leaders.values()) + [position for position, _, _ in audited]
+        try:
+            fresh = await send([prompts[position] for position in sent]) if sent else []
+        except BaseException as e:
+            # Followers of this call's misses, in any call, get the failure as an error response.
+            fresh = [{'error': f"{type(e).__name__}: {e}"}] * len(sent)
+            self._resolve(leaders, requests, vectors, dict(zip(sent, fresh)))
+            raise
+        fresh = dict(zip(sent, fresh))
+        self._resolve(leaders, requests, vectors, fresh)
+        with self._lock:
+            for position, entry_id, similarity in audited:
+                if 'error' in fresh[position]:
+                    continue
+                matched = self._same_answer(responses[position], fresh[position], self.model.handle_response)
+                self.audits += 1
+                self.metrics.increment('semantic_cache_audits')
+                if not matched:
+                    self.false_hits += 1
+                    self.metrics.increment('semantic_cache_false_hits')
+                self._connection.execute(
+                    "INSERT INTO audits (entry_id, similarity, matched, cached, fresh, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry_id, similarity, int(matched), json.dumps(responses[position], ensure_ascii=False),
+                     json.dumps(fresh[position], ensure_ascii=False), time.time()))
+                responses[position] = fresh[position]
+            self._connection.commit()
+        for (namespace, index_position), position in leaders.items():
+            responses[position] = fresh[position]
+        for position, pending in followers.items():
+            responses[position] = await pending
+        return responses
+
+    def _resolve(self, leaders: Dict[Tuple[str, int], int], requests: List[Tuple[str, str]],
+                 vectors: np.ndarray, fresh: Dict[int, Dict[str, Any]]) -> None:
+        """Stores the responses of a call's misses and hands them to the followers waiting on them."""
+        with self._lock:
+            for key, position in leaders.items():
+                namespace, index_position = key
+                self._store(namespace, requests[position][1], vectors[position], index_position, fresh[position])
+                self._pending.pop(key).set_result(fresh[position])
+            self._connection.commit()
+
+    async def amake_request(self, prompt: str, model: str, temperature: float = 0.5,
+                            max_tokens: int = 500) -> Dict[str, Any]:
+        return (await self.amake_requests([prompt], model, temperature, max_tokens))[0]
+
+    async def amake_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                             max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """
+        Serves prompts similar to earlier ones from the cache and sends the rest, each
+        group of near-duplicates once, through the wrapped client's amake_requests().
+        """
+        return await self._serve(prompts, model, temperature, max_tokens,
+                                 lambda pending: self.model.amake_requests(pending, model, temperature, max_tokens))
+
+    async def amake_streaming_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                                       max_tokens: int = 500, validator=None) -> List[Dict[str, Any]]:
+        """Like amake_requests(), streaming the prompts that are sent."""
+        return await self._serve(prompts, model, temperature, max_tokens,
+                                 lambda pending: self.model.amake_streaming_requests(
+                                     pending, model, temperature, max_tokens, validator))
+
+    def make_request(self, prompt: str, model: str, temperature: float = 0.5, max_tokens: int = 500) -> Dict[str, Any]:
+        return self.make_requests([prompt], model, temperature, max_tokens)[0]
+
+    def make_requests(self, prompts: List[str], model: str, temperature: float = 0.5,
+                      max_tokens: int = 500) -> List[Dict[str, Any]]:
+        """Synchronous counterpart of amake_requests(); works with synchronous clients too."""
+        async def send_sync(pending: List[str]) -> List[Dict[str, Any]]:
+            return [self.model.make_request(prompt, model, temperature, max_tokens) for prompt in pending]
+
+        if hasattr(self.model, 'amake_requests'):
+            return asyncio.run(self.amake_requests(prompts, model, temperature, max_tokens))
+        return asyncio.run(self._serve(prompts, model, temperature, max_tokens, send_sync))
+
+    @asynccontextmanager
+    async def session(self):
+        """Opens the wrapped client's session, if it has one, so that batches share its connections."""
+        if hasattr(self.model, 'session'):
+            async with self.model.session():
+                yield self
+        else:
+            yield self
+
+    def handle_response(self, response: Dict[str, Any]) -> str:
+        return self.model.handle_response(response)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit and audit counts, the hit rate and the estimated false-hit rate."""
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            audits, false_hits = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - matched), 0) FROM audits").fetchone()
+        lookups = self.hits + self.misses
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'audits': audits, 'false_hits': false_hits,
+                'false_hit_rate': false_hits / audits if audits else None}
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,216 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import numpy as np
+
+"""
+Module: metrics.py
+Purpose: Implements the instrumentation layer shared by the pipeline components.
+
+Classes:
+    MetricsRecorder: Thread-safe recorder of stage timings, counters, gauges and latencies.
+
+Usage:
+    Components accept an optional recorder and record into it: stage wall time and rows
+    (rows/sec), counters such as tokens in/out and cache hits/misses, gauges such as
+    queue depth, and latency samples summarised as percentiles. The recorder is
+    exported as a JSON run report or in the Prometheus text format.
+
+        metrics = MetricsRecorder()
+        with metrics.stage('clean', rows=len(batch)):
+            batch = cleaner.clean_data(batch, text_columns)
+        metrics.observe('llm_request_seconds', 0.42)
+        metrics.write_report('data/output/run_report.json')
+
+    profile() is an opt-in cProfile hook whose output can be opened with pstats or
+    snakeviz. Sampling profilers such as py-spy need no hook: stage work runs in
+    ordinary threads and processes, so `py-spy record --subprocesses` sees all of it.
+"""
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+_UNSAFE_METRIC_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def _metric_name(*parts: str) -> str:
+    """Joins the parts into a valid Prometheus metric name."""
+    return _UNSAFE_METRIC_CHARS.sub('_', '_'.join(parts))
+
+
+class MetricsRecorder:
+    """
+    Collects metrics of a pipeline run. Every method is safe to call from several
+    threads; latency samples are capped at `max_samples` per metric through
+    reservoir sampling, so memory stays bounded on long runs.
+    """
+    def __init__(self, max_samples: int = 100_000, prefix: str = 'pipeline'):
+        """
+        Args:
+            max_samples (int): Samples kept per latency metric for the percentiles.
+            prefix (str): Prefix of the Prometheus metric names.
+        """
+        self.max_samples = max_samples
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+        self._samples = {}
+        self._sample_stats = {}
+
+    def record_stage(self, name: str, seconds: float, rows: int = 0) -> None:
+        """Adds one call of a stage that took `seconds` and processed `rows`."""
+        with self._lock:
+            stage = self._stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0})
+            stage['seconds'] += seconds
+            stage['calls'] += 1
+            stage['rows'] += rows
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Times the enclosed block as one call of the stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start, rows)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Sets the current value of a gauge and keeps track of its maximum."""
+        with self._lock:
+            gauge = self._gauges.setdefault(name, {'value': value, 'max': value})
+            gauge['value'] = value
+            gauge['max'] = max(gauge['max'], value)
+
+    def observe(self, name: str, value: float) -> None:
+        """Records one sample of a latency-like metric."""
+        with self._lock:
+            samples = self._samples.setdefault(name, [])
+            stats = self._sample_stats.setdefault(name, {'count': 0, 'sum': 0.0, 'max': value})
+            stats['count'] += 1
+            stats['sum'] += value
+            stats['max'] = max(stats['max'], value)
+            if len(samples) < self.max_samples:
+                samples.append(value)
+            else:
+                slot = self._random.randrange(stats['count'])
+                if slot < self.max_samples:
+                    samples[slot] = value
+
+    def _latencies(self) -> Dict[str, Dict[str, float]]:
+        latencies = {}
+        for name, samples in self._samples.items():
+            stats = self._sample_stats[name]
+            values = np.quantile(np.asarray(samples), QUANTILES)
+            latencies[name] = {
+                'count': stats['count'],
+                'mean': stats['sum'] / stats['count'],
+                **{f"p{round(q * 100)}": float(value) for q, value in zip(QUANTILES, values)},
+                'max': stats['max'],
+            }
+        return latencies
+
+    def _cache_hit_rates(self) -> Dict[str, float]:
+        """Hit rates of every counter pair named '<cache>.hits' and '<cache>.misses'."""
+        rates = {}
+        for name, hits in self._counters.items():
+            if name.endswith('.hits'):
+                cache = name[:-len('.hits')]
+                total = hits + self._counters.get(f"{cache}.misses", 0)
+                rates[cache] = hits / total if total else 0.0
+        return rates
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the run report as a JSON-serialisable dict."""
+        with self._lock:
+            stages = {name: {**stage, 'rows_per_sec': stage['rows'] / stage['seconds'] if stage['seconds'] else 0.0}
+                      for name, stage in self._stages.items()}
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': time.perf_counter() - self._started,
+                'stages': stages,
+                'counters': dict(self._counters),
+                'gauges': {name: dict(gauge) for name, gauge in self._gauges.items()},
+                'latencies': self._latencies(),
+                'cache_hit_rates': self._cache_hit_rates(),
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.report(), indent=indent, sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        report = self.report()
+        lines = []
+
+        def family(name: str, kind: str, samples) -> None:
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value:.9g}" for labels, value in samples)
+
+        stages = sorted(report['stages'].items())
+        for field, suffix in (('seconds', 'seconds_total'), ('rows', 'rows_total'), ('calls', 'calls_total')):
+            if stages:
+                family(_metric_name(self.prefix, 'stage', suffix), 'counter',
+                       [(f'{{stage="{name}"}}', stage[field]) for name, stage in stages])
+        for name, value in sorted(report['counters'].items()):
+            family(_metric_name(self.prefix, name, 'total'), 'counter', [('', value)])
+        for name, gauge in sorted(report['gauges'].items()):
+            family(_metric_name(self.prefix, name), 'gauge', [('', gauge['value'])])
+            family(_metric_name(self.prefix, name, 'max'), 'gauge', [('', gauge['max'])])
+        for name, latency in sorted(report['latencies'].items()):
+            metric = _metric_name(self.prefix, name)
+            family(metric, 'summary', [(f'{{quantile="{q}"}}', latency[f"p{round(q * 100)}"]) for q in QUANTILES])
+            lines.append(f"{metric}_sum {latency['mean'] * latency['count']:.9g}")
+            lines.append(f"{metric}_count {latency['count']}")
+        for name, rate in sorted(report['cache_hit_rates'].items()):
+            family(_metric_name(self.prefix, name, 'hit_ratio'), 'gauge', [('', rate)])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write(file_path: str, text: str) -> None:
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp_path, file_path)
+
+    def write_report(self, file_path: str) -> None:
+        """Writes the JSON run report."""
+        self._write(file_path, self.to_json())
+
+    def write_prometheus(self, file_path: str) -> None:
+        """Writes the Prometheus text, e.g. for node_exporter's textfile collector."""
+        self._write(file_path, self.to_prometheus())
+
+    @contextmanager
+    def profile(self, file_path: Optional[str]):
+        """
+        Runs the enclosed block under cProfile and dumps the stats to `file_path`.
+        Does nothing when `file_path` is empty, so call sites can pass a config value.
+        cProfile only sees the calling thread; use py-spy for threads and workers.
+        """
+        if not file_path:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if os.path.dirname(file_path):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            profiler.dump_stats(file_path)
@@ -0,0 +1,224 @@
+import glob
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from data_saver.data_saver import DataSaver, _atomic_path
+from interfaces.work_queue_interface import WorkQueueInterface, WorkUnit
+
+"""
+Module: distributed.py
+Purpose: Runs the pipeline on several nodes that share a work queue and a filesystem.
+
+Classes:
+    ShardCoordinator: Shards the input into work units and collects their results.
+    ShardLoader: Streams the rows of one shard, like DataLoader streams an input file.
+    ShardWorker: Leases units from the queue, processes them and reports their results.
+
+Functions:
+    shard_of: Assigns row ids to shards by hash.
+
+Usage:
+    The coordinator streams the DataLoader batches once and writes every row to the
+    shard given by the hash of its `id` (or `map_id`), as Parquet parts under
+    `work_dir/shards/shard-NNNNN/`. Only then are the non-empty shards queued as work
+    units, so a worker never sees a partial shard. The assignment depends only on the
+    id, so a row always lands in the same shard and duplicates of a row are cleaned
+    out by the worker that processes that shard.
+
+    Workers on any node lease units and run each one through a Pipeline whose loader is
+    the shard and whose saver writes to `work_dir/results/<unit>/attempt-N/`. While a
+    unit is processed, a heartbeat thread renews the lease, so only units of dead or
+    partitioned workers expire and are retried elsewhere. Every attempt writes to its
+    own directory and the queue keeps the result of the attempt that held the lease,
+    so a retried unit is never counted twice. Finally collect() streams the results of
+    the completed units into the configured DataSaver.
+
+        coordinator = ShardCoordinator(SQLiteWorkQueue("/shared/run/queue.sqlite"), "/shared/run", 64)
+        coordinator.submit(DataLoader(input_path).iter_batches(100_000, columns), 'id')
+        # on every node
+        ShardWorker.from_config(config, template, validator).run(wait=True)
+        # once the queue is finished
+        coordinator.collect(DataSaver.from_config(config))
+"""
+
+
+def shard_of(ids: pd.Series, num_shards: int) -> np.ndarray:
+    """Returns the shard of every row id; ids are hashed as strings, so 1 and '1' agree."""
+    return (pd.util.hash_array(ids.astype(str).to_numpy(dtype=object)) % np.uint64(num_shards)).astype(np.int64)
+
+
+class ShardCoordinator:
+    """
+    Splits the input of a run into hash shards queued as work units, and gathers their results.
+    """
+    def __init__(self, queue: WorkQueueInterface, work_dir: str, num_shards: int = 64):
+        """
+        Args:
+            queue (WorkQueueInterface): Queue the units are submitted to.
+            work_dir (str): Directory shared by the coordinator and all workers.
+            num_shards (int): Number of shards; a few per worker keeps the load balanced.
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1.")
+        self.queue = queue
+        self.work_dir = work_dir
+        self.num_shards = num_shards
+        self.shards_dir = os.path.join(work_dir, 'shards')
+
+    @staticmethod
+    def unit_id(shard: int) -> str:
+        return f"shard-{shard:05d}"
+
+    def submit(self, batches: Iterable[pd.DataFrame], id_column: str) -> Dict[str, int]:
+        """
+        Writes the batches into shards and queues one work unit per non-empty shard.
+
+        Returns:
+            dict: The number of rows of every queued unit.
+
+        Raises:
+            ValueError: If the work directory already holds submitted shards.
+        """
+        if sum(self.queue.summary().values()) or glob.glob(os.path.join(self.shards_dir, '*')):
+            raise ValueError(f"{self.work_dir} already holds a submitted run; use a new work directory.")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = np.zeros(self.num_shards, dtype=np.int64)
+        for number, batch in enumerate(batches):
+            shards = shard_of(batch[id_column], self.num_shards)
+            for shard, part in batch.groupby(shards, sort=False):
+                file_path = os.path.join(self.shards_dir, self.unit_id(shard), f"part-{number:05d}.parquet")
+                temp_path = _atomic_path(file_path)
+                try:
+                    pq.write_table(pa.Table.from_pandas(part, preserve_index=False), temp_path)
+                    os.replace(temp_path, file_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                rows[shard] += len(part)
+        units = {self.unit_id(shard): int(rows[shard]) for shard in np.flatnonzero(rows)}
+        self.queue.put((unit_id, {'path': os.path.join(self.shards_dir, unit_id), 'rows': count})
+                       for unit_id, count in units.items())
+        return units
+
+    def collect(self, saver: DataSaver) -> Dict[str, Any]:
+        """
+        Appends the results of every completed unit to the saver and closes it.
+
+        Returns:
+            dict: The summed row counts of the units, the queue summary and the saved outputs.
+        """
+        totals: Dict[str, int] = {}
+        for _, result in self.queue.iter_results():
+            for key, value in result.get('counts', {}).items():
+                totals[key] = totals.get(key, 0) + value
+            for path in sorted(glob.glob(os.path.join(result['path'], '**', 'part-*.parquet'), recursive=True)):
+                saver.append(pd.read_parquet(path))
+        return {**totals, 'units': self.queue.summary(), 'outputs': saver.close()}
+
+
+class ShardLoader:
+    """
+    Streams the rows of one shard directory in batches.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def iter_batches(self, batch_size: int = 100_000,
+                     required_columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        import pyarrow.parquet as pq
+
+        for file_path in sorted(glob.glob(os.path.join(self.path, 'part-*.parquet'))):
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size, columns=required_columns):
+                yield batch.to_pandas()
+
+
+class ShardWorker:
+    """
+    Processes work units from a queue until none is left.
+    """
+    def __init__(self, queue: WorkQueueInterface, process: Callable[[WorkUnit], Dict[str, Any]],
+                 worker_id: Optional[str] = None, lease_seconds: float = 600.0, poll_interval: float = 5.0):
+        """
+        Args:
+            queue (WorkQueueInterface): Queue the units are leased from.
+            process (callable): Processes a unit and returns its JSON-serialisable result.
+            worker_id (str, optional): Identifier of the worker; defaults to host and a random suffix.
+            lease_seconds (float): Lease duration; the lease is renewed every third of it.
+            poll_interval (float): Seconds between polls while waiting for leased units.
+        """
+        self.queue = queue
+        self.process = process
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def from_config(cls, config, template, validator, queue: Optional[WorkQueueInterface] = None,
+                    **overrides) -> 'ShardWorker':
+        """
+        Builds a worker that runs every unit through a Pipeline configured like a
+        single-node run, without the run ledger: the unit is the unit of retry.
+        """
+        from pipeline.pipeline import Pipeline
+        from pipeline.work_queue import SQLiteWorkQueue
+
+        work_dir = config.get_value('distributed.work_dir', 'data/work')
+        queue = queue or SQLiteWorkQueue.from_config(config)
+        pipeline = Pipeline.from_config(config, template, validator, ledger=None, report_file=None,
+                                        prometheus_file=None, profile_file=None)
+
+        def process(unit: WorkUnit) -> Dict[str, Any]:
+            output_dir = os.path.join(work_dir, 'results', unit.unit_id, f"attempt-{unit.attempt}")
+            pipeline.loader = ShardLoader(unit.payload['path'])
+            pipeline.saver = DataSaver(output_dir, metrics=pipeline.metrics)
+            summary = pipeline.run()
+            counts = {key: value for key, value in summary.items() if isinstance(value, int)}
+            return {'path': pipeline.saver.dataset_dir, 'counts': counts}
+
+        options = {'lease_seconds': config.get_value('distributed.lease_seconds', 600.0)}
+        return cls(queue, process, **{**options, **overrides})
+
+    def _heartbeat(self, unit: WorkUnit, stop: threading.Event) -> None:
+        """Renews the lease until `stop` is set or the lease is lost."""
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.renew(unit, self.lease_seconds):
+                return
+
+    def run(self, max_units: Optional[int] = None, wait: bool = False) -> Dict[str, int]:
+        """
+        Leases and processes units until none is available, or `max_units` were taken.
+        With `wait`, the worker keeps polling while other workers hold leases, to take
+        over their units if the leases expire, and stops once the queue is finished.
+
+        Returns:
+            dict: The number of units completed, failed and lost to another worker.
+        """
+        counts = {'completed': 0, 'failed': 0, 'lost': 0}
+        while max_units is None or sum(counts.values()) < max_units:
+            unit = self.queue.lease(self.worker_id, self.lease_seconds)
+            if unit is None:
+                if wait and not self.queue.is_finished():
+                    time.sleep(self.poll_interval)
+                    continue
+                break
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(unit, stop), daemon=True)
+            heartbeat.start()
+            try:
+                result = self.process(unit)
+            except Exception as e:
+                self.queue.fail(unit, f"{type(e).__name__}: {e}")
+                counts['failed'] += 1
+                continue
+            finally:
+                stop.set()
+                heartbeat.join()
+            counts['completed' if self.queue.complete(unit, result) else 'lost'] += 1
+        return counts
@@ -0,0 +1,370 @@
+import asyncio
+import json
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+import pandas as pd
+from data_saver.data_saver import DataSaver
+from exceptions.exceptions import LLMRequestError, SchemaViolationError
+from llm_model.llm_router import LLMRouter
+from llm_model.response_cache import CachedLLMModel
+from llm_model.semantic_cache import SemanticCachedLLMModel
+from pipeline.run_ledger import RunLedger
+from prompt_builder.prompt_builder import PromptTemplate
+from prompt_builder.text_chunker import TextChunker
+from validator.validator import ResponseValidator
+
+"""
+Module: map_reduce.py
+Purpose: Processes long documents as chunks fanned out to the LLM and merged back together.
+
+Classes:
+    MapReduceRunner: Chunks documents, maps every chunk through the LLM and reduces the results.
+
+Functions:
+    merge_results: Merges structured per-chunk results field by field.
+
+Usage:
+    Documents stream in as page rows (PDFDataLoader with split_by='page') and are cut
+    into token-budgeted chunks by a TextChunker. Every chunk is rendered with the map
+    template and sent concurrently, with at most `max_chunks_in_flight` outstanding
+    across documents, so a long document takes about chunks / concurrency request
+    latencies and only the chunks in flight are held in memory. Once all chunks of a
+    document are answered, their parsed results are reduced:
+
+        'merge'   merge_results() with optional per-field rules (the default).
+        'llm'     a tree of LLM calls that combine up to `reduce_group_size` partial results each.
+        callable  any function from the list of chunk results to the document result.
+
+        runner = MapReduceRunner(client, template, "gpt-4o-mini", TextChunker(2000, 200),
+                                 validator=ResponseValidator(schema))
+        results = runner.run(DataLoader(pdf_path, split_by='page').iter_batches())
+
+    For large runs, save() streams the result rows into a DataSaver instead and, with
+    a RunLedger, skips documents that an earlier run already saved:
+
+        counts = runner.save(DataLoader(pdf_path, split_by='page').iter_batches(),
+                             DataSaver.from_config(config), RunLedger.from_config(config))
+"""
+
+REDUCE_RULES = ('any', 'all', 'sum', 'max', 'min', 'first', 'vote', 'unique')
+DEFAULT_REDUCE_INSTRUCTIONS = (
+    "The JSON objects below are partial answers extracted from consecutive parts of one "
+    "document. Combine them into a single answer for the whole document that has the same "
+    "structure. Return only the JSON object."
+)
+
+
+def _key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _apply_rule(rule: str, values: List[Any]) -> Any:
+    if rule == 'any':
+        return any(values)
+    if rule == 'all':
+        return all(values)
+    if rule == 'sum':
+        return sum(values)
+    if rule == 'max':
+        return max(values)
+    if rule == 'min':
+        return min(values)
+    if rule == 'first':
+        return values[0]
+    if rule == 'vote':
+        # Most common value; ties go to the value seen first.
+        counts = Counter(_key(value) for value in values)
+        return max(values, key=lambda value: counts[_key(value)])
+    if rule == 'unique':
+        merged, seen = [], set()
+        for value in values:
+            for item in value if isinstance(value, list) else [value]:
+                if _key(item) not in seen:
+                    seen.add(_key(item))
+                    merged.append(item)
+        return merged
+    raise ValueError(f"Unknown reduce rule '{rule}'. Use one of {', '.join(REDUCE_RULES)}.")
+
+
+def merge_results(results: List[Any], rules: Optional[Dict[str, str]] = None) -> Any:
+    """
+    Merges chunk results. Objects are merged key by key (recursively); the values of
+    a key are combined with its rule from `rules` (dotted paths for nested keys), or
+    by type: booleans with 'any', numbers with 'max', lists with 'unique' and strings
+    with 'vote'. Missing (None) results are ignored.
+    """
+    rules = rules or {}
+
+    def merge(values: List[Any], path: str) -> Any:
+        values = [value for value in values if value is not None]
+        if not values:
+            return None
+        if path in rules:
+            return _apply_rule(rules[path], values)
+        if all(isinstance(value, dict) for value in values):
+            keys = list(dict.fromkeys(key for value in values for key in value))
+            return {key: merge([value.get(key) for value in values], f"{path}.{key}" if path else key)
+                    for key in keys}
+        if all(isinstance(value, bool) for value in values):
+            return _apply_rule('any', values)
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            return _apply_rule('max', values)
+        if any(isinstance(value, list) for value in values):
+            return _apply_rule('unique', values)
+        return _apply_rule('vote', values)
+
+    return merge(list(results), '')
+
+
+class MapReduceRunner:
+    """
+    Runs documents through the LLM chunk by chunk and reduces the chunk results per document.
+    """
+    def __init__(self, client, template: PromptTemplate, model: str, chunker: TextChunker,
+                 validator: Optional[ResponseValidator] = None,
+                 reduce: Union[str, Callable[[List[Any]], Any]] = 'merge',
+                 reduce_rules: Optional[Dict[str, str]] = None,
+                 reduce_instructions: str = DEFAULT_REDUCE_INSTRUCTIONS, reduce_group_size: int = 8,
+                 id_column: str = 'map_id', temperature: float = 0.5, max_tokens: int = 500,
+                 max_chunks_in_flight: int = 64):
+        """
+        Args:
+            client: A client providing amake_request(), e.g. AsyncLLMClient or CachedLLMModel.
+            template (PromptTemplate): Map prompt; may use the fields `text`, `chunk`,
+                `page_start` and `page_end`.
+            model (str): Model name sent with every request.
+            chunker (TextChunker): Splits the documents into chunks.
+            validator (ResponseValidator, optional): Validates chunk results and document
+                results; invalid chunk results are left out of the reduce step.
+            reduce (str or callable): 'merge', 'llm' or a function of the chunk results.
+            reduce_rules (dict, optional): Per-field rules of the 'merge' reducer.
+            reduce_instructions (str): Instructions of the 'llm' reducer.
+            reduce_group_size (int): Partial results combined by one 'llm' reduce call.
+            id_column (str): Column identifying a document.
+            temperature (float): Sampling temperature of the requests.
+            max_tokens (int): Maximum tokens of each response.
+            max_chunks_in_flight (int): Map requests outstanding at the same time.
+        """
+        if not callable(reduce) and reduce not in ('merge', 'llm'):
+            raise ValueError("reduce must be 'merge', 'llm' or a callable.")
+        if reduce_group_size < 2:
+            raise ValueError("reduce_group_size must be at least 2.")
+        self.client = client
+        self.template = template
+        self.model = model
+        self.chunker = chunker
+        self.validator = validator
+        self.reduce = reduce
+        self.reduce_rules = reduce_rules
+        self.reduce_instructions = reduce_instructions
+        self.reduce_group_size = reduce_group_size
+        self.id_column = id_column
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_chunks_in_flight = max_chunks_in_flight
+
+    @classmethod
+    def from_config(cls, config, template: PromptTemplate, validator: Optional[ResponseValidator] = None,
+                    client=None, **overrides) -> 'MapReduceRunner':
+        """
+        Builds a runner from the 'chunking' section of a ConfigInterface. Without a
+        client, the LLM client (with the response caches, if configured) comes from the
+        'llm_model' section.
+        """
+        model_config = config.get_model_config()
+        if client is None:
+            client = SemanticCachedLLMModel.from_config(LLMRouter.from_config(config), config,
+                                                        prefix=template.static_prefix)
+            client = CachedLLMModel.from_config(client, config)
+        options = {
+            'reduce': config.get_value('chunking.reduce', 'merge'),
+            'reduce_rules': config.get_value('chunking.reduce_rules'),
+            'max_chunks_in_flight': config.get_value('chunking.max_chunks_in_flight', 64),
+            'temperature': model_config.get('temperature', 0.5),
+            'max_tokens': model_config.get('max_tokens', 500),
+        }
+        return cls(client, template, model_config.get('model_name'), TextChunker.from_config(config),
+                   validator=validator, **{**options, **overrides})
+
+    async def _ask(self, prompt: str) -> Optional[Any]:
+        """
+        Sends one prompt and returns the parsed result, or None if the request failed or
+        the result is invalid. Other exceptions are errors of the caller and propagate.
+        """
+        import httpx
+
+        try:
+            response = await self.client.amake_request(prompt, self.model, self.temperature, self.max_tokens)
+        except (LLMRequestError, SchemaViolationError, httpx.HTTPError):
+            return None
+        if 'error' in response:
+            return None
+        text = self.client.handle_response(response)
+        if self.validator is not None:
+            parsed, errors = self.validator.validate_text(text)
+            return None if errors else parsed
+        try:
+            return ResponseValidator.parse(text)
+        except ValueError:
+            return None
+
+    async def _reduce_with_llm(self, results: List[Any], slots: asyncio.Semaphore) -> Optional[Any]:
+        """Combines the results in groups, level by level, until one result is left."""
+
+        async def ask(prompt: str) -> Optional[Any]:
+            async with slots:
+                return await self._ask(prompt)
+
+        while len(results) > 1:
+            groups = [results[start:start + self.reduce_group_size]
+                      for start in range(0, len(results), self.reduce_group_size)]
+            prompts = [f"{self.reduce_instructions}\n\nPartial answers:\n"
+                       + "\n".join(json.dumps(result, ensure_ascii=False, default=str) for result in group)
+                       for group in groups]
+            reduced = await asyncio.gather(*(ask(prompt) for prompt in prompts))
+            # A failed reduce call falls back to merging its group, so no level loses data.
+            results = [result if result is not None else merge_results(group, self.reduce_rules)
+                       for result, group in zip(reduced, groups)]
+        return results[0] if results else None
+
+    async def _finish_document(self, doc_id, chunk_tasks: List[asyncio.Task],
+                               slots: asyncio.Semaphore) -> Dict[str, Any]:
+        results = await asyncio.gather(*chunk_tasks)
+        answered = [result for result in results if result is not None]
+        if not answered:
+            merged = None
+        elif callable(self.reduce):
+            merged = self.reduce(answered)
+        elif self.reduce == 'llm':
+            merged = await self._reduce_with_llm(answered, slots)
+        else:
+            merged = merge_results(answered, self.reduce_rules)
+        errors = [] if merged is not None else ["no chunk returned a valid result"]
+        if merged is not None and self.validator is not None:
+            errors = self.validator.validate(merged)
+        return {self.id_column: doc_id, 'chunks': len(results), 'failed_chunks': len(results) - len(answered),
+                'result': json.dumps(merged, ensure_ascii=False, default=str) if merged is not None else None,
+                'valid': not errors, 'errors': '; '.join(errors)}
+
+    async def aiter_results(self, batches: Iterable[pd.DataFrame]):
+        """
+        Yields one result row per document, in document order, as soon as the document
+        and all documents before it are done. Pages are read and chunked in a thread;
+        map and reduce requests share the `max_chunks_in_flight` limit.
+        """
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_chunks_in_flight)
+        finished = deque()
+
+        async def map_chunk(chunk_number: int, chunk) -> Optional[Any]:
+            try:
+                return await self._ask(self.template.render({
+                    'text': chunk.text, 'chunk': chunk_number, 'page_start': chunk.page_start,
+                    'page_end': chunk.page_end}))
+            finally:
+                slots.release()
+
+        def chunk_stream():
+            for doc_id, pages in self.chunker.iter_documents(batches, self.id_column):
+                yield doc_id, None
+                for chunk in self.chunker.iter_chunks(pages):
+                    yield doc_id, chunk
+            yield None, None
+
+        stream = chunk_stream()
+        doc_id, chunk_tasks = None, []
+        while True:
+            next_doc, chunk = await loop.run_in_executor(None, next, stream)
+            if chunk is None:
+                # A new document starts (or the stream ended): close the current one.
+                if doc_id is not None:
+                    finished.append(asyncio.ensure_future(self._finish_document(doc_id, chunk_tasks, slots)))
+                doc_id, chunk_tasks = next_doc, []
+                while finished and (finished[0].done() or next_doc is None):
+                    yield await finished.popleft()
+                if next_doc is None:
+                    break
+                continue
+            await slots.acquire()
+            chunk_tasks.append(asyncio.ensure_future(map_chunk(len(chunk_tasks), chunk)))
+
+    @property
+    def result_columns(self) -> List[str]:
+        return [self.id_column, 'chunks', 'failed_chunks', 'result', 'valid', 'errors']
+
+    async def _consume(self, batches: Iterable[pd.DataFrame], handle_row) -> None:
+        """Awaits handle_row(row) for every document result, inside the client session if it has one."""
+        if hasattr(self.client, 'session'):
+            async with self.client.session():
+                async for row in self.aiter_results(batches):
+                    await handle_row(row)
+        else:
+            async for row in self.aiter_results(batches):
+                await handle_row(row)
+
+    async def arun(self, batches: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """Processes all documents and returns one result row per document."""
+        rows = []
+
+        async def collect(row: Dict[str, Any]) -> None:
+            rows.append(row)
+
+        await self._consume(batches, collect)
+        return pd.DataFrame(rows, columns=self.result_columns)
+
+    def run(self, batches: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """Synchronous wrapper around arun()."""
+        return asyncio.run(self.arun(batches))
+
+    def _unsaved(self, batches: Iterable[pd.DataFrame], ledger: RunLedger,
+                 skipped: set) -> Iterator[pd.DataFrame]:
+        """Drops the pages of documents the ledger records as saved, adding their ids to `skipped`."""
+        for batch in batches:
+            ids = batch[self.id_column].astype(str)
+            states = ledger.get_states(ids.unique())
+            saved = ids.isin(states.index[states['state'] == 'saved'])
+            skipped.update(ids[saved])
+            yield batch[~saved.to_numpy()]
+
+    async def asave(self, batches: Iterable[pd.DataFrame], saver: DataSaver,
+                    ledger: Optional[RunLedger] = None) -> Dict[str, int]:
+        """
+        Processes all documents and appends every result row to the saver as soon as it
+        is ready, so only the documents in flight are held in memory. With a ledger,
+        documents it records as saved are skipped, and documents are marked 'saved' once
+        the saver has flushed them to a part file; the saver is flushed before returning.
+        Documents are identified by their id alone: a changed document keeps its saved
+        state until the ledger is reset (e.g. by running without it).
+
+        Returns:
+            dict: The number of documents saved, valid and skipped, and of failed chunks.
+        """
+        loop = asyncio.get_running_loop()
+        skipped = set()
+        if ledger is not None:
+            batches = self._unsaved(batches, ledger, skipped)
+        counts = {'documents': 0, 'valid': 0, 'failed_chunks': 0}
+        unflushed = []
+
+        async def mark_flushed(written: List[str]) -> None:
+            if written and ledger is not None and unflushed:
+                await loop.run_in_executor(None, ledger.mark, list(unflushed), 'saved')
+            if written:
+                unflushed.clear()
+
+        async def save(row: Dict[str, Any]) -> None:
+            unflushed.append(row[self.id_column])
+            await mark_flushed(await loop.run_in_executor(
+                None, saver.append, pd.DataFrame([row], columns=self.result_columns)))
+            counts['documents'] += 1
+            counts['valid'] += int(row['valid'])
+            counts['failed_chunks'] += row['failed_chunks']
+
+        await self._consume(batches, save)
+        await mark_flushed(await loop.run_in_executor(None, saver.flush))
+        return {**counts, 'skipped': len(skipped)}
+
+    def save(self, batches: Iterable[pd.DataFrame], saver: DataSaver,
+             ledger: Optional[RunLedger] = None) -> Dict[str, int]:
+        """Synchronous wrapper around asave()."""
+        return asyncio.run(self.asave(batches, saver, ledger))
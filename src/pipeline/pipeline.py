@@ -0,0 +1,369 @@
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from data_cleaner.data_cleaner import DataCleaner, SeenHashes
+from data_loader.data_loader import DataLoader
+from data_saver.data_saver import DataSaver
+from llm_model.llm_router import LLMRouter
+from llm_model.response_cache import CachedLLMModel
+from llm_model.semantic_cache import SemanticCachedLLMModel
+from metrics.metrics import MetricsRecorder
+from pipeline.run_ledger import RunLedger
+from prompt_builder.prompt_builder import PromptTemplate
+from validator.validator import ResponseValidator
+
+"""
+Module: pipeline.py
+Purpose: Wires the pipeline components together as concurrent stages.
+
+Classes:
+    Pipeline: Runs Loader -> Cleaner -> PromptBuilder -> LLM -> Validator -> Saver.
+
+Usage:
+    Each stage is an asyncio task connected to the next by a bounded queue, so a slow
+    stage makes the stages before it wait (backpressure) and memory stays bounded by
+    `queue_size` batches per queue. Loading and saving run in threads, cleaning runs in
+    a process pool, and the LLM stage keeps several batches of requests in flight, so
+    parsing, cleaning and saving overlap with the network-bound requests.
+
+        template = PromptBuilder().compile_template(questions, schema, ['title', 'abstract'])
+        pipeline = Pipeline.from_config(config, template, ResponseValidator(schema))
+        summary = pipeline.run()
+
+    Every stage records its busy time and rows into the pipeline's MetricsRecorder, and
+    the depth of every queue is tracked as a gauge. A queue that stays full points at
+    the stage after it as the bottleneck.
+"""
+
+_DONE = object()
+
+
+def _clean_batch(cleaner: DataCleaner, batch: pd.DataFrame, text_columns: List[str],
+                 near_duplicate_threshold: Optional[float] = None) -> Tuple[pd.DataFrame, float]:
+    """
+    Cleans one batch, optionally dropping near-duplicate rows within it, and returns it
+    with the seconds it took; module-level so that it can run in a worker process.
+    """
+    start = time.perf_counter()
+    batch = cleaner.clean_data(batch, text_columns)
+    if near_duplicate_threshold:
+        batch = cleaner.remove_near_duplicates(batch, text_columns, threshold=near_duplicate_threshold)
+    return batch, time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    Streams batches of input rows through cleaning, prompting, the LLM, validation and
+    saving. With a RunLedger, rows already saved by an earlier run are skipped and the
+    state of every row is recorded as it moves through the stages.
+    """
+    def __init__(self, loader, cleaner: DataCleaner, template: PromptTemplate, llm,
+                 validator: ResponseValidator, saver: DataSaver, text_columns: List[str], model: str,
+                 id_column: str = 'id', temperature: float = 0.5, max_tokens: int = 500,
+                 batch_size: int = 1_000, queue_size: int = 4, cpu_workers: int = 1,
+                 llm_workers: int = 2, stream: bool = False, near_duplicate_threshold: Optional[float] = None,
+                 ledger: Optional[RunLedger] = None,
+                 metrics: Optional[MetricsRecorder] = None, report_file: Optional[str] = None,
+                 prometheus_file: Optional[str] = None, profile_file: Optional[str] = None):
+        """
+        Args:
+            loader: A loader providing iter_batches(), e.g. DataLoader.
+            cleaner (DataCleaner): Cleaner applied to every batch.
+            template (PromptTemplate): Compiled prompt rendered for every row.
+            llm: A client providing amake_requests(), e.g. AsyncLLMClient or CachedLLMModel.
+            validator (ResponseValidator): Validator of the response text.
+            saver (DataSaver): Saver the results are appended to.
+            text_columns (list[str]): Columns that are cleaned and hashed by the ledger.
+            model (str): Model name sent with every request.
+            id_column (str): Column identifying a row ('id' or 'map_id').
+            temperature (float): Sampling temperature of the requests.
+            max_tokens (int): Maximum tokens of each response.
+            batch_size (int): Rows per batch read from the loader.
+            queue_size (int): Batches held by each queue between two stages.
+            cpu_workers (int): Processes used for cleaning; 0 cleans in a thread instead.
+            llm_workers (int): Batches whose requests are in flight at the same time.
+            stream (bool): Stream the responses and abandon each one as soon as it can
+                no longer match the validator's schema; needs a client providing
+                amake_streaming_requests(). Abandoned responses are saved as invalid.
+            near_duplicate_threshold (float, optional): Drops rows whose text is a near
+                duplicate (MinHash Jaccard estimate) of an earlier row of the same batch.
+            ledger (RunLedger, optional): Ledger that makes the run resumable.
+            metrics (MetricsRecorder, optional): Recorder of stage timings, queue depths
+                and row counts; share it with the components to get a single report.
+            report_file (str, optional): Path the JSON run report is written to.
+            prometheus_file (str, optional): Path the Prometheus text is written to.
+            profile_file (str, optional): Path of cProfile stats of the event loop thread.
+        """
+        self.loader = loader
+        self.cleaner = cleaner
+        self.template = template
+        self.llm = llm
+        self.validator = validator
+        self.saver = saver
+        self.text_columns = list(text_columns)
+        self.model = model
+        self.id_column = id_column
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.cpu_workers = cpu_workers
+        self.llm_workers = llm_workers
+        self.stream = stream
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.ledger = ledger
+        self.metrics = metrics or MetricsRecorder()
+        self.report_file = report_file
+        self.prometheus_file = prometheus_file
+        self.profile_file = profile_file
+        self.counts = {}
+        self._unflushed = []
+
+    @classmethod
+    def from_config(cls, config, template: PromptTemplate, validator: ResponseValidator,
+                    **overrides) -> 'Pipeline':
+        """
+        Builds the pipeline from a ConfigInterface. The loader, LLM client (with the
+        exact and semantic response caches, if configured) and saver come from their
+        config sections, and the stage settings from the 'pipeline' section. All of them record into one
+        MetricsRecorder, whose reports are written as configured in the 'metrics' section.
+        """
+        is_pdf = DataLoader.is_pdf_input(config)
+        id_column = 'map_id' if is_pdf else 'id'
+        text_columns = [col for col in config.get_required_columns(is_pdf=is_pdf) if col != id_column]
+        model_config = config.get_model_config()
+        metrics = MetricsRecorder()
+        output_path = config.get_output_path()
+
+        def output_file(key: str) -> Optional[str]:
+            file_name = config.get_value(f"metrics.{key}")
+            return os.path.join(output_path, file_name) if file_name else None
+
+        options = {
+            'id_column': id_column,
+            'temperature': model_config.get('temperature', 0.5),
+            'max_tokens': model_config.get('max_tokens', 500),
+            'batch_size': config.get_value('pipeline.batch_size', 1_000),
+            'queue_size': config.get_value('pipeline.queue_size', 4),
+            'cpu_workers': config.get_value('pipeline.cpu_workers', 1),
+            'llm_workers': config.get_value('pipeline.llm_workers', 2),
+            'stream': model_config.get('stream', False),
+            'near_duplicate_threshold': config.get_value('pipeline.near_duplicate_threshold'),
+            'ledger': RunLedger.from_config(config) if config.get_value('pipeline.resume', False) else None,
+            'metrics': metrics,
+            'report_file': output_file('report_file'),
+            'prometheus_file': output_file('prometheus_file'),
+            'profile_file': output_file('profile_file'),
+        }
+        llm = SemanticCachedLLMModel.from_config(LLMRouter.from_config(config, metrics=metrics), config,
+                                                 prefix=template.static_prefix, metrics=metrics)
+        llm = CachedLLMModel.from_config(llm, config, metrics=metrics)
+        options = {**options, **overrides}
+        # Without a ledger every row is processed again, so the saver starts a new dataset.
+        saver = DataSaver.from_config(config, metrics=metrics, resume=options['ledger'] is not None)
+        return cls(DataLoader.from_config(config, metrics=metrics), DataCleaner(), template, llm,
+                   validator, saver, text_columns, model_config.get('model_name'), **options)
+
+    def _count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+        self.metrics.increment(name, value)
+
+    async def _put(self, queue: asyncio.Queue, name: str, item) -> None:
+        await queue.put(item)
+        self.metrics.set_gauge(f"queue_depth.{name}", queue.qsize())
+
+    async def _timed(self, stage: str, rows: int, func, *args):
+        """Runs func(*args) in a thread and records its time as one call of the stage."""
+        start = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        self.metrics.record_stage(stage, time.perf_counter() - start, rows)
+        return result
+
+    def _mark(self, row_ids: pd.Series, state: str) -> None:
+        if self.ledger is not None and len(row_ids):
+            self.ledger.mark(row_ids, state)
+
+    async def _load(self, output: asyncio.Queue) -> None:
+        """Pulls batches from the loader in a thread; put() blocks while the queue is full."""
+        loop = asyncio.get_running_loop()
+        batches = iter(self.loader.iter_batches(self.batch_size, [self.id_column, *self.text_columns]))
+        while True:
+            start = time.perf_counter()
+            batch = await loop.run_in_executor(None, next, batches, _DONE)
+            if batch is _DONE:
+                break
+            self.metrics.record_stage('load', time.perf_counter() - start, len(batch))
+            self._count('rows_loaded', len(batch))
+            await self._put(output, 'loaded', batch)
+        await output.put(_DONE)
+
+    async def _clean(self, source: asyncio.Queue, output: asyncio.Queue, executor: Optional[Executor]) -> None:
+        """
+        Cleans up to `cpu_workers` batches at a time, keeping their order, then drops
+        rows already seen in earlier batches and, with a ledger, rows already saved.
+        """
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+        seen = SeenHashes()
+        window = max(self.cpu_workers, 1)
+
+        async def emit(future) -> None:
+            nonlocal seen
+            batch, seconds = await future
+            self.metrics.record_stage('clean', seconds, len(batch))
+            batch, seen = self.cleaner.drop_seen_rows(batch, seen)
+            if self.ledger is not None and not batch.empty:
+                total = len(batch)
+                batch = await self._timed('ledger', total, self.ledger.register,
+                                          batch, self.id_column, self.text_columns)
+                self._count('rows_skipped', total - len(batch))
+            self._count('rows_cleaned', len(batch))
+            if not batch.empty:
+                await self._put(output, 'cleaned', batch)
+
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                break
+            in_flight.append(loop.run_in_executor(executor, _clean_batch, self.cleaner, batch, self.text_columns,
+                                                  self.near_duplicate_threshold))
+            if len(in_flight) >= window:
+                await emit(in_flight.popleft())
+        while in_flight:
+            await emit(in_flight.popleft())
+        await output.put(_DONE)
+
+    async def _render(self, source: asyncio.Queue, output: asyncio.Queue) -> None:
+        """Renders the prompt of every row with the compiled template."""
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                break
+            prompts = await self._timed('render', len(batch), self.template.render_many, batch)
+            self._mark(batch[self.id_column], 'prompted')
+            await self._put(output, 'prompted', (batch, prompts))
+        for _ in range(self.llm_workers):
+            await output.put(_DONE)
+
+    async def _request(self, source: asyncio.Queue, output: asyncio.Queue) -> None:
+        """
+        Sends the prompts of one batch at a time. Several of these workers run side by
+        side so that requests of the next batch start while a batch's stragglers finish.
+        Rows whose request failed are dropped here and stay 'prompted' in the ledger,
+        so a rerun retries them.
+        """
+        while True:
+            item = await source.get()
+            if item is _DONE:
+                break
+            batch, prompts = item
+            start = time.perf_counter()
+            if self.stream:
+                responses = await self.llm.amake_streaming_requests(prompts.tolist(), self.model, self.temperature,
+                                                                    self.max_tokens, self.validator)
+                self._count('responses_aborted', sum('aborted' in response for response in responses))
+            else:
+                responses = await self.llm.amake_requests(prompts.tolist(), self.model,
+                                                          self.temperature, self.max_tokens)
+            self.metrics.record_stage('llm', time.perf_counter() - start, len(batch))
+            failed = np.fromiter(('error' in response for response in responses), dtype=bool, count=len(responses))
+            self._count('requests_failed', int(failed.sum()))
+            batch = batch.assign(response=[self.llm.handle_response(response) if not error else None
+                                           for response, error in zip(responses, failed)])[~failed]
+            self._mark(batch[self.id_column], 'responded')
+            if not batch.empty:
+                await self._put(output, 'responded', batch)
+        await output.put(_DONE)
+
+    async def _validate(self, source: asyncio.Queue, output: asyncio.Queue) -> None:
+        """Validates the responses; stops after every request worker has finished."""
+        remaining = self.llm_workers
+        while remaining:
+            batch = await source.get()
+            if batch is _DONE:
+                remaining -= 1
+                continue
+            results = await self._timed('validate', len(batch), self.validator.validate_batch, batch['response'])
+            batch = batch.assign(valid=results['valid'], errors=results['errors'])
+            self._count('rows_valid', int(results['valid'].sum()))
+            self._count('rows_invalid', int((~results['valid']).sum()))
+            self._mark(batch.loc[batch['valid'], self.id_column], 'validated')
+            await self._put(output, 'validated', batch)
+        await output.put(_DONE)
+
+    def _mark_flushed(self) -> None:
+        """Marks the rows appended since the last flush as 'saved'."""
+        if self._unflushed:
+            self._mark(pd.concat(self._unflushed, ignore_index=True), 'saved')
+            self._unflushed = []
+
+    async def _save(self, source: asyncio.Queue) -> None:
+        """
+        Appends the results to the saver in a thread. The saver buffers rows until a
+        row group is full, so rows are only marked 'saved' once a flush has written
+        them; after a crash, buffered rows are processed again by the next run.
+        """
+        while True:
+            batch = await source.get()
+            if batch is _DONE:
+                break
+            written = await self._timed('save', len(batch), self.saver.append, batch)
+            self._count('rows_saved', len(batch))
+            self._unflushed.append(batch[self.id_column])
+            if written:
+                self._mark_flushed()
+
+    async def _run_stages(self, executor: Optional[Executor]) -> None:
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(5)]
+        tasks = [
+            asyncio.ensure_future(self._load(queues[0])),
+            asyncio.ensure_future(self._clean(queues[0], queues[1], executor)),
+            asyncio.ensure_future(self._render(queues[1], queues[2])),
+            *(asyncio.ensure_future(self._request(queues[2], queues[3])) for _ in range(self.llm_workers)),
+            asyncio.ensure_future(self._validate(queues[3], queues[4])),
+            asyncio.ensure_future(self._save(queues[4])),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def arun(self) -> Dict[str, Any]:
+        """
+        Runs all stages to completion, closes the saver, writes the configured metric
+        reports and returns the row counts of the run together with the saved outputs
+        and the run report.
+        """
+        self.counts = {name: 0 for name in ('rows_loaded', 'rows_skipped', 'rows_cleaned', 'requests_failed',
+                                            'rows_valid', 'rows_invalid', 'rows_saved')}
+        self._unflushed = []
+        executor = ProcessPoolExecutor(max_workers=self.cpu_workers) if self.cpu_workers > 0 else None
+        try:
+            if hasattr(self.llm, 'session'):
+                async with self.llm.session():
+                    await self._run_stages(executor)
+            else:
+                await self._run_stages(executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        outputs = await self._timed('close', 0, self.saver.close)
+        self._mark_flushed()
+        if self.report_file:
+            self.metrics.write_report(self.report_file)
+        if self.prometheus_file:
+            self.metrics.write_prometheus(self.prometheus_file)
+        return {**self.counts, 'outputs': outputs, 'metrics': self.metrics.report()}
+
+    def run(self) -> Dict[str, Any]:
+        """Synchronous wrapper around arun(), profiled when `profile_file` is set."""
+        with self.metrics.profile(self.profile_file):
+            return asyncio.run(self.arun())
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+"""
+Module: run_ledger.py
+Purpose: Implements the checkpoint ledger that makes pipeline runs incremental and resumable.
+
+Classes:
+    RunLedger: Records the processing state of every input row in SQLite.
+
+Usage:
+    Every row, identified by its `id` (tabular inputs) or `map_id` (PDF inputs), moves
+    through the states loaded -> prompted -> responded -> validated -> saved. The ledger
+    stores the furthest state reached together with a hash of the row content, so that
+    after a crash or on a rerun only rows that are new, changed or unfinished are
+    processed again.
+
+        ledger = RunLedger.from_config(config)
+        pending = ledger.register(batch, 'id', ['title', 'abstract'])
+        ...
+        ledger.mark(pending['id'], 'saved')
+"""
+
+STATES = ('loaded', 'prompted', 'responded', 'validated', 'saved')
+
+
+class RunLedger:
+    """
+    A SQLite ledger of per-row pipeline states. States only move forward, unless the
+    content of a row changes, which sends it back to 'loaded'.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Path of the SQLite ledger file. Parent directories are created.
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS row_states ("
+            "row_id TEXT PRIMARY KEY, content_hash TEXT, state INTEGER NOT NULL, updated_at REAL NOT NULL)")
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config, file_name: str = 'run_ledger.sqlite') -> 'RunLedger':
+        """Creates the ledger in the configured output directory."""
+        return cls(os.path.join(config.get_output_path(), file_name))
+
+    @staticmethod
+    def _state_index(state: str) -> int:
+        if state not in STATES:
+            raise ValueError(f"Unknown state '{state}'. Use one of {', '.join(STATES)}.")
+        return STATES.index(state)
+
+    @staticmethod
+    def row_hashes(data: pd.DataFrame, columns: List[str]) -> pd.Series:
+        """Hashes the content of the given columns of every row into a hex string."""
+        hashes = pd.util.hash_pandas_object(data[columns].astype('string'), index=False)
+        return hashes.map('{:016x}'.format)
+
+    def mark(self, row_ids: Iterable, state: str, content_hashes: Optional[Iterable[str]] = None) -> None:
+        """
+        Records that the rows reached `state`. When content hashes are given, a row whose
+        hash differs from the recorded one is reset to `state` instead of moving forward.
+        """
+        state_index = self._state_index(state)
+        row_ids = [str(row_id) for row_id in row_ids]
+        hashes = list(content_hashes) if content_hashes is not None else [None] * len(row_ids)
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT INTO row_states (row_id, content_hash, state, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(row_id) DO UPDATE SET "
+                "state = CASE WHEN excluded.content_hash IS NOT NULL "
+                "AND excluded.content_hash IS NOT row_states.content_hash "
+                "THEN excluded.state ELSE MAX(row_states.state, excluded.state) END, "
+                "content_hash = COALESCE(excluded.content_hash, row_states.content_hash), "
+                "updated_at = excluded.updated_at",
+                [(row_id, content_hash, state_index, now) for row_id, content_hash in zip(row_ids, hashes)])
+            self._connection.commit()
+
+    def get_states(self, row_ids: Iterable) -> pd.DataFrame:
+        """Returns the recorded `content_hash` and `state` of the rows, indexed by row id."""
+        row_ids = [str(row_id) for row_id in row_ids]
+        with self._lock:
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_ids (row_id TEXT PRIMARY KEY)")
+            self._connection.execute("DELETE FROM lookup_ids")
+            self._connection.executemany("INSERT OR IGNORE INTO lookup_ids VALUES (?)", [(row_id,) for row_id in row_ids])
+            rows = self._connection.execute(
+                "SELECT r.row_id, r.content_hash, r.state FROM row_states r "
+                "JOIN lookup_ids l ON l.row_id = r.row_id").fetchall()
+            self._connection.execute("DELETE FROM lookup_ids")
+        states = pd.DataFrame(rows, columns=['row_id', 'content_hash', 'state']).set_index('row_id')
+        states['state'] = states['state'].map(lambda index: STATES[index])
+        return states
+
+    def register(self, data: pd.DataFrame, id_column: str, hash_columns: List[str],
+                 until: str = 'saved') -> pd.DataFrame:
+        """
+        Registers a batch of loaded rows and returns the ones that still need processing:
+        rows that are new, whose content changed, or that have not reached `until`.
+        """
+        until_index = self._state_index(until)
+        ids = data[id_column].astype(str)
+        hashes = self.row_hashes(data, hash_columns)
+        recorded = self.get_states(ids)
+        recorded_hash = ids.map(recorded['content_hash'])
+        recorded_state = ids.map(recorded['state'].map(STATES.index)).fillna(-1)
+        pending = (recorded_hash != hashes).to_numpy() | (recorded_state < until_index).to_numpy()
+        self.mark(ids[pending], 'loaded', hashes[pending])
+        return data[pending]
+
+    def summary(self) -> Dict[str, int]:
+        """Returns the number of rows in each state."""
+        with self._lock:
+            counts = dict(self._connection.execute(
+                "SELECT state, COUNT(*) FROM row_states GROUP BY state").fetchall())
+        return {state: counts.get(index, 0) for index, state in enumerate(STATES)}
+
+    def close(self) -> None:
+        self._connection.close()
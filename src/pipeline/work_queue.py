@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from interfaces.work_queue_interface import WorkQueueInterface, WorkUnit
+
+"""
+Module: work_queue.py
+Purpose: Implements a work queue backed by a SQLite file, shared by the nodes of a distributed run.
+
+Classes:
+    SQLiteWorkQueue: Leases work units to workers with expiry and retries.
+
+Usage:
+    Units move through the states pending -> leased -> done, or back to pending after
+    a failed attempt (after `retry_delay` seconds, doubled on every attempt) and to
+    failed after `max_attempts` attempts. A lease that is not renewed expires and its
+    unit can be leased again, so the units of a crashed or partitioned worker are
+    picked up by the others. Every lease carries its attempt number, and results and
+    renewals are only accepted from the current attempt, so a worker that lost its
+    lease cannot overwrite the result of the one that took over.
+
+    Leasing runs in an IMMEDIATE transaction, which serialises the workers on the
+    database lock, so the queue needs nothing but a filesystem all nodes can reach.
+    WAL mode needs shared memory between the processes and is only safe when they
+    run on one host; the default rollback journal also works on network filesystems
+    with working file locks.
+
+        queue = SQLiteWorkQueue("/shared/run/queue.sqlite")
+        queue.put([("shard-00000", {"path": "/shared/run/shards/shard-00000"})])
+        unit = queue.lease("node-1", lease_seconds=600)
+        queue.complete(unit, {"rows": 1000})
+"""
+
+STATES = ('pending', 'leased', 'done', 'failed')
+
+
+class SQLiteWorkQueue(WorkQueueInterface):
+    """
+    A WorkQueueInterface stored in one SQLite file.
+    """
+    def __init__(self, path: str, max_attempts: int = 3, retry_delay: float = 10.0,
+                 journal_mode: str = 'DELETE', busy_timeout: float = 60.0):
+        """
+        Args:
+            path (str): Path of the SQLite file. Parent directories are created.
+            max_attempts (int): Attempts of a unit before it is marked failed.
+            retry_delay (float): Seconds before a failed unit is retried, doubled per attempt.
+            journal_mode (str): SQLite journal mode; 'WAL' only when all workers share a host.
+            busy_timeout (float): Seconds to wait for the database lock held by another worker.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly where they are needed.
+        self._connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            "unit_id TEXT PRIMARY KEY, payload TEXT NOT NULL, state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, available_at REAL NOT NULL DEFAULT 0, "
+            "lease_expires REAL, result TEXT, error TEXT, updated_at REAL NOT NULL)")
+
+    @classmethod
+    def from_config(cls, config) -> 'SQLiteWorkQueue':
+        """Opens the queue in the work directory configured in the 'distributed' section."""
+        return cls(os.path.join(config.get_value('distributed.work_dir', 'data/work'), 'queue.sqlite'),
+                   max_attempts=config.get_value('distributed.max_attempts', 3),
+                   retry_delay=config.get_value('distributed.retry_delay', 10.0),
+                   journal_mode=config.get_value('distributed.journal_mode', 'DELETE'))
+
+    def _transaction(self, statements) -> Any:
+        """Runs statements(connection) in an IMMEDIATE transaction and returns its result."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._connection)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            return result
+
+    def put(self, units: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        now = time.time()
+        rows = [(unit_id, json.dumps(payload), 'pending', now) for unit_id, payload in units]
+
+        def insert(connection) -> int:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO units (unit_id, payload, state, updated_at) VALUES (?, ?, ?, ?)", rows)
+            return connection.total_changes - before
+
+        return self._transaction(insert)
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkUnit]:
+        def take(connection) -> Optional[WorkUnit]:
+            now = time.time()
+            # Expired leases of units without attempts left fail instead of being retried.
+            connection.execute(
+                "UPDATE units SET state = 'failed', error = 'lease expired', updated_at = ? "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            row = connection.execute(
+                "SELECT unit_id, payload, attempts FROM units "
+                "WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY attempts, unit_id LIMIT 1", (now, now)).fetchone()
+            if row is None:
+                return None
+            unit_id, payload, attempts = row
+            connection.execute(
+                "UPDATE units SET state = 'leased', worker = ?, attempts = ?, lease_expires = ?, updated_at = ? "
+                "WHERE unit_id = ?", (worker, attempts + 1, now + lease_seconds, now, unit_id))
+            return WorkUnit(unit_id, json.loads(payload), attempts + 1, worker)
+
+        return self._transaction(take)
+
+    def _update_lease(self, unit: WorkUnit, assignments: str, values: Tuple) -> bool:
+        """Updates the unit if `unit` still holds its lease; returns whether it did."""
+        def update(connection) -> bool:
+            cursor = connection.execute(
+                f"UPDATE units SET {assignments}, updated_at = ? "
+                "WHERE unit_id = ? AND state = 'leased' AND worker = ? AND attempts = ?",
+                (*values, time.time(), unit.unit_id, unit.worker, unit.attempt))
+            return cursor.rowcount == 1
+
+        return self._transaction(update)
+
+    def renew(self, unit: WorkUnit, lease_seconds: float) -> bool:
+        return self._update_lease(unit, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, unit: WorkUnit, result: Dict[str, Any]) -> bool:
+        return self._update_lease(unit, "state = 'done', lease_expires = NULL, result = ?, error = NULL",
+                                  (json.dumps(result),))
+
+    def fail(self, unit: WorkUnit, error: str) -> None:
+        if unit.attempt >= self.max_attempts:
+            self._update_lease(unit, "state = 'failed', lease_expires = NULL, error = ?", (error,))
+        else:
+            retry_at = time.time() + self.retry_delay * 2 ** (unit.attempt - 1)
+            self._update_lease(unit, "state = 'pending', lease_expires = NULL, available_at = ?, error = ?",
+                               (retry_at, error))
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._connection.execute("SELECT state, COUNT(*) FROM units GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def failures(self) -> Dict[str, str]:
+        """Returns the last error of every failed unit."""
+        with self._lock:
+            return dict(self._connection.execute(
+                "SELECT unit_id, error FROM units WHERE state = 'failed' ORDER BY unit_id").fetchall())
+
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT unit_id, result FROM units WHERE state = 'done' ORDER BY unit_id").fetchall()
+        for unit_id, result in rows:
+            yield unit_id, json.loads(result)
+
+    def close(self) -> None:
+        self._connection.close()
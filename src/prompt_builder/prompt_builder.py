@@ -0,0 +1,141 @@
+import copy
+import json
+import os
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from interfaces.prompt_builder_interface import PromptBuilderInterface
+from validator.validator import ResponseValidator
+
+"""
+Module: prompt_builder.py
+Purpose: Implements the prompt builder that turns the question sheet into LLM prompts.
+
+Classes:
+    PromptTemplate: A compiled prompt with a precomputed static prefix.
+    PromptBuilder: Concrete implementation of the PromptBuilderInterface.
+
+Usage:
+    The question sheet is read once per file version and the master prompt is compiled
+    once into a PromptTemplate. Everything that does not depend on the row (instructions,
+    questions, response schema) lives in the template's static prefix, which keeps it
+    byte-identical across requests so provider-side prompt caching can reuse it. Per-row
+    prompts are then plain string joins of the prefix and the row fields.
+
+        builder = PromptBuilder(sheet_name="prompts")
+        questions = builder.load_questions_from_excel("prompts.xlsx")
+        template = builder.compile_template(questions, schema, fields=['title', 'abstract'])
+        prompts = template.render_many(data)
+"""
+
+DEFAULT_INSTRUCTIONS = (
+    "You are a careful research assistant. Read the input below and answer every question. "
+    "Respond with a single JSON object that conforms to the response schema."
+)
+
+
+class PromptTemplate:
+    """
+    A compiled prompt: a static prefix followed by the fields of one input row.
+    """
+    def __init__(self, static_prefix: str, fields: List[str]):
+        self.static_prefix = static_prefix
+        self.fields = list(fields)
+        self._labels = [f"{field}: " for field in self.fields]
+
+    def render(self, row: Dict[str, Any]) -> str:
+        """Renders the prompt of a single row."""
+        values = (row.get(field) for field in self.fields)
+        return self.static_prefix + "\n".join(
+            label + ("" if value is None or pd.isna(value) else str(value))
+            for label, value in zip(self._labels, values))
+
+    def render_many(self, data: pd.DataFrame) -> pd.Series:
+        """
+        Renders the prompts of all rows. The row-dependent part is built with vectorized
+        string concatenation, and the shared prefix is attached in a single final pass.
+        """
+        suffixes = None
+        for position, (label, field) in enumerate(zip(self._labels, self.fields)):
+            part = (("\n" if position else "") + label) + data[field].astype('string').fillna('')
+            suffixes = part if suffixes is None else suffixes + part
+        prefix = self.static_prefix
+        texts = suffixes.tolist() if suffixes is not None else [""] * len(data)
+        return pd.Series([prefix + text for text in texts], index=data.index, dtype=object)
+
+
+class PromptBuilder(PromptBuilderInterface):
+    """
+    Builds prompts from a question sheet, caching the parsed sheet and compiled prompts.
+    """
+    def __init__(self, sheet_name: Optional[str] = None, question_column: str = 'question',
+                 instructions: str = DEFAULT_INSTRUCTIONS):
+        """
+        Args:
+            sheet_name (str, optional): Sheet holding the questions. Defaults to the first sheet.
+            question_column (str): Column of the sheet holding the question text.
+            instructions (str): Instructions placed at the start of every prompt.
+        """
+        self.sheet_name = sheet_name
+        self.question_column = question_column
+        self.instructions = instructions
+        self._questions_cache = {}
+        self._master_prompt_cache = {}
+        self._validators = {}
+
+    def load_questions_from_excel(self, excel_path: str) -> List[str]:
+        """
+        Loads the questions of the sheet. The sheet is parsed once per file version
+        (path and modification time); later calls return the cached list.
+        """
+        cache_key = (os.path.abspath(excel_path), os.path.getmtime(excel_path), self.sheet_name)
+        if cache_key not in self._questions_cache:
+            sheet = pd.read_excel(excel_path, sheet_name=self.sheet_name if self.sheet_name is not None else 0)
+            if self.question_column not in sheet.columns:
+                raise ValueError(f"Column '{self.question_column}' not found in the prompt sheet {excel_path}.")
+            questions = sheet[self.question_column].dropna().astype(str).str.strip()
+            self._questions_cache[cache_key] = [question for question in questions if question]
+        return list(self._questions_cache[cache_key])
+
+    def create_master_prompt(self, questions: List[str], schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Creates the master prompt; identical inputs are served from the cache. Callers
+        get their own copy, so changing it never alters the cached prompt.
+        """
+        cache_key = (tuple(questions), json.dumps(schema, sort_keys=True))
+        if cache_key not in self._master_prompt_cache:
+            self._master_prompt_cache[cache_key] = {
+                'instructions': self.instructions,
+                'questions': list(questions),
+                'response_schema': copy.deepcopy(schema),
+            }
+        return copy.deepcopy(self._master_prompt_cache[cache_key])
+
+    def get_validator(self, schema: Dict[str, Any]) -> ResponseValidator:
+        """Returns the validator of the schema, compiling it on first use."""
+        cache_key = json.dumps(schema, sort_keys=True)
+        if cache_key not in self._validators:
+            self._validators[cache_key] = ResponseValidator(schema)
+        return self._validators[cache_key]
+
+    def validate_prompt(self, prompt: Dict[str, Any], schema: Dict[str, Any]) -> bool:
+        """Validates the prompt against the schema, compiled once per schema."""
+        errors = self.get_validator(schema).validate(prompt)
+        if errors:
+            print(f"Prompt validation failed: {'; '.join(errors)}")
+            return False
+        return True
+
+    def compile_template(self, questions: List[str], schema: Dict[str, Any], fields: List[str]) -> PromptTemplate:
+        """
+        Compiles the master prompt into a PromptTemplate whose static prefix holds the
+        instructions, the numbered questions and the response schema.
+        """
+        master_prompt = self.create_master_prompt(questions, schema)
+        numbered = "\n".join(f"{number}. {question}" for number, question in enumerate(master_prompt['questions'], 1))
+        static_prefix = (
+            f"{master_prompt['instructions']}\n\n"
+            f"Questions:\n{numbered}\n\n"
+            f"Response schema:\n{json.dumps(master_prompt['response_schema'], indent=2, sort_keys=True)}\n\n"
+            f"Input:\n"
+        )
+        return PromptTemplate(static_prefix, fields)
@@ -0,0 +1,189 @@
+import asyncio
+import importlib.util
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import pandas as pd
+from exceptions.exceptions import LLMRequestError
+
+"""
+Module: prompt_packer.py
+Purpose: Implements token-aware packing of several rows into one LLM request.
+
+Classes:
+    TokenCounter: Counts tokens with tiktoken when installed, or estimates them otherwise.
+    PackedRequest: The row ids and prompt text of one packed request.
+    PromptPacker: Packs rows under a token budget and splits packed responses per row.
+
+Usage:
+    Short rows are cheap to answer but every request repeats the instructions and pays
+    the per-request overhead. The packer greedily fills each request with as many rows
+    as fit under `token_budget`, asks for a JSON object keyed by row id, and splits the
+    answer back into per-row results. Packed responses that fail validation are retried
+    one row per request. The packer is not used by the pipeline or the CLI; call it
+    directly on a DataFrame with unique row ids.
+
+        packer = PromptPacker(instructions, token_budget=3000)
+        results = packer.run(client, data, 'id', ['title', 'abstract'], model="gpt-4o-mini")
+"""
+
+PACKING_INSTRUCTIONS = (
+    "Each input row below is a JSON object with an \"id\" field. Answer every row and return "
+    "a single JSON object whose keys are the row ids and whose values are the answers for "
+    "those rows. Do not add or omit any ids."
+)
+
+
+class TokenCounter:
+    """
+    Counts tokens with the tiktoken encoding of `model` when tiktoken is installed,
+    falling back to an estimate of four characters per token.
+    """
+    def __init__(self, model: Optional[str] = None, encoding_name: str = 'cl100k_base'):
+        self._encoding = None
+        if importlib.util.find_spec('tiktoken'):
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(encoding_name)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+
+class PackedRequest(NamedTuple):
+    ids: List[str]
+    prompt: str
+
+
+class PromptPacker:
+    """
+    Packs rows into requests under a token budget and maps packed answers back to rows.
+    """
+    def __init__(self, instructions: str, token_budget: int = 4000, max_rows_per_request: int = 50,
+                 token_counter: Optional[TokenCounter] = None,
+                 row_validator: Optional[Callable[[Any], bool]] = None):
+        """
+        Args:
+            instructions (str): Task instructions shared by all rows (e.g. the master prompt).
+            token_budget (int): Maximum prompt tokens of a packed request.
+            max_rows_per_request (int): Upper bound on the rows of a packed request.
+            token_counter (TokenCounter, optional): Defaults to a TokenCounter for cl100k_base.
+            row_validator (callable, optional): Returns whether a single row's result is valid.
+        """
+        self.instructions = instructions
+        self.token_budget = token_budget
+        self.max_rows_per_request = max_rows_per_request
+        self.token_counter = token_counter or TokenCounter()
+        self.row_validator = row_validator
+        self._header = f"{instructions}\n\n{PACKING_INSTRUCTIONS}\n\nRows:\n"
+        self._header_tokens = self.token_counter.count(self._header)
+
+    @staticmethod
+    def _render_row(row_id: str, row: Dict[str, Any]) -> str:
+        return json.dumps({'id': row_id, **row}, ensure_ascii=False, default=str)
+
+    def pack(self, data: pd.DataFrame, id_column: str, text_columns: List[str]) -> List[PackedRequest]:
+        """
+        Greedily fills requests with rows in order. A row that does not fit in an empty
+        request on its own still gets a request of its own.
+
+        Raises:
+            ValueError: If the ids are missing or not unique, since packed answers are
+                keyed by row id.
+        """
+        if data[id_column].isna().any() or data[id_column].astype(str).duplicated().any():
+            raise ValueError(f"Column '{id_column}' must hold unique, non-missing ids for packed requests.")
+        requests, ids, lines, tokens = [], [], [], self._header_tokens
+        records = data[text_columns].to_dict('records')
+        for row_id, row in zip(data[id_column].astype(str), records):
+            line = self._render_row(row_id, row)
+            line_tokens = self.token_counter.count(line) + 1
+            if ids and (tokens + line_tokens > self.token_budget or len(ids) == self.max_rows_per_request):
+                requests.append(PackedRequest(ids, self._header + "\n".join(lines)))
+                ids, lines, tokens = [], [], self._header_tokens
+            ids.append(row_id)
+            lines.append(line)
+            tokens += line_tokens
+        if ids:
+            requests.append(PackedRequest(ids, self._header + "\n".join(lines)))
+        return requests
+
+    def split_response(self, request: PackedRequest, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parses a packed answer into {row id: result}. Returns None when the answer is
+        not a JSON object with exactly the requested ids or a row fails validation.
+        """
+        text = text.strip()
+        if text.startswith('```'):
+            text = text.strip('`').removeprefix('json').strip()
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(parsed, dict) or set(parsed) != set(request.ids):
+            return None
+        if self.row_validator is not None and not all(self.row_validator(parsed[row_id]) for row_id in request.ids):
+            return None
+        return parsed
+
+    async def _send(self, client, requests: List[PackedRequest], model: str, temperature: float,
+                    max_tokens_per_row: int) -> List[str]:
+        """
+        Sends the packed prompts concurrently. Clients without amake_request() are
+        called in worker threads, so their blocking requests do not stall the loop.
+        Failed requests become error responses; other exceptions propagate.
+        """
+        import httpx
+
+        async def send(request: PackedRequest) -> Dict[str, Any]:
+            max_tokens = max_tokens_per_row * len(request.ids)
+            try:
+                if hasattr(client, 'amake_request'):
+                    return await client.amake_request(request.prompt, model, temperature, max_tokens)
+                return await asyncio.to_thread(client.make_request, request.prompt, model, temperature, max_tokens)
+            except (LLMRequestError, httpx.HTTPError) as e:
+                return {'error': str(e)}
+
+        if hasattr(client, 'session'):
+            async with client.session():
+                responses = await asyncio.gather(*(send(request) for request in requests))
+        else:
+            responses = await asyncio.gather(*(send(request) for request in requests))
+        return [client.handle_response(response) for response in responses]
+
+    async def arun(self, client, data: pd.DataFrame, id_column: str, text_columns: List[str], model: str,
+                   temperature: float = 0.5, max_tokens_per_row: int = 300) -> Dict[str, Any]:
+        """
+        Runs all rows through the client in packed requests and returns {row id: result}.
+        Rows of packed requests that fail validation are retried one row per request;
+        rows that still fail map to None.
+        """
+        requests = self.pack(data, id_column, text_columns)
+        texts = await self._send(client, requests, model, temperature, max_tokens_per_row)
+        results, retry = {}, []
+        for request, text in zip(requests, texts):
+            parsed = self.split_response(request, text)
+            if parsed is not None:
+                results.update(parsed)
+            elif len(request.ids) > 1:
+                retry.extend(request.ids)
+            else:
+                results[request.ids[0]] = None
+        if retry:
+            rows = data[data[id_column].astype(str).isin(retry)]
+            singles = [PackedRequest([row_id], self._header + self._render_row(row_id, row))
+                       for row_id, row in zip(rows[id_column].astype(str), rows[text_columns].to_dict('records'))]
+            texts = await self._send(client, singles, model, temperature, max_tokens_per_row)
+            for request, text in zip(singles, texts):
+                parsed = self.split_response(request, text)
+                results[request.ids[0]] = parsed[request.ids[0]] if parsed is not None else None
+        return results
+
+    def run(self, client, data: pd.DataFrame, id_column: str, text_columns: List[str], model: str,
+            temperature: float = 0.5, max_tokens_per_row: int = 300) -> Dict[str, Any]:
+        """Synchronous wrapper around arun()."""
+        return asyncio.run(self.arun(client, data, id_column, text_columns, model, temperature, max_tokens_per_row))
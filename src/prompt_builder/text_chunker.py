@@ -0,0 +1,167 @@
+import re
+from collections import deque
+from itertools import groupby
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import pandas as pd
+from prompt_builder.prompt_packer import TokenCounter
+
+"""
+Module: text_chunker.py
+Purpose: Splits long texts into token-budgeted, overlapping chunks.
+
+Classes:
+    Chunk: The text, token count and page span of one chunk.
+    TextChunker: Packs page, paragraph, line, sentence and word units into chunks.
+
+Usage:
+    Every page is split into the largest units that fit the overlap budget (or the
+    chunk budget without overlap): paragraphs, then lines, sentences and words, and
+    as a last resort fixed-size character slices. Units keep their trailing separators and never span two pages. Units are
+    packed greedily into chunks of at most `max_tokens`. Each new chunk starts with the
+    trailing units of the previous one, up to `overlap_tokens`, so context that
+    straddles a chunk boundary is seen twice. Pages are consumed lazily, so memory is
+    bounded by one chunk plus its overlap, however long the document is.
+
+        chunker = TextChunker(max_tokens=2000, overlap_tokens=200)
+        chunks = chunker.chunk_frame(pages)  # rows of PDFDataLoader(split_by='page')
+"""
+
+# Separators from the coarsest to the finest unit; each captures the separator text.
+_SEPARATORS = (
+    re.compile(r'(\n[ \t]*\n\s*)'),      # paragraphs (blank lines)
+    re.compile(r'(\n)'),                 # lines
+    re.compile(r'((?<=[.!?])\s+)'),      # sentences
+    re.compile(r'(\s+)'),                # words
+)
+
+
+def _split_keeping_separators(pattern: re.Pattern, text: str) -> List[str]:
+    """Splits `text` at the pattern, attaching every separator to the part before it."""
+    pieces = pattern.split(text)
+    parts = [pieces[index] + (pieces[index + 1] if index + 1 < len(pieces) else '')
+             for index in range(0, len(pieces), 2)]
+    return [part for part in parts if part]
+
+
+class Chunk(NamedTuple):
+    text: str
+    tokens: int
+    page_start: int
+    page_end: int
+
+
+class _Unit(NamedTuple):
+    text: str
+    tokens: int
+    page: int
+
+
+class TextChunker:
+    """
+    Splits texts into chunks of at most `max_tokens` tokens along natural boundaries.
+    """
+    def __init__(self, max_tokens: int = 2000, overlap_tokens: int = 200,
+                 token_counter: Optional[TokenCounter] = None):
+        """
+        Args:
+            max_tokens (int): Maximum tokens of a chunk.
+            overlap_tokens (int): Maximum tokens repeated from the end of the previous chunk.
+            token_counter (TokenCounter, optional): Defaults to a TokenCounter for cl100k_base.
+
+        Raises:
+            ValueError: If max_tokens is not positive or the overlap is not below it.
+        """
+        if max_tokens <= 0 or not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("max_tokens must be positive and overlap_tokens in [0, max_tokens).")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        # Units no larger than the overlap let every chunk repeat at least one unit.
+        self.unit_tokens = overlap_tokens or max_tokens
+        self.token_counter = token_counter or TokenCounter()
+
+    @classmethod
+    def from_config(cls, config) -> 'TextChunker':
+        """Builds a chunker from the 'chunking' section of a ConfigInterface."""
+        return cls(max_tokens=config.get_value('chunking.max_tokens', 2000),
+                   overlap_tokens=config.get_value('chunking.overlap_tokens', 200))
+
+    def _split(self, text: str, page: int, level: int = 0) -> Iterator[_Unit]:
+        """Yields the largest units of `text` that fit the unit budget, in order."""
+        tokens = self.token_counter.count(text)
+        if tokens <= self.unit_tokens:
+            yield _Unit(text, tokens, page)
+            return
+        while level < len(_SEPARATORS):
+            parts = _split_keeping_separators(_SEPARATORS[level], text)
+            level += 1
+            if len(parts) > 1:
+                for part in parts:
+                    yield from self._split(part, page, level)
+                return
+        # A single word longer than the budget: cut it into character slices.
+        size = max(1, len(text) * self.unit_tokens // tokens)
+        for start in range(0, len(text), size):
+            yield from self._split(text[start:start + size], page, len(_SEPARATORS))
+
+    def _make_chunk(self, units) -> Chunk:
+        return Chunk("".join(unit.text for unit in units), sum(unit.tokens for unit in units),
+                     units[0].page, units[-1].page)
+
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Chunk]:
+        """
+        Chunks one document given as (page number, text) pairs. Without overlap, the
+        chunk texts concatenate back to the document text.
+        """
+        window, window_tokens, fresh = deque(), 0, False
+        for page, text in pages:
+            if not isinstance(text, str) or not text:
+                continue
+            for unit in self._split(text, page):
+                if window and window_tokens + unit.tokens > self.max_tokens:
+                    yield self._make_chunk(window)
+                    fresh = False
+                    # Keep the trailing units that fit the overlap and leave room for the new unit.
+                    while window and (not self.overlap_tokens or window_tokens > self.overlap_tokens
+                                      or window_tokens + unit.tokens > self.max_tokens):
+                        window_tokens -= window.popleft().tokens
+                window.append(unit)
+                window_tokens += unit.tokens
+                fresh = True
+        if fresh:
+            yield self._make_chunk(window)
+
+    def chunk_frame(self, data: pd.DataFrame, id_column: str = 'map_id', text_column: str = 'text',
+                    page_column: str = 'page') -> pd.DataFrame:
+        """
+        Chunks every document of a frame, e.g. the output of PDFDataLoader in 'page' or
+        'document' mode. Rows of a document must be consecutive.
+
+        Returns:
+            pd.DataFrame: Columns `id_column`, `chunk` (0-based), `page_start`,
+                `page_end`, `tokens` and `text`.
+        """
+        rows = []
+        for doc_id, pages in self.iter_documents(data, id_column, text_column, page_column):
+            for number, chunk in enumerate(self.iter_chunks(pages)):
+                rows.append({id_column: doc_id, 'chunk': number, 'page_start': chunk.page_start,
+                             'page_end': chunk.page_end, 'tokens': chunk.tokens, 'text': chunk.text})
+        return pd.DataFrame(rows, columns=[id_column, 'chunk', 'page_start', 'page_end', 'tokens', 'text'])
+
+    @staticmethod
+    def iter_documents(batches, id_column: str = 'map_id', text_column: str = 'text',
+                       page_column: str = 'page') -> Iterator[Tuple[str, Iterator[Tuple[int, str]]]]:
+        """
+        Groups consecutive rows of one frame or a stream of frames into documents,
+        yielding (document id, lazy iterator of (page, text)). A document may span
+        several frames. Without a page column, rows are numbered from 1.
+        """
+        if isinstance(batches, pd.DataFrame):
+            batches = [batches]
+
+        def rows() -> Iterator[Tuple[str, int, str]]:
+            for batch in batches:
+                pages = batch[page_column] if page_column in batch.columns else range(1, len(batch) + 1)
+                yield from zip(batch[id_column], pages, batch[text_column])
+
+        for doc_id, group in groupby(rows(), key=lambda row: row[0]):
+            yield doc_id, ((page, text) for _, page, text in group)
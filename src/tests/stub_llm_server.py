@@ -0,0 +1,194 @@
+"""
+Module: stub_llm_server.py
+Purpose: A local HTTP server that mimics the OpenAI chat completions endpoint for tests.
+
+Classes:
+    StubLLMServer: Threaded stub server with configurable latency and failures.
+
+Usage:
+    with StubLLMServer(latency=0.05, fail_first=2) as server:
+        client = AsyncLLMClient(base_url=server.base_url)
+        ...
+    The default responder answers every prompt with "echo: <prompt>". Requests with
+    "stream": true are answered with server-sent events of `stream_chunk_size`
+    characters each, `stream_delay` seconds apart; a client that disconnects early
+    stops the stream, which is counted in `streams_aborted`.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+
+def echo_responder(prompt: str) -> str:
+    return f"echo: {prompt}"
+
+
+class StubLLMServer:
+    """
+    Serves POST /chat/completions (with or without a /v1 prefix) on a free local port.
+    """
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, fail_first: int = 0,
+                 fail_status: int = 429, responder: Callable[[str], str] = echo_responder,
+                 seed: Optional[int] = 0, stream_chunk_size: int = 4, stream_delay: float = 0.0):
+        """
+        Args:
+            latency (float): Seconds each request takes before it is answered.
+            error_rate (float): Probability that a request fails with HTTP 500.
+            fail_first (int): Number of initial requests answered with `fail_status`.
+            fail_status (int): Status code used for the `fail_first` failures; 200 sends
+                an HTML page instead of JSON, like a misbehaving proxy.
+            responder (callable): Maps the prompt to the completion text.
+            seed (int, optional): Seed of the error-rate randomness.
+            stream_chunk_size (int): Characters per streamed content chunk.
+            stream_delay (float): Seconds between two streamed chunks.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.responder = responder
+        self.stream_chunk_size = stream_chunk_size
+        self.stream_delay = stream_delay
+        self.stream_chunks_sent = 0
+        self.streams_aborted = 0
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        body = json.loads(handler.rfile.read(int(handler.headers.get('Content-Length', 0))) or b'{}')
+        with self._lock:
+            self.request_count += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            request_number = self.request_count
+            fail_randomly = self._random.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if request_number <= self.fail_first and self.fail_status == 200:
+                self._send_raw(handler, 200, b"<html><body>Bad Gateway</body></html>", 'text/html')
+                return
+            if request_number <= self.fail_first:
+                self._send(handler, self.fail_status, {'error': {'message': 'stub failure'}})
+                return
+            if fail_randomly:
+                self._send(handler, 500, {'error': {'message': 'stub server error'}})
+                return
+            prompt = body['messages'][-1]['content']
+            with self._lock:
+                self.prompts.append(prompt)
+            content = self.responder(prompt)
+            if body.get('stream'):
+                self._stream(handler, body, request_number, prompt, content)
+                return
+            self._send(handler, 200, {
+                'id': f"chatcmpl-{request_number}",
+                'object': 'chat.completion',
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt.split()), 'completion_tokens': len(content.split()),
+                          'total_tokens': len(prompt.split()) + len(content.split())},
+            })
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _stream(self, handler: BaseHTTPRequestHandler, body: dict, request_number: int, prompt: str,
+                content: str) -> None:
+        """Sends the completion as server-sent events and closes the connection."""
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        def event(delta: dict, finish_reason=None, usage=None) -> bytes:
+            chunk = {'id': f"chatcmpl-{request_number}", 'object': 'chat.completion.chunk', 'model': body.get('model'),
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if usage is None else []}
+            if usage is not None:
+                chunk['usage'] = usage
+            return f"data: {json.dumps(chunk)}\n\n".encode('utf-8')
+
+        pieces = [content[start:start + self.stream_chunk_size]
+                  for start in range(0, len(content), self.stream_chunk_size)]
+        try:
+            handler.wfile.write(event({'role': 'assistant', 'content': ''}))
+            for piece in pieces:
+                if self.stream_delay:
+                    time.sleep(self.stream_delay)
+                handler.wfile.write(event({'content': piece}))
+                handler.wfile.flush()
+                with self._lock:
+                    self.stream_chunks_sent += 1
+            handler.wfile.write(event({}, finish_reason='stop'))
+            if (body.get('stream_options') or {}).get('include_usage'):
+                handler.wfile.write(event({}, usage={
+                    'prompt_tokens': len(prompt.split()), 'completion_tokens': len(content.split()),
+                    'total_tokens': len(prompt.split()) + len(content.split())}))
+            handler.wfile.write(b"data: [DONE]\n\n")
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self._lock:
+                self.streams_aborted += 1
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, payload: dict) -> None:
+        StubLLMServer._send_raw(handler, status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    @staticmethod
+    def _send_raw(handler: BaseHTTPRequestHandler, status: int, data: bytes, content_type: str) -> None:
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def start(self) -> 'StubLLMServer':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle's algorithm the body
+            # waits for the client's delayed ACK, adding ~40 ms to every keep-alive request.
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                if self.path.rstrip('/').endswith('/chat/completions'):
+                    stub._handle(self)
+                else:
+                    stub._send(self, 404, {'error': {'message': 'not found'}})
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+from src.llm_model.batch_runner import BatchRunner, LocalBatchProvider
+
+@pytest.fixture
+def prompts():
+    """Create a DataFrame of prompts keyed by integer ids."""
+    return pd.DataFrame({'id': [7, 3, 11, 5, 2], 'prompt': [f"summarise {i}" for i in range(5)]})
+
+def test_build_shards(tmp_path, prompts):
+    """Test that prompts are split into provider-format shards with stable custom ids."""
+    runner = BatchRunner(LocalBatchProvider(str(tmp_path / "provider")), str(tmp_path / "batches"),
+                         max_requests_per_shard=2)
+    shards = runner.build_shards(prompts, 'prompt', 'id', model="model-a", max_tokens=50)
+    assert len(shards) == 3
+    with open(shards[0], encoding='utf-8') as file:
+        first = json.loads(file.readline())
+    assert first['custom_id'] == "7"
+    assert first['url'] == "/v1/chat/completions"
+    assert first['body']['messages'][0]['content'] == "summarise 0"
+    assert first['body']['max_tokens'] == 50
+
+def test_build_shards_rejects_duplicate_ids(tmp_path):
+    """Test that ids must be unique to be used as custom ids."""
+    runner = BatchRunner(LocalBatchProvider(str(tmp_path / "provider")), str(tmp_path / "batches"))
+    with pytest.raises(ValueError):
+        runner.build_shards(pd.DataFrame({'id': [1, 1], 'prompt': ['a', 'b']}), 'prompt', 'id', model="m")
+
+def test_run_reconciles_results_by_id(tmp_path, prompts):
+    """Test a full batch run against the local provider."""
+    runner = BatchRunner(LocalBatchProvider(str(tmp_path / "provider"), responder=str.upper),
+                         str(tmp_path / "batches"), max_requests_per_shard=2)
+    results = runner.run(prompts, 'prompt', 'id', model="model-a", poll_interval=0)
+    assert results['id'].tolist() == [7, 3, 11, 5, 2]
+    assert results['response'].tolist() == [f"SUMMARISE {i}" for i in range(5)]
+    assert results['error'].isna().all()
+
+def test_reconcile_reports_failed_and_missing_rows(tmp_path, prompts):
+    """Test that failed requests carry their error and missing results stay empty."""
+    result_path = tmp_path / "results.jsonl"
+    result_path.write_text("\n".join(json.dumps(line) for line in [
+        {'custom_id': "3", 'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': "ok"}}]}},
+         'error': None},
+        {'custom_id': "7", 'response': {'status_code': 400, 'body': {'error': {'message': "bad"}}}, 'error': None},
+    ]))
+    runner = BatchRunner(LocalBatchProvider(str(tmp_path / "provider")), str(tmp_path / "batches"))
+    results = runner.reconcile(prompts, 'id', [str(result_path)])
+    assert results.loc[results['id'] == 3, 'response'].iat[0] == "ok"
+    assert "HTTP 400" in results.loc[results['id'] == 7, 'error'].iat[0]
+    assert results.loc[results['id'] == 11, ['response', 'error']].isna().all(axis=None)
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+import yaml
+from src import cli
+from src.tests.stub_llm_server import StubLLMServer
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ['fitz', 'pymupdf', 'openpyxl', 'httpx', 'openai', 'langchain']
+
+def imported_modules(*args):
+    """Returns the modules imported by `python -X importtime <args>` in a fresh interpreter."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True,
+                               cwd=SRC_DIR, env={**os.environ, 'PYTHONPATH': SRC_DIR})
+    assert completed.returncode == 0, completed.stderr
+    return {line.split('|')[-1].strip() for line in completed.stderr.splitlines() if line.startswith('import time:')}
+
+def test_help_imports_no_heavy_modules():
+    """Test that `cli.py --help` loads neither pandas nor any optional dependency."""
+    modules = imported_modules(os.path.join(SRC_DIR, 'cli.py'), '--help')
+    assert not modules & {'pandas', 'numpy', *LAZY_MODULES}
+
+def test_pipeline_import_defers_optional_dependencies():
+    """Test that importing the pipeline does not load PDF, Excel or HTTP libraries."""
+    modules = imported_modules('-c', 'import pipeline.pipeline')
+    assert 'pandas' in modules
+    assert not modules & set(LAZY_MODULES)
+
+@pytest.fixture
+def project(tmp_path):
+    pd.DataFrame({'id': [1, 2, 3], 'title': ['a', 'b', 'c'], 'abstract': ['x', 'y', 'z']}).to_csv(
+        tmp_path / "input.csv", index=False)
+    pd.DataFrame({'question': ["What is the topic?"]}).to_excel(tmp_path / "questions.xlsx", index=False)
+    schema = {'type': 'object', 'properties': {'topic': {'type': 'string'}}, 'required': ['topic']}
+    (tmp_path / "schema.json").write_text(json.dumps(schema))
+    return tmp_path
+
+def write_config(project, base_url):
+    config = {
+        'data_loader': {'file_path': str(project / "input.csv"), 'required_tabular_columns': "id,title,abstract"},
+        'prompt_builder': {'questions_file': str(project / "questions.xlsx"),
+                           'schema_file': str(project / "schema.json")},
+        'llm_model': {'model_name': "stub-model", 'base_url': base_url},
+        'output': {'output_dir': str(project / "output"), 'output_csv_file': "results.csv"},
+        'pipeline': {'cpu_workers': 0, 'resume': True},
+        'metrics': {'report_file': "run_report.json"},
+    }
+    (project / "config.yaml").write_text(yaml.safe_dump(config))
+    return str(project / "config.yaml")
+
+def test_run_and_status_commands(project, capsys):
+    """Test that `run` processes the configured input and `status` reports the ledger."""
+    with StubLLMServer(responder=lambda prompt: '{"topic": "test"}') as server:
+        config_path = write_config(project, server.base_url)
+        assert cli.main(['run', '--config', config_path]) == 0
+        assert server.request_count == 3
+    output = capsys.readouterr().out
+    summary = json.loads(output[output.index("{"):])
+    assert summary['rows_saved'] == 3 and summary['rows_valid'] == 3
+    assert len(pd.read_csv(project / "output" / "results.csv")) == 3
+    assert (project / "output" / "run_report.json").exists()
+    assert cli.main(['status', '--config', config_path]) == 0
+    assert json.loads(capsys.readouterr().out)['saved'] == 3
+
+def test_run_reports_config_errors(tmp_path, capsys):
+    """Test that a missing config file is reported without a traceback."""
+    assert cli.main(['run', '--config', str(tmp_path / "missing.yaml")]) == 1
+    assert "not found" in capsys.readouterr().err
+
+def test_distribute_work_and_collect_commands(project, capsys):
+    """Test that a distributed run processes every row once across workers and merges the results."""
+    with StubLLMServer(responder=lambda prompt: '{"topic": "test"}') as server:
+        config_path = write_config(project, server.base_url)
+        config = yaml.safe_load(open(config_path))
+        config['distributed'] = {'work_dir': str(project / "work"), 'num_shards': 4}
+        (project / "config.yaml").write_text(yaml.safe_dump(config))
+        assert cli.main(['distribute', '--config', config_path]) == 0
+        output = capsys.readouterr().out
+        units = json.loads(output[output.index("{"):])['units']
+        assert cli.main(['collect', '--config', config_path]) == 1
+        assert cli.main(['work', '--config', config_path, '--max-units', '1']) == 0
+        assert cli.main(['work', '--config', config_path]) == 0
+        assert server.request_count == 3
+    capsys.readouterr()
+    assert cli.main(['collect', '--config', config_path]) == 0
+    output = capsys.readouterr().out
+    summary = json.loads(output[output.index("{"):])
+    assert summary['rows_saved'] == 3 and summary['units']['done'] == units
+    assert sorted(pd.read_csv(project / "output" / "results.csv")['id']) == [1, 2, 3]
@@ -98,4 +98,30 @@ def test_validate_config(mock_config_file):
     assert loader.validate_config(schema) is True
     
     invalid_schema = {'data_loader': str}
-    assert loader.validate_config(invalid_schema) is False
\ No newline at end of file
+    assert loader.validate_config(invalid_schema) is False
+
+def test_get_input_paths(mock_config_file):
+    """
+    Test the get_input_paths method, including the optional sheet name.
+    """
+    loader = ConfigLoader(mock_config_file)
+    input_paths = loader.get_input_paths()
+    assert input_paths['file_path'] == "data/input/sample.xlsx"
+    assert input_paths['sheet_name'] is None
+
+def test_get_input_paths_falls_back_from_an_empty_sheet_name(tmp_path):
+    """
+    Test that an empty data_loader.sheet_name key falls back to input_paths.data_sheet_name.
+    """
+    file_path = tmp_path / "config.yaml"
+    file_path.write_text("data_loader:\n  file_path: data.xlsx\n  sheet_name:\n"
+                         "input_paths:\n  data_sheet_name: Data\n")
+    loader = ConfigLoader(str(file_path))
+    assert loader.get_input_paths()['sheet_name'] == "Data"
+
+def test_get_column_dtypes(mock_config_file):
+    """
+    Test that column dtypes default to an empty mapping when not configured.
+    """
+    loader = ConfigLoader(mock_config_file)
+    assert loader.get_column_dtypes() == {}
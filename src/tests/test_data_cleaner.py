@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_cleaner.data_cleaner import DataCleaner, SeenHashes
+
+@pytest.fixture
+def dirty_data():
+    """Create a DataFrame with missing values, non-ASCII text and duplicates."""
+    return pd.DataFrame({
+        'id': [1, 2, 2, 3],
+        'title': ['Café', 'title-2', 'title-2', None],
+        'abstract': ['naïve — abstract', None, None, 'abstract-3']
+    })
+
+def test_clean_data(dirty_data):
+    """Test that all cleaning steps run over the text columns."""
+    cleaned = DataCleaner().clean_data(dirty_data, ['title', 'abstract'])
+    assert cleaned['id'].tolist() == [1, 2, 3]
+    assert cleaned['title'].tolist() == ['Caf', 'title-2', '']
+    assert cleaned['abstract'].tolist() == ['nave  abstract', '', 'abstract-3']
+
+def test_replace_missing_values(dirty_data):
+    """Test that missing values become empty strings."""
+    cleaned = DataCleaner().replace_missing_values(dirty_data, ['title'])
+    assert cleaned['title'].tolist() == ['Café', 'title-2', 'title-2', '']
+    assert cleaned['abstract'].isna().sum() == 2
+
+def test_remove_non_ascii_characters(dirty_data):
+    """Test that non-ASCII characters are stripped and missing values are kept."""
+    cleaned = DataCleaner().remove_non_ascii_characters(dirty_data, ['title'])
+    assert cleaned['title'].iloc[0] == 'Caf'
+    assert cleaned['title'].isna().iloc[3]
+
+def test_clean_batches_removes_duplicates_across_chunks(dirty_data):
+    """Test that streamed cleaning drops duplicates spanning chunk boundaries."""
+    batches = [dirty_data.iloc[:2], dirty_data.iloc[2:], dirty_data.iloc[:1]]
+    cleaned = pd.concat(DataCleaner().clean_batches(batches, ['title', 'abstract']))
+    assert cleaned['id'].tolist() == [1, 2, 3]
+
+def test_seen_hashes_matches_a_set_and_keeps_few_runs():
+    """Test that SeenHashes answers membership like a set while keeping a logarithmic number of runs."""
+    rng = np.random.default_rng(0)
+    seen, expected = SeenHashes(), set()
+    for _ in range(200):
+        hashes = rng.integers(0, 5_000, size=50).astype(np.uint64)
+        assert seen.contains(hashes).tolist() == [int(value) in expected for value in hashes]
+        new = hashes[~seen.contains(hashes)]
+        seen.add(new)
+        expected.update(int(value) for value in new)
+    assert len(seen) == len(expected) and len(seen._runs) <= 14
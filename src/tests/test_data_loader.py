@@ -86,3 +86,233 @@ def test_load_pdf():
     assert isinstance(data, pd.DataFrame)
     assert data.iloc[0]['map_id'] == "dummy_data"
     assert len(data.iloc[0]['text']) > 0
+
+def test_iter_batches_csv(tmp_path):
+    """Test streaming a CSV file in bounded-size chunks."""
+    data = pd.DataFrame({
+        'id': range(10),
+        'title': [f'title-{i}' for i in range(10)],
+        'abstract': [f'abstract-{i}' for i in range(10)]
+    })
+    csv_file = tmp_path / "big_data.csv"
+    data.to_csv(csv_file, index=False)
+    loader = DataLoader(str(csv_file))
+    batches = list(loader.iter_batches(batch_size=4, required_columns=['id', 'title', 'abstract']))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert pd.concat(batches)['id'].tolist() == list(range(10))
+
+def test_iter_batches_missing_columns(dummy_csv_file):
+    """Test that header validation fails before any rows are streamed."""
+    loader = DataLoader(str(dummy_csv_file))
+    with pytest.raises(ValueError):
+        next(loader.iter_batches(batch_size=2, required_columns=['id', 'missing']))
+
+@pytest.fixture
+def multi_page_pdf_file(tmp_path):
+    """Create a five-page PDF file for testing."""
+    file_path = tmp_path / "multi_page.pdf"
+    doc = fitz.open()
+    for page_number in range(1, 6):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Content of page {page_number}.")
+    doc.save(file_path)
+    doc.close()
+    return str(file_path)
+
+def test_load_pdf_per_page_parallel(multi_page_pdf_file):
+    """Test extracting one row per page across a process pool."""
+    loader = DataLoader(multi_page_pdf_file, split_by='page', max_workers=2, pages_per_task=2)
+    data = loader.load_data()
+    assert data['page'].tolist() == [1, 2, 3, 4, 5]
+    assert (data['map_id'] == "multi_page").all()
+    assert "page 3" in data.iloc[2]['text']
+
+def test_load_pdf_per_window(multi_page_pdf_file):
+    """Test extracting page windows and streaming them in batches."""
+    loader = DataLoader(multi_page_pdf_file, split_by='window', window_size=2)
+    batches = list(loader.iter_batches(batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 1]
+    data = pd.concat(batches, ignore_index=True)
+    assert data['page'].tolist() == [1, 3, 5]
+    assert data['page_end'].tolist() == [2, 4, 5]
+    assert "page 1" in data.iloc[0]['text'] and "page 2" in data.iloc[0]['text']
+
+def test_load_pdf_parallel_document_matches_serial(multi_page_pdf_file):
+    """Test that parallel document extraction yields the same text as serial extraction."""
+    serial = DataLoader(multi_page_pdf_file).load_data()
+    parallel = DataLoader(multi_page_pdf_file, max_workers=3, pages_per_task=1).load_data()
+    assert serial.iloc[0]['text'] == parallel.iloc[0]['text']
+
+def test_load_directory(tmp_path, multi_page_pdf_file):
+    """Test loading a directory of mixed files concurrently with provenance."""
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    for index in range(3):
+        pd.DataFrame({'id': [index], 'title': [f't-{index}'], 'abstract': [f'a-{index}']}).to_csv(
+            input_dir / f"part_{index}.csv", index=False)
+    pd.DataFrame({'id': [9], 'title': ['t-9'], 'abstract': ['a-9']}).to_excel(
+        input_dir / "part_9.xlsx", index=False)
+    os.replace(multi_page_pdf_file, input_dir / "doc.pdf")
+    (input_dir / "notes.txt").write_text("ignored")
+
+    loader = DataLoader(str(input_dir), max_workers=2)
+    data = loader.load_data()
+    assert len(data) == 5
+    assert data['source_file'].map(os.path.basename).tolist() == [
+        "doc.pdf", "part_0.csv", "part_1.csv", "part_2.csv", "part_9.xlsx"]
+    assert data.loc[data['source_file'].str.endswith("doc.pdf"), 'map_id'].iat[0] == "doc"
+
+def test_load_glob_streamed(tmp_path):
+    """Test streaming files matched by a glob pattern."""
+    for index in range(3):
+        pd.DataFrame({'id': [index, index + 10], 'title': ['t', 't'], 'abstract': ['a', 'a']}).to_csv(
+            tmp_path / f"part_{index}.csv", index=False)
+    loader = DataLoader(str(tmp_path / "part_*.csv"), max_workers=1)
+    batches = list(loader.iter_batches(batch_size=1, required_columns=['id', 'title']))
+    assert len(batches) == 6
+    assert sorted(pd.concat(batches)['id']) == [0, 1, 2, 10, 11, 12]
+
+def test_multi_file_loader_bounds_files_in_flight(tmp_path, monkeypatch):
+    """Test that files are submitted as earlier ones are consumed rather than all at once."""
+    from concurrent.futures import ThreadPoolExecutor
+    import src.data_loader.data_loader as data_loader_module
+    submitted = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[0])
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(data_loader_module, 'ProcessPoolExecutor', CountingExecutor)
+    for index in range(10):
+        pd.DataFrame({'id': [index], 'title': ['t'], 'abstract': ['a']}).to_csv(
+            tmp_path / f"part_{index}.csv", index=False)
+    for ordered in (True, False):
+        submitted.clear()
+        frames = data_loader_module.MultiFileDataLoader(str(tmp_path), max_workers=2).iter_frames(ordered)
+        next(frames)
+        assert len(submitted) == 4
+        assert len(list(frames)) == 9 and len(submitted) == 10
+
+def test_load_file_with_glob_characters_in_name(tmp_path):
+    """Test that an existing file whose name contains glob characters loads as a single file."""
+    csv_file = tmp_path / "report[2024].csv"
+    pd.DataFrame({'id': [1, 2], 'title': ['t', 't'], 'abstract': ['a', 'a']}).to_csv(csv_file, index=False)
+    data = DataLoader(str(csv_file)).load_data()
+    assert data['id'].tolist() == [1, 2]
+    assert 'source_file' not in data.columns
+
+@pytest.fixture
+def multi_sheet_excel_file(tmp_path):
+    """Create an Excel file with an extra sheet and an unused wide column."""
+    excel_file = tmp_path / "multi_sheet.xlsx"
+    with pd.ExcelWriter(excel_file) as writer:
+        pd.DataFrame({'other': [0]}).to_excel(writer, sheet_name='Notes', index=False)
+        pd.DataFrame({
+            'id': range(7),
+            'title': [f'T-{i}' for i in range(7)],
+            'abstract': [f'Ab-{i}' for i in range(7)],
+            'unused': ['x' * 50] * 7
+        }).to_excel(writer, sheet_name='Data', index=False)
+    return str(excel_file)
+
+@pytest.mark.parametrize("engine", ["openpyxl", "pandas"])
+def test_load_excel_sheet_and_projection(multi_sheet_excel_file, engine):
+    """Test sheet selection and column projection for each Excel engine."""
+    loader = DataLoader(multi_sheet_excel_file, sheet_name='Data',
+                        usecols=['id', 'title', 'abstract'], excel_engine=engine)
+    data = loader.load_data()
+    assert list(data.columns) == ['id', 'title', 'abstract']
+    assert data['id'].tolist() == list(range(7))
+    assert data.iloc[3]['abstract'] == 'Ab-3'
+
+def test_iter_batches_excel_streaming(multi_sheet_excel_file):
+    """Test streaming an Excel sheet through openpyxl read-only mode."""
+    loader = DataLoader(multi_sheet_excel_file, sheet_name='Data', usecols=['id', 'abstract'],
+                        excel_engine='openpyxl')
+    batches = list(loader.iter_batches(batch_size=3, required_columns=['id', 'title']))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert list(batches[0].columns) == ['id', 'abstract']
+
+def test_excel_engines_name_unnamed_columns_alike(tmp_path):
+    """Test that openpyxl and pandas name a column without a header cell the same way."""
+    import openpyxl
+    from src.data_loader.data_loader import TabularDataLoader
+    excel_file = str(tmp_path / "gap.xlsx")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(['id', None, 'abstract'])
+    workbook.active.append([1, 'note', 'Ab-1'])
+    workbook.save(excel_file)
+    columns = {}
+    for engine in ("openpyxl", "pandas"):
+        loader = TabularDataLoader(excel_file, excel_engine=engine)
+        columns[engine] = (loader.read_header(), list(loader.load_data().columns))
+    assert columns["openpyxl"] == columns["pandas"] == (['id', 'Unnamed: 1', 'abstract'],) * 2
+
+def test_excel_engines_keep_the_same_blank_rows(tmp_path):
+    """Test that openpyxl keeps blank rows between data rows and drops trailing ones like pandas."""
+    import openpyxl
+    from src.data_loader.data_loader import TabularDataLoader
+    excel_file = str(tmp_path / "blank.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in (['id', 'abstract'], [1, 'Ab-1'], [None, None], [2, 'Ab-2'], [None, 'Ab-3']):
+        sheet.append(row)
+    sheet.cell(row=8, column=1).value = None
+    workbook.save(excel_file)
+    ids = {}
+    for engine in ("openpyxl", "pandas"):
+        loader = TabularDataLoader(excel_file, usecols=['id'], excel_engine=engine)
+        batches = list(loader.iter_batches(batch_size=2))
+        ids[engine] = pd.concat(batches, ignore_index=True)['id'].tolist()
+    assert len(ids["openpyxl"]) == len(ids["pandas"]) == 4
+    assert pd.isna(ids["openpyxl"][1]) and pd.isna(ids["openpyxl"][3])
+
+def test_load_csv_projection_and_dtypes(tmp_path):
+    """Test pushing column projection and pinned dtypes into the CSV reader."""
+    csv_file = tmp_path / "wide.csv"
+    pd.DataFrame({
+        'id': ['a', 'b', 'a'],
+        'title': ['t-1', 't-2', 't-3'],
+        'abstract': ['ab-1', None, 'ab-3'],
+        'unused': [1.5, 2.5, 3.5]
+    }).to_csv(csv_file, index=False)
+    loader = DataLoader(str(csv_file), usecols=['id', 'title', 'abstract'],
+                        dtype={'id': 'category', 'title': 'string[pyarrow]', 'abstract': 'string[pyarrow]'})
+    data = loader.load_data()
+    assert list(data.columns) == ['id', 'title', 'abstract']
+    assert isinstance(data['id'].dtype, pd.CategoricalDtype)
+    assert data['title'].dtype == pd.StringDtype('pyarrow')
+    batch = next(loader.iter_batches(batch_size=2))
+    assert list(batch.columns) == ['id', 'title', 'abstract']
+    assert isinstance(batch['id'].dtype, pd.CategoricalDtype)
+
+def test_data_loader_from_config(tmp_path, multi_sheet_excel_file):
+    """Test building a loader with projection and dtypes from the configuration."""
+    from src.config_loader.config_loader import ConfigLoader
+    import yaml
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.dump({
+        "data_loader": {
+            "file_path": multi_sheet_excel_file,
+            "sheet_name": "Data",
+            "excel_engine": "openpyxl",
+            "required_tabular_columns": "id,title,abstract",
+            "project_columns": True,
+            "column_dtypes": {"title": "string[pyarrow]"}
+        }
+    }))
+    loader = DataLoader.from_config(ConfigLoader(str(config_file)))
+    data = loader.load_data()
+    assert list(data.columns) == ['id', 'title', 'abstract']
+    assert data['title'].dtype == pd.StringDtype('pyarrow')
+
+def test_pdf_loader_rejects_bad_pages_per_task_and_checks_window_columns(multi_page_pdf_file):
+    """Test that a non-positive task size is rejected and window mode provides page_end."""
+    with pytest.raises(ValueError):
+        DataLoader(multi_page_pdf_file, split_by='page', pages_per_task=0)
+    windows = DataLoader(multi_page_pdf_file, split_by='window', window_size=2)
+    batches = list(windows.iter_batches(batch_size=5, required_columns=['page', 'page_end']))
+    assert batches[0]['page_end'].tolist() == [2, 4, 5]
+    with pytest.raises(ValueError):
+        list(DataLoader(multi_page_pdf_file, split_by='page').iter_batches(required_columns=['page_end']))
@@ -0,0 +1,88 @@
+import os
+import pandas as pd
+import pytest
+from src.data_saver.data_saver import DataSaver
+
+def make_batch(start, count):
+    return pd.DataFrame({
+        'id': range(start, start + count),
+        'topic': ['bio' if i % 2 else 'chem' for i in range(start, start + count)],
+        'response': [f"answer-{i}" for i in range(start, start + count)],
+    })
+
+def test_save_to_csv_is_atomic(tmp_path):
+    """Test that save_to_csv writes the file and leaves no temporary files behind."""
+    saver = DataSaver(str(tmp_path / "output"))
+    file_path = tmp_path / "output" / "data.csv"
+    saver.save_to_csv(make_batch(0, 3), str(file_path))
+    assert pd.read_csv(file_path)['id'].tolist() == [0, 1, 2]
+    assert not [name for name in os.listdir(file_path.parent) if name.endswith('.tmp')]
+
+def test_append_flushes_row_groups(tmp_path):
+    """Test that appended batches are flushed as part files every row_group_size rows."""
+    saver = DataSaver(str(tmp_path), row_group_size=4)
+    saver.append(make_batch(0, 3))
+    assert saver.part_files() == []
+    saver.append(make_batch(3, 3))
+    assert len(saver.part_files()) == 1
+    saver.append(make_batch(6, 2))
+    saver.close()
+    assert len(saver.part_files()) == 2
+    assert saver.read_dataset()['id'].tolist() == list(range(8))
+
+def test_partitioned_output_and_exports(tmp_path):
+    """Test partition directories and the CSV/Excel exports written on close."""
+    saver = DataSaver(str(tmp_path), partition_cols=['topic'], row_group_size=3,
+                      csv_file="results.csv", excel_file="results.xlsx")
+    saver.append(make_batch(0, 4))
+    saver.append(make_batch(4, 2))
+    outputs = saver.close()
+    assert sorted(os.listdir(tmp_path / "results")) == ["topic=bio", "topic=chem"]
+    csv_data = pd.read_csv(outputs['csv'])
+    assert sorted(csv_data['id']) == list(range(6))
+    assert set(csv_data.loc[csv_data['id'] % 2 == 1, 'topic']) == {'bio'}
+    excel_data = pd.read_excel(outputs['excel'])
+    assert sorted(excel_data['id']) == list(range(6))
+
+def test_resumed_saver_appends(tmp_path):
+    """Test that a new saver on an existing dataset continues the part numbering."""
+    first = DataSaver(str(tmp_path))
+    first.append(make_batch(0, 2))
+    first.close()
+    second = DataSaver(str(tmp_path), resume=True)
+    second.append(make_batch(2, 2))
+    second.close()
+    assert second.read_dataset()['id'].tolist() == [0, 1, 2, 3]
+
+def test_later_batches_widen_the_schema(tmp_path):
+    """Test that a column that is all null or integer at first accepts strings or NaN later, also after resuming."""
+    saver = DataSaver(str(tmp_path), row_group_size=1)
+    saver.append(pd.DataFrame({'id': [1], 'errors': [None], 'score': [1]}))
+    saver.append(pd.DataFrame({'id': [2], 'errors': ["missing topic"], 'score': [float('nan')]}))
+    saver.close()
+    resumed = DataSaver(str(tmp_path), row_group_size=1, resume=True)
+    resumed.append(pd.DataFrame({'id': [3], 'errors': [None], 'score': [2.5]}))
+    data = resumed.read_dataset()
+    assert data['id'].tolist() == [1, 2, 3]
+    assert data['errors'].tolist()[1] == "missing topic" and data['score'].tolist()[2] == 2.5
+
+def test_exports_align_parts_with_different_columns(tmp_path):
+    """Test that parts with other column orders or extra columns are exported under the right headers."""
+    saver = DataSaver(str(tmp_path), row_group_size=1, csv_file="results.csv", excel_file="results.xlsx")
+    saver.append(pd.DataFrame({'id': [1], 'text': ['a']}))
+    saver.append(pd.DataFrame({'text': ['b'], 'id': [2], 'page': [3]}))
+    outputs = saver.close()
+    expected = pd.DataFrame({'id': [1, 2], 'text': ['a', 'b'], 'page': [None, 3.0]})
+    pd.testing.assert_frame_equal(pd.read_csv(outputs['csv']), expected)
+    pd.testing.assert_frame_equal(pd.read_excel(outputs['excel']), expected)
+
+def test_rerun_without_resume_replaces_the_dataset(tmp_path):
+    """Test that a saver that does not resume removes the parts of an earlier run."""
+    first = DataSaver(str(tmp_path))
+    first.append(make_batch(0, 2))
+    first.close()
+    assert DataSaver(str(tmp_path)).read_dataset()['id'].tolist() == [0, 1]
+    rerun = DataSaver(str(tmp_path))
+    rerun.append(make_batch(0, 2))
+    rerun.close()
+    assert rerun.read_dataset()['id'].tolist() == [0, 1]
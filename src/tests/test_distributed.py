@@ -0,0 +1,59 @@
+import os
+import pandas as pd
+import pytest
+from src.pipeline.distributed import ShardCoordinator, ShardLoader, ShardWorker, shard_of
+from src.pipeline.work_queue import SQLiteWorkQueue
+
+def batches(total=1_000, size=300):
+    data = pd.DataFrame({'id': range(total), 'text': [f"row {i}" for i in range(total)]})
+    return [data.iloc[start:start + size] for start in range(0, total, size)]
+
+def test_rows_are_sharded_by_id(tmp_path):
+    """Test that every row lands in exactly one shard, chosen by its id alone."""
+    assert (shard_of(pd.Series([1, 2, 3]), 8) == shard_of(pd.Series(['1', '2', '3']), 8)).all()
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite"))
+    coordinator = ShardCoordinator(queue, str(tmp_path), num_shards=8)
+    units = coordinator.submit(batches(), 'id')
+    assert sum(units.values()) == 1_000 and queue.summary()['pending'] == len(units)
+    ids = []
+    for unit_id in units:
+        rows = pd.concat(ShardLoader(os.path.join(tmp_path, 'shards', unit_id)).iter_batches(100))
+        assert (shard_of(rows['id'], 8) == int(unit_id.split('-')[1])).all()
+        ids.extend(rows['id'])
+    assert sorted(ids) == list(range(1_000))
+    with pytest.raises(ValueError):
+        coordinator.submit(batches(), 'id')
+
+def test_workers_share_units_retry_failures_and_results_are_collected(tmp_path):
+    """Test that units are processed by several workers, a failed attempt is retried, and collect() merges them."""
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite"), retry_delay=0)
+    coordinator = ShardCoordinator(queue, str(tmp_path), num_shards=6)
+    units = coordinator.submit(batches(), 'id')
+    failed_once = set()
+
+    def process(unit):
+        if unit.unit_id not in failed_once:
+            failed_once.add(unit.unit_id)
+            raise RuntimeError("node lost")
+        rows = pd.concat(ShardLoader(unit.payload['path']).iter_batches())
+        output = tmp_path / "results" / unit.unit_id / f"attempt-{unit.attempt}"
+        output.mkdir(parents=True)
+        rows.assign(answer=rows['id'] * 2).to_parquet(output / "part-00000.parquet")
+        return {'path': str(output), 'counts': {'rows_saved': len(rows)}}
+
+    first = ShardWorker(queue, process, worker_id="w1").run(max_units=3)
+    second = ShardWorker(queue, process, worker_id="w2").run()
+    assert first['failed'] + second['failed'] == len(units)
+    assert first['completed'] + second['completed'] == len(units) and queue.is_finished()
+
+    class Collector:
+        rows = []
+        def append(self, data):
+            self.rows.append(data)
+        def close(self):
+            return {'parquet': "merged"}
+
+    summary = coordinator.collect(Collector())
+    merged = pd.concat(Collector.rows)
+    assert summary['rows_saved'] == 1_000 and summary['units']['done'] == len(units)
+    assert sorted(merged['id']) == list(range(1_000)) and (merged['answer'] == merged['id'] * 2).all()
@@ -0,0 +1,100 @@
+import os
+import pandas as pd
+import pytest
+from src.data_loader.data_loader import DataLoader
+from src.data_loader.extraction_cache import ExtractionCache
+
+@pytest.fixture
+def dummy_excel_file(tmp_path):
+    """Create a dummy Excel file for testing."""
+    data = pd.DataFrame({
+        'id': [1, 2, 3],
+        'title': ['T-1', 'T-2', 'T-3'],
+        'abstract': ['Ab-1', 'Ab-2', 'Ab-3']
+    })
+    excel_file = tmp_path / "dummy_data.xlsx"
+    data.to_excel(excel_file, index=False)
+    return str(excel_file)
+
+def test_cache_round_trip(tmp_path):
+    """Test storing and reading back a DataFrame."""
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    data = pd.DataFrame({'map_id': ['doc'], 'text': ['hello']})
+    cache.put("key", data)
+    pd.testing.assert_frame_equal(cache.get("key"), data)
+    assert cache.get("missing") is None
+
+def test_cache_key_depends_on_content_and_options(tmp_path):
+    """Test that the key changes with the file content and the loader options."""
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    file_path = tmp_path / "input.csv"
+    file_path.write_text("id\n1\n")
+    key = cache.make_key(str(file_path), {'split_by': 'page'})
+    assert key == cache.make_key(str(file_path), {'split_by': 'page'})
+    assert key != cache.make_key(str(file_path), {'split_by': 'document'})
+    file_path.write_text("id\n2\n")
+    assert key != cache.make_key(str(file_path), {'split_by': 'page'})
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that the oldest entries are evicted once the size budget is exceeded."""
+    cache_dir = tmp_path / "cache"
+    cache = ExtractionCache(str(cache_dir), max_bytes=10 ** 9)
+    data = pd.DataFrame({'text': ['x' * 1000]})
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.put(key, data)
+        os.utime(cache_dir / f"{key}.parquet", (index, index))
+    entry_size = os.path.getsize(cache_dir / "a.parquet")
+    cache.get("a")
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(cache_dir)) == ["a.parquet", "c.parquet"]
+
+def test_data_loader_uses_cache(tmp_path, dummy_excel_file, monkeypatch):
+    """Test that an unchanged Excel input is served from the cache."""
+    cache_dir = str(tmp_path / "cache")
+    first = DataLoader(dummy_excel_file, cache_dir=cache_dir).load_data()
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the workbook should not be parsed again")
+    monkeypatch.setattr(pd, "read_excel", fail)
+    loader = DataLoader(dummy_excel_file, cache_dir=cache_dir)
+    second = loader.load_data()
+    pd.testing.assert_frame_equal(first, second)
+    assert loader.validate_columns(['id', 'title', 'abstract']) is True
+
+def test_from_config_with_empty_cache_size(tmp_path, dummy_excel_file):
+    """Test that an empty cache_max_mb key falls back to the default size."""
+    import yaml
+    from src.config_loader.config_loader import ConfigLoader
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.dump({"data_loader": {
+        "file_path": dummy_excel_file, "cache_dir": str(tmp_path / "cache"), "cache_max_mb": None}}))
+    loader = DataLoader.from_config(ConfigLoader(str(config_file)))
+    assert loader.cache_max_bytes == 1024 ** 3
+    assert len(loader.load_data()) == 3
+
+def test_streamed_batches_use_cache(tmp_path, dummy_excel_file, monkeypatch):
+    """Test that iter_batches fills the cache on a miss and streams from it on a hit."""
+    import openpyxl
+    cache_dir = str(tmp_path / "cache")
+    first = list(DataLoader(dummy_excel_file, cache_dir=cache_dir, excel_engine='openpyxl').iter_batches(2))
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the workbook should not be parsed again")
+    monkeypatch.setattr(openpyxl, "load_workbook", fail)
+    loader = DataLoader(dummy_excel_file, cache_dir=cache_dir, excel_engine='openpyxl')
+    second = list(loader.iter_batches(2, required_columns=['id', 'title']))
+    assert [len(batch) for batch in second] == [2, 1]
+    pd.testing.assert_frame_equal(pd.concat(first, ignore_index=True), pd.concat(second, ignore_index=True))
+    with pytest.raises(ValueError):
+        list(loader.iter_batches(2, required_columns=['missing']))
+
+def test_unfinished_stream_is_not_cached(tmp_path, dummy_excel_file):
+    """Test that a stream the caller abandons leaves no cache entry or temporary file."""
+    cache_dir = str(tmp_path / "cache")
+    batches = DataLoader(dummy_excel_file, cache_dir=cache_dir, excel_engine='openpyxl').iter_batches(1)
+    next(batches)
+    batches.close()
+    assert os.listdir(cache_dir) == []
@@ -0,0 +1,69 @@
+import json
+import pytest
+from src.validator.incremental import IncrementalValidator
+from src.validator.validator import ResponseValidator
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'topic': {'type': 'string', 'minLength': 1},
+        'is_clinical': {'type': 'boolean'},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'keywords': {'type': 'array', 'items': {'type': 'string'}, 'maxItems': 3},
+        'meta': {'type': 'object', 'properties': {'n': {'type': 'integer'}}, 'required': ['n']},
+    },
+    'required': ['topic', 'is_clinical'],
+    'additionalProperties': False,
+}
+
+@pytest.fixture
+def monitor():
+    return IncrementalValidator(ResponseValidator(SCHEMA))
+
+def feed_until_error(monitor, text):
+    """Feed the text one character at a time; return how much was consumed before the violation."""
+    for position, char in enumerate(text):
+        try:
+            monitor.feed(char)
+        except ValueError as e:
+            return position + 1, str(e)
+    return None, None
+
+def test_fields_are_emitted_as_they_complete(monitor):
+    """Test that top-level members are returned by the chunk that completes them."""
+    value = {'topic': 'a "quoted" \\ topic', 'keywords': ['x', 'y'], 'meta': {'n': 2}, 'is_clinical': True}
+    text = "```json\n" + json.dumps(value, indent=2) + "\n```"
+    fields = []
+    for start in range(0, len(text), 3):
+        fields.extend(monitor.feed(text[start:start + 3]))
+    assert fields == list(value.items())
+    assert monitor.done and monitor.value == value
+    assert monitor.finish() == (value, [])
+
+@pytest.mark.parametrize('text, consumed, message', [
+    ('{"topic": 5', len('{"topic": 5'), "$.topic: expected string"),
+    ('{"topic": "x", "extra": 1}', len('{"topic": "x", "extra"'), "unexpected property 'extra'"),
+    ('{"keywords": ["a", "b", "c", "d"]}', len('{"keywords": ["a", "b", "c", "'), "at most 3 items"),
+    ('{"confidence": 1.5, "topic": "x"}', len('{"confidence": 1.5,'), "$.confidence: violates maximum 1"),
+    ('{"meta": {"m": 1}, "topic": "x"}', len('{"meta": {"m": 1}'), "$.meta: missing required property 'n'"),
+    ('{"topic": "x"}', len('{"topic": "x"}'), "missing required property 'is_clinical'"),
+    ('{"is_clinical": tru, "topic": "x"}', len('{"is_clinical": tru,'), "invalid JSON value"),
+    ('Sure! {"topic": "x"}', 1, "unexpected character 'S'"),
+    ('["topic"]', 1, "$: expected object"),
+    ('{"top\\xic": "x"}', len('{"top\\xic"'), "$: invalid JSON key"),
+])
+def test_violations_abort_early(monitor, text, consumed, message):
+    """Test that a violation is raised at the first character that proves it."""
+    position, error = feed_until_error(monitor, text)
+    assert position == consumed
+    assert message in error
+    assert error.count(error.split(': ')[0] + ': ') == 1
+
+def test_valid_prefixes_never_abort(monitor):
+    """Test that every prefix of a valid response is accepted and only finish() reports incompleteness."""
+    text = '{"topic": "t", "is_clinical": false, "confidence": 0.5, "keywords": []}'
+    position, _ = feed_until_error(monitor, text[:-1])
+    assert position is None and not monitor.done
+    assert monitor.finish()[1]
+    assert monitor.feed(text[-1]) == [] and monitor.done
+    assert monitor.finish()[1] == []
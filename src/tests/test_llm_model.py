@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+import pytest
+from src.llm_model.llm_model import AsyncLLMClient, TokenBucket
+from src.tests.stub_llm_server import StubLLMServer
+from src.validator.validator import ResponseValidator
+
+LABEL_SCHEMA = {'type': 'object', 'properties': {'label': {'type': 'string'}, 'notes': {'type': 'string'}},
+                'required': ['label']}
+
+def test_make_request_and_handle_response():
+    """Test a single synchronous request against the stub server."""
+    with StubLLMServer() as server:
+        client = AsyncLLMClient(api_key="test-key", base_url=server.base_url)
+        response = client.make_request("hello", model="stub-model")
+    assert client.handle_response(response) == "echo: hello"
+    assert response['model'] == "stub-model"
+
+def test_concurrency_is_bounded():
+    """Test that requests run concurrently but never above max_concurrency."""
+    prompts = [f"prompt-{i}" for i in range(20)]
+    with StubLLMServer(latency=0.05) as server:
+        client = AsyncLLMClient(base_url=server.base_url, max_concurrency=5)
+        start = time.monotonic()
+        responses = client.make_requests(prompts, model="stub-model")
+        elapsed = time.monotonic() - start
+        assert server.max_in_flight == 5
+    assert [client.handle_response(response) for response in responses] == [f"echo: {p}" for p in prompts]
+    assert elapsed < 20 * 0.05
+
+def test_retries_rate_limited_requests():
+    """Test that 429 responses are retried with backoff until they succeed."""
+    with StubLLMServer(fail_first=2, fail_status=429) as server:
+        client = AsyncLLMClient(base_url=server.base_url, backoff_base=0.01)
+        response = client.make_request("retry me", model="stub-model")
+        assert server.request_count == 3
+    assert client.handle_response(response) == "echo: retry me"
+
+def test_non_json_success_body_is_retried_then_reported():
+    """Test that a 200 with an HTML body is retried, and fails only that row once retries run out."""
+    with StubLLMServer(fail_first=1, fail_status=200) as server:
+        client = AsyncLLMClient(base_url=server.base_url, backoff_base=0.01)
+        assert client.handle_response(client.make_request("proxy", model="stub-model")) == "echo: proxy"
+        assert server.request_count == 2
+    with StubLLMServer(fail_first=1, fail_status=200) as server:
+        client = AsyncLLMClient(base_url=server.base_url, max_retries=0)
+        responses = client.make_requests(["proxy", "fine"], model="stub-model")
+    errors = [response['error'] for response in responses if 'error' in response]
+    assert len(errors) == 1 and "Invalid JSON body" in errors[0]
+
+def test_non_retryable_error_is_reported():
+    """Test that a 400 response is not retried and is reported as an error."""
+    with StubLLMServer(fail_first=1, fail_status=400) as server:
+        client = AsyncLLMClient(base_url=server.base_url, backoff_base=0.01)
+        responses = client.make_requests(["bad request"], model="stub-model")
+        assert server.request_count == 1
+    assert responses[0]['status_code'] == 400
+    assert client.handle_response(responses[0]) == ""
+
+def test_token_bucket_limits_rate():
+    """Test that the token bucket paces acquisitions once its capacity is used up."""
+    async def acquire_all():
+        bucket = TokenBucket(rate_per_minute=600, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+    elapsed = asyncio.run(acquire_all())
+    assert 0.15 <= elapsed < 1.0
+
+def test_streaming_request_reports_fields_as_they_complete():
+    """Test that a streamed response is reassembled and its fields are reported while it streams."""
+    answer = json.dumps({'label': 'oncology', 'notes': 'n' * 40})
+    fields = []
+    with StubLLMServer(responder=lambda prompt: answer, stream_chunk_size=5, stream_delay=0.005) as server:
+        client = AsyncLLMClient(base_url=server.base_url)
+        response = asyncio.run(client.amake_streaming_request(
+            "classify", "stub-model", validator=ResponseValidator(LABEL_SCHEMA),
+            on_field=lambda key, value: fields.append((key, value, server.stream_chunks_sent))))
+        total_chunks = server.stream_chunks_sent
+    assert client.handle_response(response) == answer
+    assert response['choices'][0]['finish_reason'] == 'stop'
+    assert response['usage']['completion_tokens'] == len(answer.split())
+    assert [(key, value) for key, value, _ in fields] == [('label', 'oncology'), ('notes', 'n' * 40)]
+    assert fields[0][2] < total_chunks
+
+def test_streaming_request_aborts_on_schema_violation():
+    """Test that a response that cannot match the schema is abandoned early and the stream is closed."""
+    answer = json.dumps({'label': 5, 'notes': 'n' * 400})
+    with StubLLMServer(responder=lambda prompt: answer, stream_chunk_size=4, stream_delay=0.005) as server:
+        client = AsyncLLMClient(base_url=server.base_url)
+        responses = asyncio.run(client.amake_streaming_requests(
+            ["classify"], "stub-model", validator=ResponseValidator(LABEL_SCHEMA)))
+        deadline = time.monotonic() + 2
+        while not server.streams_aborted and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.streams_aborted == 1
+        assert server.stream_chunks_sent < len(answer) // 4 // 2
+    response = responses[0]
+    assert response['choices'][0]['finish_reason'] == 'aborted'
+    assert "$.label: expected string" in response['aborted']
+    assert answer.startswith(client.handle_response(response))
+    assert client.metrics.report()['counters']['llm_stream_aborts'] == 1
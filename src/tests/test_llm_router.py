@@ -0,0 +1,105 @@
+import asyncio
+import time
+import pytest
+from src.config_loader.config_loader import ConfigLoader
+from src.llm_model.llm_model import AsyncLLMClient
+from src.llm_model.llm_router import Endpoint, LLMRouter
+from src.tests.stub_llm_server import StubLLMServer
+
+def make_endpoint(name, server, weight=1.0, **options):
+    client = AsyncLLMClient(base_url=server.base_url, max_retries=0, backoff_base=0.01, **options)
+    return Endpoint(name, client, weight=weight)
+
+async def send_sequentially(router, prompts):
+    async with router.session():
+        return [await router.amake_request(prompt, "stub-model") for prompt in prompts]
+
+def test_traffic_prefers_the_faster_endpoint():
+    """Test that most requests go to the endpoint with the lower latency."""
+    prompts = [f"prompt-{i}" for i in range(60)]
+    with StubLLMServer(latency=0.005) as fast, StubLLMServer(latency=0.08) as slow:
+        router = LLMRouter([make_endpoint('fast', fast), make_endpoint('slow', slow)], max_concurrency=4, seed=1)
+        responses = router.make_requests(prompts, model="stub-model")
+        assert [router.handle_response(response) for response in responses] == [f"echo: {p}" for p in prompts]
+        assert fast.request_count > 2 * slow.request_count
+    stats = router.stats()
+    assert stats['endpoints']['fast']['requests'] == fast.request_count
+    assert stats['endpoints']['fast']['latency_ewma'] < stats['endpoints']['slow']['latency_ewma']
+
+def test_failover_takes_failing_endpoint_out_of_rotation():
+    """Test that failed requests move to another endpoint and an endpoint in outage is skipped."""
+    prompts = [f"prompt-{i}" for i in range(20)]
+    with StubLLMServer(error_rate=1.0) as down, StubLLMServer(latency=0.01) as healthy:
+        router = LLMRouter([make_endpoint('down', down), make_endpoint('healthy', healthy)],
+                           failure_threshold=3, cooldown=60, seed=0)
+        responses = asyncio.run(send_sequentially(router, prompts))
+        assert [router.handle_response(response) for response in responses] == [f"echo: {p}" for p in prompts]
+        assert 1 <= down.request_count <= 3
+    stats = router.stats()
+    assert stats['failovers'] == down.request_count
+    assert stats['endpoints']['down']['available'] == (down.request_count < 3)
+
+def test_slow_request_is_hedged():
+    """Test that a request slower than the endpoint's p95 is duplicated and the faster answer wins."""
+    with StubLLMServer(latency=0.01) as preferred, StubLLMServer(latency=0.01) as backup:
+        router = LLMRouter([make_endpoint('preferred', preferred, weight=10), make_endpoint('backup', backup)],
+                           min_samples=10, min_hedge_delay=0.05, max_hedge_ratio=0.5, seed=0)
+        asyncio.run(send_sequentially(router, [f"warm-{i}" for i in range(20)]))
+        preferred.latency = 1.0
+        start = time.monotonic()
+        responses = asyncio.run(send_sequentially(router, [f"slow-{i}" for i in range(5)]))
+        elapsed = time.monotonic() - start
+    assert [router.handle_response(response) for response in responses] == [f"echo: slow-{i}" for i in range(5)]
+    assert router.stats()['hedges'] >= 1
+    assert elapsed < 1.0
+
+def test_invalid_request_is_not_failed_over():
+    """Test that a request rejected as invalid is raised instead of sent to other endpoints."""
+    with StubLLMServer(fail_first=10, fail_status=400) as rejecting, StubLLMServer() as other:
+        router = LLMRouter([make_endpoint('rejecting', rejecting, weight=10), make_endpoint('other', other)])
+        response = router.make_requests(["bad prompt"], "stub-model")[0]
+        assert response['status_code'] == 400
+        assert other.request_count == 0
+
+def test_from_config_builds_endpoints(tmp_path):
+    """Test that configured endpoints inherit the llm_model settings they do not override."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "llm_model:\n"
+        "  model_name: main-model\n"
+        "  base_url: http://localhost:1/v1\n"
+        "  max_concurrency: 4\n"
+        "  endpoints:\n"
+        "    - name: primary\n"
+        "    - name: backup\n"
+        "      base_url: http://localhost:2/v1\n"
+        "      model_name: backup-model\n"
+        "      weight: 0.5\n"
+        "  router:\n"
+        "    cooldown: 5\n")
+    router = LLMRouter.from_config(ConfigLoader(str(config_file)))
+    primary, backup = router.endpoints
+    assert (primary.client.base_url, primary.model, primary.client.max_concurrency) == ("http://localhost:1/v1", None, 4)
+    assert (backup.client.base_url, backup.model, backup.weight) == ("http://localhost:2/v1", "backup-model", 0.5)
+    assert router.cooldown == 5
+    config_file.write_text("llm_model:\n  base_url: http://localhost:1/v1\n")
+    assert type(LLMRouter.from_config(ConfigLoader(str(config_file)))).__name__ == "AsyncLLMClient"
+
+def test_from_config_endpoints_fail_over_without_retrying(tmp_path):
+    """Test that configured endpoints ignore llm_model.max_retries and fail over on the first error."""
+    with StubLLMServer(error_rate=1.0) as down, StubLLMServer() as healthy:
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            "llm_model:\n"
+            "  max_retries: 5\n"
+            "  endpoints:\n"
+            f"    - {{name: down, base_url: '{down.base_url}', weight: 100}}\n"
+            f"    - {{name: healthy, base_url: '{healthy.base_url}'}}\n"
+            f"    - {{name: patient, base_url: '{healthy.base_url}', max_retries: 2}}\n"
+            "  router: {seed: 0}\n")
+        router = LLMRouter.from_config(ConfigLoader(str(config_file)))
+        assert [endpoint.client.max_retries for endpoint in router.endpoints] == [0, 0, 2]
+        start = time.perf_counter()
+        responses = asyncio.run(send_sequentially(router, ["a", "b", "c"]))
+        assert [router.handle_response(response) for response in responses] == ["echo: a", "echo: b", "echo: c"]
+        assert 1 <= down.request_count <= 3 and time.perf_counter() - start < 2
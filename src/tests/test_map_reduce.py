@@ -0,0 +1,133 @@
+import json
+import pandas as pd
+import pytest
+from src.data_saver.data_saver import DataSaver
+from src.llm_model.llm_model import AsyncLLMClient
+from src.pipeline.map_reduce import MapReduceRunner, merge_results
+from src.pipeline.run_ledger import RunLedger
+from src.prompt_builder.prompt_builder import PromptTemplate
+from src.prompt_builder.prompt_packer import TokenCounter
+from src.prompt_builder.text_chunker import TextChunker
+from src.tests.stub_llm_server import StubLLMServer
+from src.validator.validator import ResponseValidator
+
+SCHEMA = {'type': 'object', 'properties': {'topics': {'type': 'array'}, 'secret': {'type': 'boolean'},
+                                           'last_page': {'type': 'integer'}},
+          'required': ['topics', 'secret', 'last_page']}
+
+class WordCounter(TokenCounter):
+    """A deterministic token counter: one token per whitespace-separated word."""
+    def count(self, text):
+        return len(text.split())
+
+def chunk_responder(prompt: str) -> str:
+    """Answers map prompts with the topics found in the chunk and reduce prompts with a merge."""
+    if "Partial answers:" in prompt:
+        partials = [json.loads(line) for line in prompt.split("Partial answers:\n", 1)[1].splitlines()]
+        return json.dumps(merge_results(partials))
+    text = prompt.split("text: ", 1)[1].split("\npage_end: ")[0]
+    if "broken" in text:
+        return "not json"
+    return json.dumps({'topics': sorted({word for word in text.split() if word.startswith('topic')}),
+                       'secret': 'secret' in text, 'last_page': int(prompt.rsplit("page_end: ", 1)[1])})
+
+@pytest.fixture
+def pages():
+    """Create page rows of two documents; only the second mentions a secret."""
+    return pd.DataFrame({
+        'map_id': ['doc-a'] * 3 + ['doc-b'] * 2,
+        'page': [1, 2, 3, 1, 2],
+        'text': ["topic1 filler filler filler. topic2 filler filler.", "filler topic3 filler filler.",
+                 "filler filler filler filler.", "topic1 filler secret filler.", "broken filler filler filler."],
+    })
+
+def make_runner(server, **options):
+    return MapReduceRunner(AsyncLLMClient(base_url=server.base_url, max_concurrency=4, backoff_base=0.01),
+                           PromptTemplate("Extract.\n", ['text', 'page_end']), "stub-model",
+                           TextChunker(max_tokens=4, overlap_tokens=0, token_counter=WordCounter()),
+                           validator=ResponseValidator(SCHEMA), **options)
+
+def test_merge_results_rules():
+    """Test the default merge by value type and explicit per-field rules."""
+    results = [{'tags': ['a'], 'flag': False, 'count': 2, 'label': 'x', 'meta': {'n': 1}},
+               {'tags': ['b', 'a'], 'flag': True, 'count': 5, 'label': 'y', 'meta': {'n': 3}},
+               None,
+               {'tags': [], 'flag': False, 'count': 1, 'label': 'y', 'meta': {'n': 2}}]
+    assert merge_results(results) == {'tags': ['a', 'b'], 'flag': True, 'count': 5, 'label': 'y', 'meta': {'n': 3}}
+    merged = merge_results(results, {'count': 'sum', 'flag': 'all', 'label': 'first', 'meta.n': 'min'})
+    assert merged == {'tags': ['a', 'b'], 'flag': False, 'count': 8, 'label': 'x', 'meta': {'n': 1}}
+    with pytest.raises(ValueError):
+        merge_results(results, {'count': 'median'})
+
+def test_map_reduce_merges_chunk_results(pages):
+    """Test that every chunk is mapped and the chunk results are merged per document."""
+    with StubLLMServer(latency=0.01, responder=chunk_responder) as server:
+        results = make_runner(server).run([pages.iloc[:2], pages.iloc[2:]])
+    assert results['map_id'].tolist() == ['doc-a', 'doc-b']
+    assert results['chunks'].tolist() == [4, 2]
+    assert results['failed_chunks'].tolist() == [0, 1]
+    assert results['valid'].all()
+    doc_a, doc_b = (json.loads(result) for result in results['result'])
+    assert doc_a == {'topics': ['topic1', 'topic2', 'topic3'], 'secret': False, 'last_page': 3}
+    assert doc_b == {'topics': ['topic1'], 'secret': True, 'last_page': 1}
+    assert server.request_count == 6
+
+def test_map_reduce_llm_reduce_and_bounded_fan_out(pages):
+    """Test the tree of LLM reduce calls and the limit on chunks in flight."""
+    with StubLLMServer(latency=0.02, responder=chunk_responder) as server:
+        results = make_runner(server, reduce='llm', reduce_group_size=2, max_chunks_in_flight=2).run(pages)
+        reduce_prompts = [prompt for prompt in server.prompts if "Partial answers:" in prompt]
+    assert json.loads(results['result'][0])['topics'] == ['topic1', 'topic2', 'topic3']
+    # doc-a: 4 answers -> 2 -> 1 partials; doc-b has a single valid answer.
+    assert len(reduce_prompts) == 3
+    assert server.max_in_flight <= 2
+
+def test_document_without_valid_chunks_is_invalid(pages):
+    """Test that a document whose chunks all fail is reported instead of dropped."""
+    broken = pd.DataFrame({'map_id': ['doc-c'], 'page': [1], 'text': ["broken broken"]})
+    with StubLLMServer(responder=chunk_responder) as server:
+        results = make_runner(server, reduce=lambda answers: answers[0]).run(pd.concat([pages, broken]))
+    assert results['map_id'].tolist() == ['doc-a', 'doc-b', 'doc-c']
+    assert not results['valid'].iloc[2]
+    assert pd.isna(results['result'].iloc[2])
+
+def test_save_streams_results_and_resumes_from_the_ledger(tmp_path, pages):
+    """Test that results are saved per document and a rerun skips documents already saved."""
+    ledger = RunLedger(str(tmp_path / "run_ledger.sqlite"))
+    with StubLLMServer(responder=chunk_responder) as server:
+        saver = DataSaver(str(tmp_path / "output"), row_group_size=1)
+        counts = make_runner(server).save([pages.iloc[:3]], saver, ledger)
+        assert counts == {'documents': 1, 'valid': 1, 'failed_chunks': 0, 'skipped': 0}
+        assert len(saver.part_files()) == 1
+        requests = server.request_count
+        saver = DataSaver(str(tmp_path / "output"), resume=True)
+        counts = make_runner(server).save([pages], saver, ledger)
+        saver.close()
+        assert counts == {'documents': 1, 'valid': 1, 'failed_chunks': 1, 'skipped': 1}
+        assert server.request_count == requests + 2
+    saved = DataSaver(str(tmp_path / "output")).read_dataset()
+    assert saved['map_id'].tolist() == ['doc-a', 'doc-b']
+    assert ledger.summary()['saved'] == 2
+
+def test_save_marks_documents_only_once_flushed(tmp_path, pages):
+    """Test that documents still buffered when the saver fails are not recorded as saved."""
+    class CrashingSaver(DataSaver):
+        def flush(self):
+            raise RuntimeError("killed before the flush")
+
+    ledger = RunLedger(str(tmp_path / "run_ledger.sqlite"))
+    with StubLLMServer(responder=chunk_responder) as server:
+        with pytest.raises(RuntimeError):
+            make_runner(server).save([pages], CrashingSaver(str(tmp_path / "output")), ledger)
+    assert ledger.summary()['saved'] == 0
+
+def test_programming_errors_of_the_client_propagate(pages):
+    """Test that only request failures count as failed chunks."""
+    class BrokenClient:
+        async def amake_request(self, prompt, model, temperature=0.5, max_tokens=500):
+            raise TypeError("bad call")
+
+    runner = MapReduceRunner(BrokenClient(), PromptTemplate("Extract.\n", ['text']), "m",
+                             TextChunker(max_tokens=4, overlap_tokens=0, token_counter=WordCounter()))
+    with pytest.raises(TypeError):
+        runner.run(pages)
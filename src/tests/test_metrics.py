@@ -0,0 +1,71 @@
+import json
+import pstats
+import threading
+import pytest
+from src.metrics.metrics import MetricsRecorder
+
+def test_stage_timing_and_rows_per_sec():
+    """Test that stage calls accumulate seconds and rows into rows/sec."""
+    metrics = MetricsRecorder()
+    metrics.record_stage('clean', 0.5, rows=100)
+    metrics.record_stage('clean', 1.5, rows=300)
+    with metrics.stage('save', rows=10):
+        pass
+    stages = metrics.report()['stages']
+    assert stages['clean'] == {'seconds': 2.0, 'calls': 2, 'rows': 400, 'rows_per_sec': 200.0}
+    assert stages['save']['calls'] == 1 and stages['save']['rows'] == 10
+
+def test_latency_percentiles_and_sampling():
+    """Test percentiles over observed latencies, with the reservoir capping the samples."""
+    metrics = MetricsRecorder(max_samples=1_000)
+    for value in range(1, 10_001):
+        metrics.observe('llm_request_seconds', value / 1000)
+    latency = metrics.report()['latencies']['llm_request_seconds']
+    assert latency['count'] == 10_000 and latency['max'] == 10.0
+    assert latency['mean'] == pytest.approx(5.0005)
+    assert latency['p50'] == pytest.approx(5.0, rel=0.1)
+    assert latency['p99'] == pytest.approx(9.9, rel=0.05)
+    assert len(metrics._samples['llm_request_seconds']) == 1_000
+
+def test_counters_gauges_and_cache_hit_rates():
+    """Test counters from several threads, gauge maxima and derived cache hit rates."""
+    metrics = MetricsRecorder()
+    threads = [threading.Thread(target=lambda: [metrics.increment('llm_cache.hits') for _ in range(1_000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.increment('llm_cache.misses', 1_000)
+    for depth in (1, 4, 2):
+        metrics.set_gauge('queue_depth.loaded', depth)
+    report = metrics.report()
+    assert report['counters']['llm_cache.hits'] == 4_000
+    assert report['cache_hit_rates'] == {'llm_cache': 0.8}
+    assert report['gauges']['queue_depth.loaded'] == {'value': 2, 'max': 4}
+
+def test_exports(tmp_path):
+    """Test the JSON report and the Prometheus text format."""
+    metrics = MetricsRecorder()
+    metrics.record_stage('llm', 2.0, rows=10)
+    metrics.increment('llm_tokens_in', 1234)
+    metrics.set_gauge('queue_depth.prompted', 3)
+    metrics.observe('llm_request_seconds', 0.25)
+    metrics.write_report(str(tmp_path / "report.json"))
+    assert json.loads((tmp_path / "report.json").read_text())['counters'] == {'llm_tokens_in': 1234}
+    text = metrics.to_prometheus()
+    assert '# TYPE pipeline_stage_seconds_total counter' in text
+    assert 'pipeline_stage_rows_total{stage="llm"} 10' in text
+    assert 'pipeline_llm_tokens_in_total 1234' in text
+    assert 'pipeline_queue_depth_prompted_max 3' in text
+    assert 'pipeline_llm_request_seconds{quantile="0.95"} 0.25' in text
+    assert 'pipeline_llm_request_seconds_count 1' in text
+
+def test_profile_hook(tmp_path):
+    """Test that profile() dumps cProfile stats, and is a no-op without a path."""
+    metrics = MetricsRecorder()
+    with metrics.profile(None):
+        pass
+    with metrics.profile(str(tmp_path / "run.prof")):
+        sum(range(10_000))
+    assert pstats.Stats(str(tmp_path / "run.prof")).total_calls > 0
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from src.data_cleaner.data_cleaner import DataCleaner
+from src.data_cleaner.near_duplicates import MinHashLSH
+
+BASE_ABSTRACT = ("We study the folding dynamics of small proteins using molecular simulations "
+                 "and compare the resulting free energy landscapes with single molecule experiments "
+                 "performed at different temperatures and denaturant concentrations")
+
+@pytest.fixture
+def abstracts():
+    """Create abstracts where rows 0, 2 and 4 are near-duplicates of each other."""
+    return pd.DataFrame({
+        'id': [10, 11, 12, 13, 14],
+        'abstract': [
+            BASE_ABSTRACT,
+            "Graph neural networks are applied to traffic forecasting on large road networks",
+            BASE_ABSTRACT.upper().replace(" and ", "   and\n"),
+            "A survey of transformer architectures for long document summarisation tasks",
+            BASE_ABSTRACT + " at room temperature",
+        ]
+    }, index=['a', 'b', 'c', 'd', 'e'])
+
+def test_signatures_estimate_similarity():
+    """Test that identical texts share a signature and unrelated texts do not."""
+    lsh = MinHashLSH(num_perm=64)
+    signatures = lsh.signatures([BASE_ABSTRACT, BASE_ABSTRACT, "completely different words here and there"])
+    assert signatures.shape == (3, 64)
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+
+def test_find_near_duplicates(abstracts):
+    """Test that near-duplicate clusters are reported with their first row as cluster id."""
+    report = DataCleaner().find_near_duplicates(abstracts, ['abstract'], threshold=0.7)
+    assert report['row'].tolist() == ['a', 'c', 'e']
+    assert set(report['cluster_id']) == {'a'}
+    assert set(report['cluster_size']) == {3}
+
+def test_remove_near_duplicates(abstracts):
+    """Test that only the first row of each cluster is kept."""
+    cleaned = DataCleaner().remove_near_duplicates(abstracts, ['abstract'], threshold=0.7)
+    assert cleaned['id'].tolist() == [10, 11, 13]
+
+def test_incremental_batches_match_single_batch(abstracts):
+    """Test that adding texts in chunks gives the same clusters as one batch."""
+    texts = abstracts['abstract'].tolist()
+    single = MinHashLSH(threshold=0.7)
+    single.add(texts)
+    chunked = MinHashLSH(threshold=0.7)
+    chunked.add(texts[:2])
+    chunked.add(texts[2:])
+    assert single.clusters().tolist() == chunked.clusters().tolist() == [0, 1, 0, 3, 0]
+
+def test_bucket_members_are_verified_pairwise():
+    """Test that near-duplicates sharing a bucket with an unrelated first member are still clustered."""
+    import numpy as np
+    unrelated = [1] * 8 + [9] * 8
+    first, second = [1] * 8 + [5] * 7 + [6], [1] * 8 + [5] * 7 + [7]
+    for order, expected in [((unrelated, first, second), [0, 1, 1]), ((first, unrelated, second), [0, 1, 0])]:
+        lsh = MinHashLSH(threshold=0.8, num_perm=16, bands=2)
+        lsh._signatures, lsh._blank = [np.array(order, dtype=np.uint32)], [np.zeros(3, dtype=bool)]
+        assert lsh.clusters().tolist() == expected
+
+def test_blank_texts_are_not_clustered():
+    """Test that empty and missing texts are kept as distinct rows."""
+    data = pd.DataFrame({'id': [1, 2, 3, 4], 'abstract': ['', None, BASE_ABSTRACT, '  ']})
+    assert DataCleaner().find_near_duplicates(data, ['abstract']).empty
+    assert DataCleaner().remove_near_duplicates(data, ['abstract'])['id'].tolist() == [1, 2, 3, 4]
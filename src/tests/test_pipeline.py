@@ -0,0 +1,147 @@
+import json
+import pandas as pd
+import pytest
+from src.data_cleaner.data_cleaner import DataCleaner
+from src.data_loader.data_loader import DataLoader
+from src.data_saver.data_saver import DataSaver
+from src.llm_model.llm_model import AsyncLLMClient
+from src.metrics.metrics import MetricsRecorder
+from src.pipeline.pipeline import Pipeline
+from src.pipeline.run_ledger import RunLedger
+from src.prompt_builder.prompt_builder import PromptTemplate
+from src.tests.stub_llm_server import StubLLMServer
+from src.validator.validator import ResponseValidator
+
+SCHEMA = {'type': 'object', 'properties': {'label': {'type': 'string'}}, 'required': ['label']}
+
+def label_responder(prompt: str) -> str:
+    """Answers with a valid label, except for titles containing 'bad'."""
+    return "not json" if "bad" in prompt else json.dumps({'label': prompt.rsplit("title: ", 1)[-1].split("\n")[0]})
+
+@pytest.fixture
+def input_csv(tmp_path):
+    file_path = tmp_path / "input.csv"
+    pd.DataFrame({
+        'id': range(10),
+        'title': [f"title-{i}" if i != 7 else "bad title" for i in range(10)],
+        'abstract': [f"abstract-{i}é" for i in range(10)],
+    }).to_csv(file_path, index=False)
+    return str(file_path)
+
+def make_pipeline(input_csv, output_dir, server, ledger=None, **options):
+    return Pipeline(DataLoader(input_csv), DataCleaner(), PromptTemplate("Label the row.\n", ['title', 'abstract']),
+                    AsyncLLMClient(base_url=server.base_url, max_concurrency=4, backoff_base=0.01),
+                    ResponseValidator(SCHEMA), DataSaver(output_dir, csv_file="results.csv", resume=ledger is not None),
+                    ['title', 'abstract'], "stub-model", batch_size=3, queue_size=1, ledger=ledger, **options)
+
+@pytest.mark.parametrize('cpu_workers', [0, 2])
+def test_pipeline_end_to_end(tmp_path, input_csv, cpu_workers):
+    """Test that every row is cleaned, prompted, answered, validated and saved."""
+    with StubLLMServer(latency=0.01, responder=label_responder) as server:
+        summary = make_pipeline(input_csv, str(tmp_path / "output"), server, cpu_workers=cpu_workers).run()
+        assert server.request_count == 10
+        assert all("é" not in prompt for prompt in server.prompts)
+    assert summary['rows_loaded'] == summary['rows_saved'] == 10
+    assert summary['rows_valid'] == 9 and summary['rows_invalid'] == 1
+    results = pd.read_csv(summary['outputs']['csv']).sort_values('id')
+    assert results['id'].tolist() == list(range(10))
+    assert results.loc[results['id'] == 3, 'response'].item() == '{"label": "title-3"}'
+    assert results['valid'].tolist() == [i != 7 for i in range(10)]
+
+def test_pipeline_streams_and_aborts_invalid_responses(tmp_path, input_csv):
+    """Test that streamed responses are saved like regular ones and a doomed response is abandoned."""
+    with StubLLMServer(responder=label_responder) as server:
+        summary = make_pipeline(input_csv, str(tmp_path / "output"), server, cpu_workers=0, stream=True).run()
+    assert summary['rows_saved'] == 10 and summary['rows_valid'] == 9
+    assert summary['responses_aborted'] == 1
+    results = pd.read_csv(summary['outputs']['csv']).sort_values('id')
+    assert results.loc[results['id'] == 3, 'response'].item() == '{"label": "title-3"}'
+    assert not results.loc[results['id'] == 7, 'valid'].item()
+
+def test_pipeline_resumes_with_ledger(tmp_path, input_csv):
+    """Test that failed requests are retried on the next run and saved rows are skipped."""
+    ledger = RunLedger(str(tmp_path / "output" / "run_ledger.sqlite"))
+    with StubLLMServer(responder=label_responder, fail_first=2, fail_status=400) as server:
+        first = make_pipeline(input_csv, str(tmp_path / "output"), server, ledger=ledger, cpu_workers=0).run()
+        assert first['requests_failed'] == 2 and first['rows_saved'] == 8
+        second = make_pipeline(input_csv, str(tmp_path / "output"), server, ledger=ledger, cpu_workers=0).run()
+        assert server.request_count == 12
+    assert second['rows_skipped'] == 8 and second['rows_saved'] == 2
+    assert ledger.summary()['saved'] == 10
+    assert sorted(pd.read_csv(second['outputs']['csv'])['id']) == list(range(10))
+
+def test_pipeline_reprocesses_rows_lost_from_the_save_buffer(tmp_path, input_csv):
+    """Test that rows appended but never flushed before a crash are not recorded as saved."""
+    class CrashingSaver(DataSaver):
+        def close(self):
+            raise RuntimeError("killed before the final flush")
+
+    ledger = RunLedger(str(tmp_path / "output" / "run_ledger.sqlite"))
+    with StubLLMServer(responder=label_responder) as server:
+        crashing = make_pipeline(input_csv, str(tmp_path / "output"), server, ledger=ledger, cpu_workers=0)
+        crashing.saver = CrashingSaver(str(tmp_path / "output"), row_group_size=5)
+        with pytest.raises(RuntimeError):
+            crashing.run()
+        flushed = ledger.summary()['saved']
+        assert flushed == len(crashing.saver.read_dataset()) < 10
+        resumed = make_pipeline(input_csv, str(tmp_path / "output"), server, ledger=ledger, cpu_workers=0).run()
+        assert server.request_count == 10 + 10 - flushed
+    assert resumed['rows_skipped'] == flushed and ledger.summary()['saved'] == 10
+    assert sorted(pd.read_csv(resumed['outputs']['csv'])['id']) == list(range(10))
+
+def test_pipeline_drops_near_duplicates_when_configured(tmp_path):
+    """Test that the cleaning stage drops near-duplicate rows of a batch when a threshold is set."""
+    text = "a long abstract about protein folding measured with single molecule force spectroscopy"
+    input_csv = tmp_path / "input.csv"
+    pd.DataFrame({'id': [1, 2, 3], 'title': ["t", "t", "other"],
+                  'abstract': [text, text.upper() + " !", "graph networks for traffic"]}).to_csv(input_csv, index=False)
+    with StubLLMServer(responder=label_responder) as server:
+        summary = make_pipeline(str(input_csv), str(tmp_path / "output"), server, cpu_workers=0,
+                                near_duplicate_threshold=0.8).run()
+        assert server.request_count == 2
+    assert summary['rows_cleaned'] == summary['rows_saved'] == 2
+
+def test_pipeline_metrics_report(tmp_path, input_csv):
+    """Test that stages, queues and the LLM client record into one report written after the run."""
+    metrics = MetricsRecorder()
+    with StubLLMServer(responder=label_responder) as server:
+        pipeline = Pipeline(DataLoader(input_csv, metrics=metrics), DataCleaner(),
+                            PromptTemplate("Label the row.\n", ['title', 'abstract']),
+                            AsyncLLMClient(base_url=server.base_url, metrics=metrics), ResponseValidator(SCHEMA),
+                            DataSaver(str(tmp_path / "output"), metrics=metrics), ['title', 'abstract'],
+                            "stub-model", batch_size=4, cpu_workers=0, metrics=metrics,
+                            report_file=str(tmp_path / "output" / "run_report.json"),
+                            prometheus_file=str(tmp_path / "output" / "metrics.prom"))
+        summary = pipeline.run()
+    report = json.loads((tmp_path / "output" / "run_report.json").read_text())
+    for stage in ('load', 'clean', 'render', 'llm', 'validate', 'save', 'save.flush'):
+        assert report['stages'][stage]['rows'] == 10
+    assert report['latencies']['llm_request_seconds']['count'] == 10
+    assert report['counters']['llm_tokens_in'] > 0 and report['counters']['rows_saved'] == 10
+    assert 'queue_depth.loaded' in report['gauges']
+    assert summary['metrics']['counters']['llm_requests'] == 10
+    assert 'pipeline_llm_request_seconds_count 10' in (tmp_path / "output" / "metrics.prom").read_text()
+
+def test_from_config_treats_a_directory_of_pdfs_as_pdf_input(tmp_path):
+    """Test that the id and text columns follow the files a directory resolves to, or input_type."""
+    import fitz
+    import yaml
+    from src.config_loader.config_loader import ConfigLoader
+    (tmp_path / "docs").mkdir()
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Some text.")
+    doc.save(tmp_path / "docs" / "a.pdf")
+    doc.close()
+    config = {'data_loader': {'file_path': str(tmp_path / "docs"), 'required_pdf_columns': "map_id,text",
+                              'required_tabular_columns': "id,title"},
+              'llm_model': {'model_name': "m", 'base_url': "http://localhost:1"},
+              'output': {'output_dir': str(tmp_path / "output")}}
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config))
+    pipeline = Pipeline.from_config(ConfigLoader(str(tmp_path / "config.yaml")), PromptTemplate("P\n", ['text']),
+                                    ResponseValidator(SCHEMA))
+    assert pipeline.id_column == 'map_id' and pipeline.text_columns == ['text']
+    config['data_loader']['input_type'] = 'tabular'
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config))
+    pipeline = Pipeline.from_config(ConfigLoader(str(tmp_path / "config.yaml")), PromptTemplate("P\n", ['title']),
+                                    ResponseValidator(SCHEMA))
+    assert pipeline.id_column == 'id' and pipeline.text_columns == ['title']
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from src.prompt_builder.prompt_builder import PromptBuilder
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {'topic': {'type': 'string'}, 'is_clinical': {'type': 'boolean'}},
+    'required': ['topic', 'is_clinical']
+}
+
+@pytest.fixture
+def prompt_sheet(tmp_path):
+    """Create a prompt sheet with a blank question."""
+    excel_file = tmp_path / "prompts.xlsx"
+    pd.DataFrame({'question': ['What is the topic?', None, 'Is it a clinical study?']}).to_excel(
+        excel_file, sheet_name='prompts', index=False)
+    return str(excel_file)
+
+def test_load_questions_is_cached(prompt_sheet, monkeypatch):
+    """Test that the question sheet is parsed only once."""
+    builder = PromptBuilder(sheet_name='prompts')
+    assert builder.load_questions_from_excel(prompt_sheet) == ['What is the topic?', 'Is it a clinical study?']
+    monkeypatch.setattr(pd, "read_excel", lambda *args, **kwargs: pytest.fail("sheet parsed twice"))
+    assert builder.load_questions_from_excel(prompt_sheet) == ['What is the topic?', 'Is it a clinical study?']
+
+def test_create_master_prompt_is_cached():
+    """Test that the cached master prompt is handed out as a copy callers cannot alter."""
+    builder = PromptBuilder()
+    first = builder.create_master_prompt(['Q1'], SCHEMA)
+    assert first['questions'] == ['Q1'] and first['response_schema'] == SCHEMA
+    first['questions'].append('Q2')
+    first['response_schema']['required'] = []
+    second = builder.create_master_prompt(['Q1'], SCHEMA)
+    assert second is not first
+    assert second['questions'] == ['Q1'] and second['response_schema'] == SCHEMA
+    assert len(builder._master_prompt_cache) == 1
+
+def test_compiled_template_renders_rows():
+    """Test that single and vectorized rendering produce the same prompts."""
+    template = PromptBuilder().compile_template(['What is the topic?'], SCHEMA, fields=['title', 'abstract'])
+    assert "1. What is the topic?" in template.static_prefix
+    assert '"required"' in template.static_prefix
+    data = pd.DataFrame({'title': ['T-1', 'T-2'], 'abstract': ['Ab-1', None]})
+    prompts = template.render_many(data)
+    assert prompts.iloc[0] == template.static_prefix + "title: T-1\nabstract: Ab-1"
+    assert prompts.tolist() == [template.render(row) for row in data.to_dict('records')]
+
+def test_validate_prompt():
+    """Test prompt validation against the schema's required keys."""
+    builder = PromptBuilder()
+    assert builder.validate_prompt({'topic': 'x', 'is_clinical': True}, SCHEMA) is True
+    assert builder.validate_prompt({'topic': 'x'}, SCHEMA) is False
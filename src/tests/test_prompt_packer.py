@@ -0,0 +1,107 @@
+import json
+import pandas as pd
+import pytest
+from src.llm_model.llm_model import AsyncLLMClient
+from src.prompt_builder.prompt_packer import PackedRequest, PromptPacker, TokenCounter
+from src.tests.stub_llm_server import StubLLMServer
+
+class CharCounter(TokenCounter):
+    """A deterministic token counter: one token per character."""
+    def count(self, text):
+        return len(text)
+
+def answer_rows(prompt):
+    """Answer every packed row with the length of its abstract."""
+    rows = [json.loads(line) for line in prompt.split("Rows:\n", 1)[1].splitlines()]
+    return json.dumps({row['id']: {'length': len(row['abstract'])} for row in rows})
+
+@pytest.fixture
+def abstracts():
+    """Create short abstracts keyed by id."""
+    return pd.DataFrame({'id': [1, 2, 3, 4, 5], 'abstract': ['a' * 10, 'b' * 20, 'c' * 30, 'd' * 400, 'e' * 5]})
+
+def test_pack_respects_token_budget(abstracts):
+    """Test that rows are packed greedily in order under the token budget."""
+    packer = PromptPacker("Summarise.", token_budget=400, token_counter=CharCounter())
+    requests = packer.pack(abstracts, 'id', ['abstract'])
+    assert [request.ids for request in requests] == [['1', '2', '3'], ['4'], ['5']]
+    assert all(len(request.prompt) <= 400 for request in requests if len(request.ids) > 1)
+
+def test_pack_rejects_duplicate_ids(abstracts):
+    """Test that ids must be unique, since packed answers are keyed by row id."""
+    packer = PromptPacker("Summarise.", token_budget=400, token_counter=CharCounter())
+    with pytest.raises(ValueError, match="unique"):
+        packer.pack(abstracts.assign(id=[1, 2, 1, 4, 5]), 'id', ['abstract'])
+
+def test_split_response_validates_ids():
+    """Test that a packed answer must contain exactly the requested ids."""
+    packer = PromptPacker("Summarise.", row_validator=lambda result: 'length' in result)
+    request = PackedRequest(['1', '2'], "prompt")
+    assert packer.split_response(request, '```json\n{"1": {"length": 1}, "2": {"length": 2}}\n```') == {
+        '1': {'length': 1}, '2': {'length': 2}}
+    assert packer.split_response(request, '{"1": {"length": 1}}') is None
+    assert packer.split_response(request, '{"1": {"length": 1}, "2": {}}') is None
+    assert packer.split_response(request, 'not json') is None
+
+def test_run_packs_rows_into_fewer_requests(abstracts):
+    """Test that packed rows are answered with fewer requests than rows."""
+    with StubLLMServer(responder=answer_rows) as server:
+        packer = PromptPacker("Count characters.", token_budget=400, token_counter=CharCounter())
+        results = packer.run(AsyncLLMClient(base_url=server.base_url), abstracts, 'id', ['abstract'], model="m")
+        assert server.request_count == 3
+    assert results == {'1': {'length': 10}, '2': {'length': 20}, '3': {'length': 30},
+                       '4': {'length': 400}, '5': {'length': 5}}
+
+def test_run_falls_back_to_single_rows(abstracts):
+    """Test that rows of an invalid packed answer are retried one per request."""
+    def drop_first_row_when_packed(prompt):
+        answer = json.loads(answer_rows(prompt))
+        if len(answer) > 1:
+            answer.pop(next(iter(answer)))
+        return json.dumps(answer)
+
+    with StubLLMServer(responder=drop_first_row_when_packed) as server:
+        packer = PromptPacker("Count characters.", token_budget=400, token_counter=CharCounter())
+        results = packer.run(AsyncLLMClient(base_url=server.base_url), abstracts, 'id', ['abstract'], model="m")
+        assert server.request_count == 3 + 3
+    assert results['1'] == {'length': 10}
+    assert len(results) == 5
+
+def test_run_sends_blocking_client_requests_in_threads(abstracts):
+    """Test that a synchronous client's requests run concurrently instead of blocking the loop."""
+    import threading
+
+    class BlockingClient:
+        def __init__(self):
+            self.barrier = threading.Barrier(3, timeout=5)
+
+        def make_request(self, prompt, model, temperature=0.5, max_tokens=500):
+            self.barrier.wait()
+            return {'choices': [{'message': {'content': answer_rows(prompt)}}]}
+
+        def handle_response(self, response):
+            return response['choices'][0]['message']['content']
+
+    packer = PromptPacker("Count characters.", token_budget=400, token_counter=CharCounter())
+    results = packer.run(BlockingClient(), abstracts, 'id', ['abstract'], model="m")
+    assert results['4'] == {'length': 400} and len(results) == 5
+
+def test_run_maps_request_errors_to_none_and_raises_other_errors(abstracts):
+    """Test that failed requests give None results while programming errors propagate."""
+    import httpx
+
+    class FailingClient:
+        def __init__(self, error):
+            self.error = error
+
+        def make_request(self, prompt, model, temperature=0.5, max_tokens=500):
+            raise self.error
+
+        def handle_response(self, response):
+            return ""
+
+    packer = PromptPacker("Count characters.", token_budget=400, token_counter=CharCounter())
+    results = packer.run(FailingClient(httpx.ConnectError("refused")), abstracts, 'id', ['abstract'], model="m")
+    assert results == dict.fromkeys(['1', '2', '3', '4', '5'])
+    with pytest.raises(TypeError):
+        packer.run(FailingClient(TypeError("bad argument")), abstracts, 'id', ['abstract'], model="m")
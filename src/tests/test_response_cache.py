@@ -0,0 +1,84 @@
+import time
+import pytest
+from src.llm_model.llm_model import AsyncLLMClient
+from src.llm_model.response_cache import CachedLLMModel
+from src.tests.stub_llm_server import StubLLMServer
+
+class CountingModel:
+    """A synchronous stand-in for an LLM client that counts its calls."""
+    def __init__(self):
+        self.calls = 0
+
+    def make_request(self, prompt, model, temperature=0.5, max_tokens=500):
+        self.calls += 1
+        return {'choices': [{'message': {'content': f"{model}:{prompt}"}}]}
+
+    def handle_response(self, response):
+        return response['choices'][0]['message']['content']
+
+def test_repeated_requests_are_served_from_cache(tmp_path):
+    """Test that an identical request is answered from the cache, across instances."""
+    inner = CountingModel()
+    cache_path = str(tmp_path / "cache" / "responses.sqlite")
+    cached = CachedLLMModel(inner, cache_path)
+    first = cached.make_request("hello", "model-a", temperature=0.2)
+    second = cached.make_request("hello", "model-a", temperature=0.2)
+    assert first == second and inner.calls == 1
+    assert cached.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1}
+    cached.close()
+
+    reopened = CachedLLMModel(inner, cache_path)
+    assert reopened.handle_response(reopened.make_request("hello", "model-a", temperature=0.2)) == "model-a:hello"
+    assert inner.calls == 1
+
+def test_key_includes_model_and_parameters(tmp_path):
+    """Test that changing the model or a sampling parameter is a cache miss."""
+    inner = CountingModel()
+    cached = CachedLLMModel(inner, str(tmp_path / "responses.sqlite"))
+    cached.make_request("hello", "model-a", temperature=0.2)
+    cached.make_request("hello", "model-b", temperature=0.2)
+    cached.make_request("hello", "model-a", temperature=0.7)
+    cached.make_request("hello", "model-a", temperature=0.2, max_tokens=10)
+    assert inner.calls == 4
+
+def test_ttl_and_size_eviction(tmp_path):
+    """Test that expired entries are not served and old entries are evicted."""
+    inner = CountingModel()
+    cached = CachedLLMModel(inner, str(tmp_path / "responses.sqlite"), ttl_seconds=0.05, max_entries=2)
+    for prompt in ["a", "b", "c"]:
+        cached.make_request(prompt, "model")
+    assert cached.stats()['entries'] == 2
+    time.sleep(0.1)
+    cached.make_request("c", "model")
+    assert inner.calls == 4
+
+def test_batch_requests_send_each_distinct_prompt_once(tmp_path):
+    """Test that repeated rows within and across runs cost no extra API calls."""
+    with StubLLMServer() as server:
+        cached = CachedLLMModel(AsyncLLMClient(base_url=server.base_url),
+                                str(tmp_path / "responses.sqlite"))
+        responses = cached.make_requests(["x", "y", "x"], model="stub-model")
+        assert [cached.handle_response(response) for response in responses] == ["echo: x", "echo: y", "echo: x"]
+        cached.make_requests(["y", "x", "z"], model="stub-model")
+        assert server.request_count == 3
+
+def test_eviction_is_amortised_and_keeps_recently_used_entries(tmp_path):
+    """Test that eviction runs once per slack-sized overflow, not per insert, and trims least recently used entries."""
+    cached = CachedLLMModel(CountingModel(), str(tmp_path / "responses.sqlite"), max_entries=100)
+    evictions = 0
+    evict = cached._evict
+
+    def counting_evict():
+        nonlocal evictions
+        evictions += 1
+        evict()
+
+    cached._evict = counting_evict
+    cached.make_requests([f"prompt {i}" for i in range(100)], "model")
+    cached.make_request("prompt 0", "model")
+    cached.make_requests([f"prompt {i}" for i in range(100, 111)], "model")
+    assert evictions == 1 and cached.stats()['entries'] == 100
+    assert cached.get(CachedLLMModel.make_key("prompt 0", "model", 0.5, 500)) is not None
+    assert cached.get(CachedLLMModel.make_key("prompt 1", "model", 0.5, 500)) is None
+    cached.make_requests([f"prompt {i}" for i in range(111, 1_111)], "model")
+    assert cached.stats()['entries'] <= 110 and evictions <= 100
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from src.pipeline.run_ledger import RunLedger
+
+@pytest.fixture
+def rows():
+    return pd.DataFrame({'id': [1, 2, 3], 'title': ['t-1', 't-2', 't-3'], 'abstract': ['a-1', 'a-2', None]})
+
+def test_register_returns_new_rows(tmp_path, rows):
+    """Test that all rows of a first run are pending and recorded as loaded."""
+    ledger = RunLedger(str(tmp_path / "output" / "run_ledger.sqlite"))
+    pending = ledger.register(rows, 'id', ['title', 'abstract'])
+    assert pending['id'].tolist() == [1, 2, 3]
+    assert ledger.summary() == {'loaded': 3, 'prompted': 0, 'responded': 0, 'validated': 0, 'saved': 0}
+
+def test_restart_skips_completed_rows(tmp_path, rows):
+    """Test that a restarted run only returns rows that did not reach the final state."""
+    path = str(tmp_path / "run_ledger.sqlite")
+    ledger = RunLedger(path)
+    ledger.register(rows, 'id', ['title', 'abstract'])
+    ledger.mark([1, 2], 'responded')
+    ledger.mark([1], 'saved')
+    ledger.mark([1], 'prompted')
+    ledger.close()
+
+    restarted = RunLedger(path)
+    assert restarted.get_states([1, 2])['state'].to_dict() == {'1': 'saved', '2': 'responded'}
+    assert restarted.register(rows, 'id', ['title', 'abstract'])['id'].tolist() == [2, 3]
+
+def test_changed_rows_are_reprocessed(tmp_path, rows):
+    """Test that only new or changed rows are pending after a completed run."""
+    ledger = RunLedger(str(tmp_path / "run_ledger.sqlite"))
+    ledger.register(rows, 'id', ['title', 'abstract'])
+    ledger.mark(rows['id'], 'saved')
+    assert ledger.register(rows, 'id', ['title', 'abstract']).empty
+
+    rerun = pd.concat([rows, pd.DataFrame({'id': [4], 'title': ['t-4'], 'abstract': ['a-4']})], ignore_index=True)
+    rerun.loc[1, 'abstract'] = 'a-2 (revised)'
+    assert ledger.register(rerun, 'id', ['title', 'abstract'])['id'].tolist() == [2, 4]
+    assert ledger.get_states([2])['state'].iat[0] == 'loaded'
+
+def test_unknown_state_is_rejected(tmp_path):
+    ledger = RunLedger(str(tmp_path / "run_ledger.sqlite"))
+    with pytest.raises(ValueError):
+        ledger.mark([1], 'finished')
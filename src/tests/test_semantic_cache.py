@@ -0,0 +1,112 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from src.llm_model.llm_model import AsyncLLMClient
+from src.llm_model.semantic_cache import HashingVectorizer, SemanticCachedLLMModel, SimHashIndex
+from src.tests.stub_llm_server import StubLLMServer
+
+PREFIX = "Classify the product review.\n"
+
+class CountingModel:
+    """A synchronous stand-in for an LLM client that answers with a fixed label per prompt."""
+    def __init__(self, label=lambda prompt: "positive" if "great" in prompt else "negative"):
+        self.prompts = []
+        self.label = label
+
+    def make_request(self, prompt, model, temperature=0.5, max_tokens=500):
+        self.prompts.append(prompt)
+        return {'choices': [{'message': {'content': json.dumps({'label': self.label(prompt)})}}]}
+
+    def handle_response(self, response):
+        return response['choices'][0]['message']['content']
+
+def test_vectorizer_ignores_whitespace_case_order_and_boilerplate():
+    """Test that trivial variations of a text embed close together and unrelated texts do not."""
+    vectorizer = HashingVectorizer(boilerplate=[r"sent from my \w+"])
+    base = "The battery lasts two days. The screen is bright and sharp."
+    vectors = vectorizer.transform([
+        base,
+        "the  battery lasts two days.\nThe screen is BRIGHT and sharp.  Sent from my phone",
+        "The screen is bright and sharp. The battery lasts two days.",
+        "Shipping took three weeks and the box arrived crushed.",
+        "",
+    ])
+    similarities = vectors @ vectors[0]
+    assert similarities[1] == pytest.approx(1.0, abs=1e-5)
+    assert similarities[2] > 0.9
+    assert similarities[3] < 0.5
+    assert not vectors[4].any()
+
+def test_index_finds_nearest_neighbour():
+    """Test that the LSH index returns the stored vector closest to a query."""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((500, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = SimHashIndex(64, seed=3)
+    index.add(vectors)
+    query = vectors[42] + 0.02 * rng.standard_normal(64).astype(np.float32)
+    position, similarity = index.query(query / np.linalg.norm(query))
+    assert position == 42 and similarity > 0.95
+    index.remove(42)
+    assert index.query(vectors[42])[0] != 42 and len(index) == 499
+
+def test_near_duplicates_are_served_from_cache_across_instances(tmp_path):
+    """Test that a reworded row is a hit, a different row or model is a miss, and hits persist."""
+    inner = CountingModel()
+    path = str(tmp_path / "cache" / "semantic.sqlite")
+    cached = SemanticCachedLLMModel(inner, path, prefix=PREFIX, threshold=0.9)
+    first = cached.make_request(PREFIX + "Great phone, the battery lasts two days.", "model-a")
+    second = cached.make_request(PREFIX + "great phone -  the battery lasts two days!", "model-a")
+    cached.make_request(PREFIX + "Terrible support, never again.", "model-a")
+    cached.make_request(PREFIX + "Great phone, the battery lasts two days.", "model-b")
+    assert second == first and len(inner.prompts) == 3
+    assert cached.stats()['hits'] == 1 and cached.stats()['entries'] == 3
+    cached.close()
+
+    reopened = SemanticCachedLLMModel(inner, path, prefix=PREFIX, threshold=0.9)
+    assert reopened.make_request(PREFIX + "GREAT phone; the battery lasts two days", "model-a") == first
+    assert len(inner.prompts) == 3
+    with pytest.raises(ValueError):
+        SemanticCachedLLMModel(inner, path, prefix=PREFIX, dimensions=256)
+
+def test_near_duplicates_in_one_batch_are_sent_once():
+    """Test that similar rows of one batch share a single request to the server."""
+    with StubLLMServer() as server:
+        client = SemanticCachedLLMModel(AsyncLLMClient(base_url=server.base_url), ":memory:",
+                                        prefix=PREFIX, threshold=0.9)
+        prompts = [PREFIX + text for text in ("Fast delivery and great price.", "fast  delivery and GREAT price!",
+                                              "The charger stopped working after a week.")]
+        responses = client.make_requests(prompts, "stub-model")
+        assert server.request_count == 2
+        assert responses[0] == responses[1] != responses[2]
+
+def test_audits_count_false_hits(tmp_path):
+    """Test that audited near hits are re-requested and differing answers are recorded as false hits."""
+    inner = CountingModel(label=lambda prompt: "negative" if "not" in prompt else "positive")
+    cached = SemanticCachedLLMModel(inner, str(tmp_path / "semantic.sqlite"), prefix=PREFIX, threshold=0.7,
+                                    audit_rate=1.0)
+    cached.make_request(PREFIX + "The camera is good and the screen is good and the sound is good.", "m")
+    response = cached.make_request(PREFIX + "The camera is good and the screen is good and the sound is not good.", "m")
+    cached.make_request(PREFIX + "the camera is good and the screen is good and the sound is good!", "m")
+    stats = cached.stats()
+    assert json.loads(cached.handle_response(response)) == {'label': 'negative'}
+    assert stats['audits'] == 1 and stats['false_hits'] == 1 and stats['false_hit_rate'] == 1.0
+    assert len(inner.prompts) == 2
+
+def test_concurrent_calls_share_pending_misses():
+    """Test that a near match of a miss still in flight in another call waits for its response."""
+    class SlowModel(CountingModel):
+        async def amake_requests(self, prompts, model, temperature=0.5, max_tokens=500):
+            await asyncio.sleep(0.05)
+            return [self.make_request(prompt, model) for prompt in prompts]
+
+    inner = SlowModel()
+    cached = SemanticCachedLLMModel(inner, ":memory:", prefix=PREFIX, threshold=0.9)
+
+    async def overlapping():
+        return await asyncio.gather(cached.amake_requests([PREFIX + "the quick brown fox jumps"], 'm'),
+                                    cached.amake_requests([PREFIX + "The quick brown fox jumps!"], 'm'))
+
+    first, second = asyncio.run(overlapping())
+    assert first == second and len(inner.prompts) == 1 and not cached._pending
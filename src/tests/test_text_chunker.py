@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from src.prompt_builder.prompt_packer import TokenCounter
+from src.prompt_builder.text_chunker import TextChunker
+
+class WordCounter(TokenCounter):
+    """A deterministic token counter: one token per whitespace-separated word."""
+    def count(self, text):
+        return len(text.split())
+
+def make_pages(pages=3, paragraphs=4, words=30):
+    """Create page texts of numbered words in paragraphs of sentences."""
+    texts = []
+    for page in range(pages):
+        paragraph_texts = []
+        for paragraph in range(paragraphs):
+            tokens = [f"w{page}.{paragraph}.{word}" for word in range(words)]
+            sentences = [" ".join(tokens[start:start + 10]) + "." for start in range(0, words, 10)]
+            paragraph_texts.append(" ".join(sentences))
+        texts.append((page + 1, "\n\n".join(paragraph_texts) + "\n"))
+    return texts
+
+def test_chunks_reconstruct_text_without_overlap():
+    """Test that chunks stay within the budget and concatenate back to the document."""
+    pages = make_pages()
+    chunker = TextChunker(max_tokens=25, overlap_tokens=0, token_counter=WordCounter())
+    chunks = list(chunker.iter_chunks(pages))
+    assert "".join(chunk.text for chunk in chunks) == "".join(text for _, text in pages)
+    assert all(0 < chunk.tokens <= 25 for chunk in chunks)
+    assert all(chunk.tokens == len(chunk.text.split()) for chunk in chunks)
+    assert [chunk.page_start for chunk in chunks] == sorted(chunk.page_start for chunk in chunks)
+
+def test_chunks_overlap_and_span_pages():
+    """Test that each chunk repeats the tail of the previous one and may cover several pages."""
+    chunker = TextChunker(max_tokens=50, overlap_tokens=10, token_counter=WordCounter())
+    chunks = list(chunker.iter_chunks(make_pages(paragraphs=1)))
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        overlap = previous.text.split()[-1]
+        assert overlap in chunk.text.split()[:10]
+    assert any(chunk.page_start < chunk.page_end for chunk in chunks)
+    assert chunks[-1].page_end == 3
+
+def test_oversized_word_is_sliced():
+    """Test that a single word longer than the budget is cut into fitting slices."""
+    chunker = TextChunker(max_tokens=10, overlap_tokens=0)
+    chunks = list(chunker.iter_chunks([(1, "x" * 500)]))
+    assert "".join(chunk.text for chunk in chunks) == "x" * 500
+    assert all(chunk.tokens <= 10 for chunk in chunks)
+
+def test_chunk_frame_groups_documents_across_batches():
+    """Test that page rows are grouped per document even when a document spans two frames."""
+    rows = pd.DataFrame({'map_id': ['a', 'a', 'a', 'b'], 'page': [1, 2, 3, 1],
+                         'text': ["one two three", "four five", None, "six"]})
+    chunker = TextChunker(max_tokens=4, overlap_tokens=0, token_counter=WordCounter())
+    documents = [(doc_id, list(pages)) for doc_id, pages in chunker.iter_documents([rows.iloc[:2], rows.iloc[2:]])]
+    assert [doc_id for doc_id, _ in documents] == ['a', 'b']
+    assert documents[0][1][:2] == [(1, "one two three"), (2, "four five")]
+    chunks = chunker.chunk_frame(rows)
+    assert chunks['map_id'].tolist() == ['a', 'a', 'b']
+    assert chunks['chunk'].tolist() == [0, 1, 0]
+    assert chunks[['page_start', 'page_end']].values.tolist() == [[1, 1], [2, 2], [1, 1]]
+
+def test_invalid_budget():
+    """Test that the overlap must be smaller than the chunk budget."""
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=10, overlap_tokens=10)
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from src.validator.validator import ResponseValidator, compile_schema
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'topic': {'type': 'string', 'minLength': 1},
+        'is_clinical': {'type': 'boolean'},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'keywords': {'type': 'array', 'items': {'type': 'string'}, 'maxItems': 3},
+        'study_type': {'enum': ['trial', 'review', 'other']},
+    },
+    'required': ['topic', 'is_clinical'],
+    'additionalProperties': False,
+}
+
+@pytest.fixture
+def validator():
+    return ResponseValidator(SCHEMA)
+
+def test_valid_response(validator):
+    """Test that a conforming response has no errors."""
+    assert validator.validate({'topic': 'oncology', 'is_clinical': True, 'confidence': 0.9,
+                               'keywords': ['a', 'b'], 'study_type': 'trial'}) == []
+
+def test_errors_report_paths(validator):
+    """Test that every violation is reported with its JSON path."""
+    errors = validator.validate({'topic': '', 'confidence': 2, 'keywords': ['a', 1, 'c', 'd'],
+                                 'study_type': 'essay', 'extra': None})
+    assert "$: missing required property 'is_clinical'" in errors
+    assert "$.topic: shorter than 1 characters" in errors
+    assert "$.confidence: violates maximum 1" in errors
+    assert "$.keywords: expected at most 3 items" in errors
+    assert "$.keywords[1]: expected string, got int" in errors
+    assert "$.study_type: 'essay' is not one of ['trial', 'review', 'other']" in errors
+    assert "$: unexpected property 'extra'" in errors
+
+def test_type_mismatch_skips_nested_checks():
+    """Test that a wrong type is reported once, without follow-up keyword errors."""
+    validate = compile_schema({'type': 'integer', 'minimum': 0})
+    assert validate(True) == ["$: expected integer, got bool"]
+    assert validate(-1.0) == ["$: violates minimum 0"]
+
+def test_validate_batch(validator):
+    """Test bulk validation of raw responses with per-row reports."""
+    responses = pd.Series([
+        '{"topic": "genomics", "is_clinical": false}',
+        '```json\n{"topic": "cardiology", "is_clinical": true}\n```',
+        '{"topic": "x"',
+        b'{"topic": 3, "is_clinical": true}',
+    ], index=[10, 11, 12, 13])
+    report = validator.validate_batch(responses)
+    assert report.index.tolist() == [10, 11, 12, 13]
+    assert report['valid'].tolist() == [True, True, False, False]
+    assert report.loc[12, 'errors'].startswith("Invalid JSON")
+    assert report.loc[13, 'errors'] == "$.topic: expected string, got int"
+    assert report.loc[11, 'parsed'] == {'topic': 'cardiology', 'is_clinical': True}
+
+def test_unknown_type_is_rejected():
+    """Test that schemas with unknown types fail at compile time."""
+    with pytest.raises(ValueError):
+        ResponseValidator({'type': 'text'})
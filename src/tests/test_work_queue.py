@@ -0,0 +1,43 @@
+import time
+import pytest
+from src.pipeline.work_queue import SQLiteWorkQueue
+
+def test_units_are_leased_once_and_completed(tmp_path):
+    """Test that two workers never lease the same unit and that results are kept."""
+    path = str(tmp_path / "work" / "queue.sqlite")
+    queue = SQLiteWorkQueue(path)
+    assert queue.put([("a", {'n': 1}), ("b", {'n': 2})]) == 2
+    assert queue.put([("a", {'n': 3})]) == 0
+    other = SQLiteWorkQueue(path)
+    first, second = queue.lease("w1", 60), other.lease("w2", 60)
+    assert {first.unit_id, second.unit_id} == {"a", "b"} and queue.lease("w3", 60) is None
+    assert queue.complete(first, {'rows': first.payload['n']})
+    assert other.complete(second, {'rows': second.payload['n']})
+    assert queue.summary() == {'pending': 0, 'leased': 0, 'done': 2, 'failed': 0} and queue.is_finished()
+    assert dict(queue.iter_results()) == {"a": {'rows': 1}, "b": {'rows': 2}}
+
+def test_expired_lease_is_taken_over_and_late_result_is_rejected(tmp_path):
+    """Test that an unrenewed lease expires, goes to another worker, and the first worker loses it."""
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite"))
+    queue.put([("a", {})])
+    stale = queue.lease("w1", 0.05)
+    assert queue.lease("w2", 60) is None
+    time.sleep(0.1)
+    fresh = queue.lease("w2", 60)
+    assert fresh.unit_id == "a" and fresh.attempt == 2
+    assert not queue.renew(stale, 60) and not queue.complete(stale, {'from': "w1"})
+    assert queue.renew(fresh, 60) and queue.complete(fresh, {'from': "w2"})
+    assert dict(queue.iter_results()) == {"a": {'from': "w2"}}
+
+def test_failed_units_are_retried_until_attempts_run_out(tmp_path):
+    """Test that a failing unit is retried after its delay and then marked failed."""
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite"), max_attempts=2, retry_delay=0.05)
+    queue.put([("a", {})])
+    queue.fail(queue.lease("w1", 60), "boom")
+    assert queue.lease("w1", 60) is None and not queue.is_finished()
+    time.sleep(0.06)
+    queue.fail(queue.lease("w1", 60), "boom again")
+    assert queue.summary()['failed'] == 1 and queue.failures() == {"a": "boom again"}
+    assert queue.is_finished() and queue.lease("w1", 60) is None
+    with pytest.raises(ValueError):
+        SQLiteWorkQueue(str(tmp_path / "other.sqlite"), max_attempts=0)
@@ -0,0 +1,263 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from exceptions.exceptions import SchemaViolationError
+from validator.validator import _DECODE_ERRORS, _loads, ResponseValidator, compile_schema
+
+"""
+Module: incremental.py
+Purpose: Parses and validates a JSON response incrementally while it is streamed in.
+
+Classes:
+    IncrementalValidator: Consumes response text in chunks and fails fast on schema violations.
+
+Usage:
+    Every chunk of text is fed to the validator as it arrives. A small state machine
+    tracks the open objects and arrays, and each value is checked against its
+    subschema as soon as it is complete. The validator raises SchemaViolationError as
+    soon as the text can no longer be completed into a valid response:
+
+        - the text is not JSON (an unexpected character, an invalid literal),
+        - a value starts with the wrong type, e.g. a number where a string is required,
+        - an object gets a key its schema forbids (additionalProperties: false),
+        - an array gets more than maxItems items,
+        - a completed value fails its subschema (enum, pattern, bounds, required, ...).
+
+    Checks that depend on anyOf or allOf alternatives are left to the final validation.
+    The members of the top-level object are returned by feed() as they complete, so
+    callers can act on early fields before the response has finished:
+
+        monitor = IncrementalValidator(ResponseValidator(schema))
+        for delta in stream:
+            for key, value in monitor.feed(delta):
+                print(key, value)
+        parsed, errors = monitor.finish()
+"""
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+_SCALAR_START = '-0123456789tfn'
+_WHITESPACE = ' \t\r\n'
+_START_TYPES = {'{': {'object'}, '[': {'array'}, '"': {'string'}, 't': {'boolean'}, 'f': {'boolean'},
+                'n': {'null'}}
+_NUMBER_TYPES = {'number', 'integer'}
+
+
+class _Frame:
+    """An open object or array."""
+    __slots__ = ('kind', 'schema', 'start', 'path', 'key', 'count', 'expect')
+
+    def __init__(self, kind: str, schema: Optional[Dict[str, Any]], start: int, path: str):
+        self.kind = kind
+        self.schema = schema
+        self.start = start
+        self.path = path
+        self.key = None
+        self.count = 0
+        # object: 'key_or_close', 'key', 'colon', 'value', 'comma_or_close'
+        # array:  'value_or_close', 'value', 'comma_or_close'
+        self.expect = 'key_or_close' if kind == 'object' else 'value_or_close'
+
+
+class IncrementalValidator:
+    """
+    Validates a JSON response chunk by chunk against the schema of a ResponseValidator.
+    """
+    def __init__(self, validator: ResponseValidator):
+        self.validator = validator
+        self.schema = validator.schema
+        self.text = ''
+        self.value = None
+        self.done = False
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._string_start = None
+        self._string_is_key = False
+        self._scan = 0
+        self._scalar_start = None
+        self._checks = {}
+        self._fields = []
+
+    def _check(self, schema: Optional[Dict[str, Any]], value: Any, path: str) -> None:
+        """Validates a completed value against its subschema."""
+        if not schema:
+            return
+        check = self._checks.get(id(schema))
+        if check is None:
+            check = self._checks[id(schema)] = compile_schema(schema)
+        errors = check(value)
+        if errors:
+            # Errors are relative to the value ('$: ...'); the exception adds `path` itself.
+            raise SchemaViolationError("; ".join(
+                error[3:] if error.startswith('$: ') else path + error[1:] for error in errors), path)
+
+    @staticmethod
+    def _child(frame: _Frame) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Returns the subschema and path of the next value inside an open container."""
+        if frame.kind == 'object':
+            path = f"{frame.path}.{frame.key}"
+            if frame.schema is None:
+                return None, path
+            properties = frame.schema.get('properties', {})
+            if frame.key in properties:
+                return properties[frame.key], path
+            additional = frame.schema.get('additionalProperties', True)
+            return (additional if isinstance(additional, dict) else None), path
+        path = f"{frame.path}[{frame.count}]"
+        items = frame.schema.get('items') if frame.schema is not None else None
+        return (items if isinstance(items, dict) else None), path
+
+    def _start_value(self, char: str) -> None:
+        """Opens the value starting at the current position after checking its type."""
+        if self._stack:
+            frame = self._stack[-1]
+            max_items = frame.schema.get('maxItems') if frame.kind == 'array' and frame.schema else None
+            if max_items is not None and frame.count >= max_items:
+                raise SchemaViolationError(f"expected at most {max_items} items", frame.path)
+            schema, path = self._child(frame)
+        else:
+            schema, path = self.schema, '$'
+        types = _START_TYPES.get(char, _NUMBER_TYPES if char in _SCALAR_START else None)
+        if types is None:
+            raise SchemaViolationError(f"unexpected character {char!r}", path)
+        if schema and 'type' in schema:
+            allowed = set(schema['type'] if isinstance(schema['type'], list) else [schema['type']])
+            if 'number' in allowed:
+                allowed.add('integer')
+            if not types & allowed:
+                raise SchemaViolationError(f"expected {' or '.join(sorted(allowed))}", path)
+        if char == '{' or char == '[':
+            self._stack.append(_Frame('object' if char == '{' else 'array', schema, self._pos, path))
+        elif char == '"':
+            self._string_start, self._string_is_key, self._scan = self._pos, False, self._pos + 1
+        else:
+            self._scalar_start = self._pos
+        self._pos += 1
+
+    def _complete_value(self, start: int, end: int, schema: Optional[Dict[str, Any]], path: str) -> None:
+        """Parses and checks a completed value and advances its parent container."""
+        try:
+            value = _loads(self.text[start:end])
+        except _DECODE_ERRORS:
+            raise SchemaViolationError(f"invalid JSON value {self.text[start:end][:40]!r}", path) from None
+        self._check(schema, value, path)
+        if not self._stack:
+            self.value, self.done = value, True
+            return
+        parent = self._stack[-1]
+        if parent.kind == 'object' and len(self._stack) == 1:
+            self._fields.append((parent.key, value))
+        parent.count += 1
+        parent.expect = 'comma_or_close'
+
+    def _complete_scalar(self, start: int, end: int) -> None:
+        if self._stack:
+            schema, path = self._child(self._stack[-1])
+        else:
+            schema, path = self.schema, '$'
+        self._complete_value(start, end, schema, path)
+
+    def _close(self, char: str) -> None:
+        frame = self._stack[-1]
+        expected = '}' if frame.kind == 'object' else ']'
+        closable = frame.expect in ('comma_or_close', 'key_or_close', 'value_or_close')
+        if char != expected or not closable:
+            raise SchemaViolationError(f"unexpected character {char!r}", frame.path)
+        self._stack.pop()
+        self._pos += 1
+        self._complete_value(frame.start, self._pos, frame.schema, frame.path)
+
+    def _complete_key(self, start: int, end: int) -> None:
+        frame = self._stack[-1]
+        try:
+            frame.key = _loads(self.text[start:end])
+        except _DECODE_ERRORS:
+            raise SchemaViolationError(f"invalid JSON key {self.text[start:end][:40]!r}", frame.path) from None
+        schema = frame.schema
+        if schema is not None and schema.get('additionalProperties', True) is False \
+                and frame.key not in schema.get('properties', {}):
+            raise SchemaViolationError(f"unexpected property '{frame.key}'", frame.path)
+        frame.expect = 'colon'
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consumes the next chunk of the response.
+
+        Returns:
+            list: (key, value) pairs of the top-level object members completed by this chunk.
+
+        Raises:
+            SchemaViolationError: If the response can no longer become valid.
+        """
+        self.text += chunk
+        text = self.text
+        while self._pos < len(text):
+            if self._string_start is not None:
+                match = _STRING_SPECIAL.search(text, self._scan)
+                if match is None:
+                    self._scan = len(text)
+                    break
+                if match.group() == '\\':
+                    if match.end() >= len(text):
+                        self._scan = match.start()
+                        break
+                    self._scan = match.end() + 1
+                    continue
+                start, self._string_start, self._pos = self._string_start, None, match.end()
+                if self._string_is_key:
+                    self._complete_key(start, self._pos)
+                else:
+                    self._complete_scalar(start, self._pos)
+                continue
+            if self._scalar_start is not None:
+                match = _SCALAR_END.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                start, self._scalar_start, self._pos = self._scalar_start, None, match.start()
+                self._complete_scalar(start, self._pos)
+                continue
+            char = text[self._pos]
+            if char in _WHITESPACE:
+                self._pos += 1
+            elif not self._started:
+                if char == '`':
+                    # A markdown code fence before the JSON: skip its whole line.
+                    newline = text.find('\n', self._pos)
+                    if newline == -1:
+                        break
+                    self._pos = newline + 1
+                    continue
+                self._started = True
+                self._start_value(char)
+            elif self.done:
+                if char != '`':
+                    raise SchemaViolationError(f"unexpected text after the JSON value: {char!r}")
+                self._pos += 1
+            else:
+                self._step(char)
+        fields, self._fields = self._fields, []
+        return fields
+
+    def _step(self, char: str) -> None:
+        """Handles a structural character inside the open container."""
+        frame = self._stack[-1]
+        if char in '}]':
+            self._close(char)
+        elif frame.expect in ('value', 'value_or_close'):
+            self._start_value(char)
+        elif frame.expect in ('key', 'key_or_close') and char == '"':
+            self._string_start, self._string_is_key, self._scan = self._pos, True, self._pos + 1
+            self._pos += 1
+        elif frame.expect == 'colon' and char == ':':
+            frame.expect = 'value'
+            self._pos += 1
+        elif frame.expect == 'comma_or_close' and char == ',':
+            frame.expect = 'key' if frame.kind == 'object' else 'value'
+            self._pos += 1
+        else:
+            raise SchemaViolationError(f"unexpected character {char!r}", frame.path)
+
+    def finish(self) -> Tuple[Any, List[str]]:
+        """Validates the complete response text, returning (parsed value, errors) like validate_text()."""
+        return self.validator.validate_text(self.text)
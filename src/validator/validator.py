@@ -0,0 +1,276 @@
+import importlib.util
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+
+"""
+Module: validator.py
+Purpose: Implements validation of prompts and LLM responses against a JSON schema.
+
+Classes:
+    ResponseValidator: Validates JSON responses with a schema compiled once into checks.
+
+Functions:
+    compile_schema: Compiles a JSON schema into a checking function.
+
+Usage:
+    A generic validator walks the schema dict again for every document. Here the schema
+    is compiled once into nested closures, one per schema node, each holding its already
+    resolved keywords (type tuples, required keys, compiled patterns), so validating a
+    response only runs the checks. The supported keywords are the JSON Schema subset used
+    for structured LLM output: type, enum, const, properties, required,
+    additionalProperties, items, minItems, maxItems, minLength, maxLength, pattern,
+    minimum, maximum, exclusiveMinimum, exclusiveMaximum, anyOf and allOf.
+
+        validator = ResponseValidator(schema)
+        report = validator.validate_batch(response_texts)
+"""
+
+if importlib.util.find_spec('orjson'):
+    import orjson
+
+    _loads = orjson.loads
+    _DECODE_ERRORS = (orjson.JSONDecodeError,)
+else:
+    _loads = json.loads
+    _DECODE_ERRORS = (json.JSONDecodeError,)
+
+# A compiled schema node: returns None when the value is valid, otherwise a list of
+# (relative path, message) pairs. Paths are only built on the error path.
+Check = Callable[[Any], Optional[List[Tuple[str, str]]]]
+
+_NUMBER_TYPES = (int, float)
+_TYPE_CHECKS = {
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: value is True or value is False,
+    'null': lambda value: value is None,
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'number': lambda value: isinstance(value, _NUMBER_TYPES) and not isinstance(value, bool),
+    'integer': lambda value: (isinstance(value, int) and not isinstance(value, bool))
+    or (isinstance(value, float) and value.is_integer()),
+}
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """Compiles one schema node and, recursively, its subschemas."""
+    checks: List[Check] = []
+
+    type_check = None
+    if 'type' in schema:
+        type_names = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        unknown = [name for name in type_names if name not in _TYPE_CHECKS]
+        if unknown:
+            raise ValueError(f"Unsupported schema type(s): {', '.join(unknown)}")
+        type_checks = [_TYPE_CHECKS[name] for name in type_names]
+        single_type_check = type_checks[0] if len(type_checks) == 1 else None
+        expected = ' or '.join(type_names)
+
+        def type_check(value):
+            if single_type_check is not None:
+                if single_type_check(value):
+                    return None
+            elif any(check(value) for check in type_checks):
+                return None
+            return [('', f"expected {expected}, got {type(value).__name__}")]
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+
+        def check_enum(value):
+            return None if value in allowed else [('', f"{value!r} is not one of {allowed!r}")]
+        checks.append(check_enum)
+
+    if 'const' in schema:
+        constant = schema['const']
+
+        def check_const(value):
+            return None if value == constant else [('', f"expected {constant!r}")]
+        checks.append(check_const)
+
+    properties = {name: _compile(subschema) for name, subschema in schema.get('properties', {}).items()}
+    required = list(schema.get('required', []))
+    additional = schema.get('additionalProperties', True)
+    additional_check = _compile(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value):
+            if not isinstance(value, dict):
+                return None
+            errors = None
+            for name in required:
+                if name not in value:
+                    errors = (errors or []) + [('', f"missing required property '{name}'")]
+            for name, item in value.items():
+                property_check = properties.get(name)
+                if property_check is None:
+                    if additional is False:
+                        errors = (errors or []) + [('', f"unexpected property '{name}'")]
+                        continue
+                    property_check = additional_check
+                    if property_check is None:
+                        continue
+                problems = property_check(item)
+                if problems:
+                    errors = (errors or []) + [(f".{name}{path}", message) for path, message in problems]
+            return errors
+        checks.append(check_object)
+
+    items_check = _compile(schema['items']) if isinstance(schema.get('items'), dict) else None
+    min_items, max_items = schema.get('minItems'), schema.get('maxItems')
+    if items_check is not None or min_items is not None or max_items is not None:
+        def check_array(value):
+            if not isinstance(value, list):
+                return None
+            errors = None
+            if min_items is not None and len(value) < min_items:
+                errors = [('', f"expected at least {min_items} items")]
+            if max_items is not None and len(value) > max_items:
+                errors = [('', f"expected at most {max_items} items")]
+            if items_check is not None:
+                for index, item in enumerate(value):
+                    problems = items_check(item)
+                    if problems:
+                        errors = (errors or []) + [(f"[{index}]{path}", message) for path, message in problems]
+            return errors
+        checks.append(check_array)
+
+    min_length, max_length = schema.get('minLength'), schema.get('maxLength')
+    pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+    if min_length is not None or max_length is not None or pattern is not None:
+        def check_string(value):
+            if not isinstance(value, str):
+                return None
+            errors = None
+            if min_length is not None and len(value) < min_length:
+                errors = [('', f"shorter than {min_length} characters")]
+            if max_length is not None and len(value) > max_length:
+                errors = [('', f"longer than {max_length} characters")]
+            if pattern is not None and not pattern.search(value):
+                errors = (errors or []) + [('', f"does not match pattern {pattern.pattern!r}")]
+            return errors
+        checks.append(check_string)
+
+    bounds = [(schema[keyword], keyword, compare) for keyword, compare in (
+        ('minimum', lambda value, bound: value >= bound),
+        ('maximum', lambda value, bound: value <= bound),
+        ('exclusiveMinimum', lambda value, bound: value > bound),
+        ('exclusiveMaximum', lambda value, bound: value < bound),
+    ) if keyword in schema]
+    if bounds:
+        def check_number(value):
+            if isinstance(value, bool) or not isinstance(value, _NUMBER_TYPES):
+                return None
+            errors = [('', f"violates {keyword} {bound}") for bound, keyword, compare in bounds
+                      if not compare(value, bound)]
+            return errors or None
+        checks.append(check_number)
+
+    if 'anyOf' in schema:
+        alternatives = [_compile(subschema) for subschema in schema['anyOf']]
+
+        def check_any_of(value):
+            if any(not alternative(value) for alternative in alternatives):
+                return None
+            return [('', "does not match any of the allowed schemas")]
+        checks.append(check_any_of)
+
+    for subschema in schema.get('allOf', []):
+        checks.append(_compile(subschema))
+
+    if len(checks) == 1 and type_check is None:
+        return checks[0]
+
+    def check(value):
+        if type_check is not None:
+            problems = type_check(value)
+            if problems:
+                # Keyword checks assume the right type; report the mismatch only.
+                return problems
+        errors = None
+        for node_check in checks:
+            problems = node_check(value)
+            if problems:
+                errors = (errors or []) + problems
+        return errors
+    return check
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """
+    Compiles a JSON schema into a function that returns the list of violations of a
+    value, each formatted as '<JSON path>: <message>'.
+
+    Raises:
+        ValueError: If the schema uses an unknown type name.
+    """
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        problems = check(value)
+        return [f"${path}: {message}" for path, message in problems] if problems else []
+    return validate
+
+
+class ResponseValidator:
+    """
+    Validates prompts and LLM responses against a JSON schema compiled once.
+    """
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._validate = compile_schema(schema)
+
+    @staticmethod
+    def parse(text) -> Any:
+        """
+        Parses a JSON response (str or bytes) with orjson when installed. Markdown code
+        fences around the JSON are ignored.
+
+        Raises:
+            ValueError: If the text is not valid JSON.
+        """
+        if isinstance(text, str):
+            stripped = text.strip()
+            if stripped.startswith('```'):
+                stripped = stripped.strip('`').removeprefix('json').strip()
+            text = stripped
+        try:
+            return _loads(text)
+        except _DECODE_ERRORS as e:
+            raise ValueError(f"Invalid JSON: {e}") from None
+
+    def validate(self, value: Any) -> List[str]:
+        """Returns the list of schema violations of an already parsed value."""
+        return self._validate(value)
+
+    def is_valid(self, value: Any) -> bool:
+        return not self.validate(value)
+
+    def validate_text(self, text) -> Tuple[Any, List[str]]:
+        """Parses and validates a raw response, returning (parsed value, errors)."""
+        try:
+            parsed = self.parse(text)
+        except ValueError as e:
+            return None, [str(e)]
+        return parsed, self.validate(parsed)
+
+    def validate_batch(self, responses: Iterable) -> pd.DataFrame:
+        """
+        Validates many responses at once. Each response may be raw JSON text or an
+        already parsed value.
+
+        Returns:
+            pd.DataFrame: One row per response with `valid`, `errors` (messages joined
+                by '; ') and the `parsed` value.
+        """
+        valid, errors, parsed = [], [], []
+        for response in responses:
+            if isinstance(response, (str, bytes)):
+                value, problems = self.validate_text(response)
+            else:
+                value, problems = response, self.validate(response)
+            valid.append(not problems)
+            errors.append('; '.join(problems))
+            parsed.append(value)
+        index = responses.index if isinstance(responses, pd.Series) else None
+        return pd.DataFrame({'valid': valid, 'errors': errors, 'parsed': parsed}, index=index)